@@ -0,0 +1,26 @@
+"""Process-wide HTTP client shared by the LLM clients.
+
+Its connections belong to the event loop that opened them, so whoever runs a
+loop closes the client before the loop ends; the next call creates a new one.
+"""
+
+from functools import lru_cache
+
+import httpx
+
+
+@lru_cache(maxsize=1)
+def shared_httpx() -> httpx.AsyncClient:
+    """Return the shared connection pool, creating it on first use."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=60,
+    )
+
+
+async def close_shared_httpx() -> None:
+    """Close the shared client if it was created."""
+    if shared_httpx.cache_info().currsize:
+        await shared_httpx().aclose()
+        shared_httpx.cache_clear()
@@ -1,36 +1,68 @@
 import asyncio
 import logging
 import sys
-from typing import Optional
 
 import click
 from dotenv import load_dotenv
+from pydantic import ValidationError
 
+from ._http import close_shared_httpx
 from .code_agent import CodeAgent
-from .config import config
+from .config import Config, get_config
 from .reviewer_agent import ReviewerAgent
 
-
 load_dotenv()
 
 
-logging.basicConfig(
-    level=getattr(logging, config.log_level.upper()),
-    format=config.log_format,   
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("ai_code_agent.log")
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
 
+def _install_uvloop() -> None:
+    try:
+        import uvloop
+    except ImportError:
+        # Not available on Windows; the default loop works, just slower
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def _run(coro):
+    """asyncio.run(coro), closing the shared LLM connection pool before the loop ends."""
+
+    async def run():
+        try:
+            return await coro
+        finally:
+            await close_shared_httpx()
+
+    return asyncio.run(run())
+
+
+def _configure_logging() -> None:
+    try:
+        config = get_config()
+        log_level, log_format = config.log_level, config.log_format
+    except ValidationError:
+        # Let validate-config report what is missing
+        log_level = Config.model_fields["log_level"].default
+        log_format = Config.model_fields["log_format"].default
+
+    logging.basicConfig(
+        level=getattr(logging, log_level.upper()),
+        format=log_format,
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler("ai_code_agent.log"),
+        ],
+    )
+
+
 @click.group()
 @click.version_option(version="0.1.0")
 def main() -> None:
     """AI Code Agent - Automated GitHub SDLC system."""
-    pass
+    _configure_logging()
+    _install_uvloop()
 
 
 @main.command()
@@ -39,29 +71,30 @@ def main() -> None:
     "--max-iterations",
     default=None,
     type=int,
-    help="Maximum number of iterations for fixing issues"
+    help="Maximum number of iterations for fixing issues",
 )
-def process_issue(issue_number: int, max_iterations: Optional[int]) -> None:
+def process_issue(issue_number: int, max_iterations: int | None) -> None:
     """Process a GitHub issue and create a pull request.
-    
+
     ISSUE_NUMBER: The GitHub issue number to process
     """
     click.echo(f"🚀 Processing issue #{issue_number}...")
-    
+
     try:
+        config = get_config()
         if max_iterations:
             config.max_iterations = max_iterations
 
         code_agent = CodeAgent()
-        pr_number = asyncio.run(code_agent.process_issue(issue_number))
-        
+        pr_number = _run(code_agent.process_issue(issue_number))
+
         if pr_number:
             click.echo(f"Successfully created pull request #{pr_number}")
             click.echo(f"View at: {config.github_repo_url}/pull/{pr_number}")
         else:
             click.echo("Failed to process issue")
             sys.exit(1)
-            
+
     except Exception as e:
         logger.error(f"Error processing issue: {e}")
         click.echo(f"Error: {e}")
@@ -72,24 +105,24 @@ def process_issue(issue_number: int, max_iterations: Optional[int]) -> None:
 @click.argument("pr_number", type=int)
 def review_pr(pr_number: int) -> None:
     """Review a pull request and provide feedback.
-    
+
     PR_NUMBER: The pull request number to review
     """
     click.echo(f"🔍 Reviewing pull request #{pr_number}...")
-    
+
     try:
         reviewer_agent = ReviewerAgent()
-        result = asyncio.run(reviewer_agent.review_pull_request(pr_number))
-        
+        result = _run(reviewer_agent.review_pull_request(pr_number))
+
         if result.get("status") == "completed":
             overall = result.get("overall_assessment", {})
-            click.echo(f"Review succeded")
+            click.echo("Review succeded")
             click.echo(f"Score: {overall.get('score', 0)}/100")
             click.echo(f"Recommendation: {overall.get('recommendation', 'unknown')}")
         else:
             click.echo(f"Review failed: {result.get('message', 'Unknown error')}")
             sys.exit(1)
-            
+
     except Exception as e:
         logger.error(f"Error reviewing PR: {e}")
         click.echo(f"Error: {e}")
@@ -102,51 +135,54 @@ def review_pr(pr_number: int) -> None:
     "--max-iterations",
     default=None,
     type=int,
-    help="Maximum number of iterations for the full cycle"
+    help="Maximum number of iterations for the full cycle",
 )
-def full_cycle(issue_number: int, max_iterations: Optional[int]) -> None:
+def full_cycle(issue_number: int, max_iterations: int | None) -> None:
     """Run the full SDLC cycle: process issue -> create PR -> review -> iterate if needed.
-    
+
     ISSUE_NUMBER: The GitHub issue number to process
     """
     click.echo(f"🔄 Starting full SDLC cycle for issue #{issue_number}...")
-    
+
     try:
+        config = get_config()
         max_iter = max_iterations or config.max_iterations
         iteration = 0
-        
+
         code_agent = CodeAgent()
         reviewer_agent = ReviewerAgent()
-        
+
         while iteration < max_iter:
             iteration += 1
             click.echo(f"\nIteration {iteration}/{max_iter}")
 
             click.echo("🚀 Processing issue...")
-            pr_number = asyncio.run(code_agent.process_issue(issue_number))
-            
+            pr_number = _run(code_agent.process_issue(issue_number))
+
             if not pr_number:
                 click.echo("Failed to create pull request")
                 sys.exit(1)
-                
+
             click.echo(f"Pull request #{pr_number} created/updated")
 
             click.echo("🔍 Reviewing pull request...")
-            review_result = asyncio.run(reviewer_agent.review_pull_request(pr_number))
-            
+            review_result = _run(reviewer_agent.review_pull_request(pr_number))
+
             if review_result.get("status") != "completed":
                 click.echo(f"Review failed: {review_result.get('message')}")
                 sys.exit(1)
-            
+
             overall = review_result.get("overall_assessment", {})
             score = overall.get("score", 0)
             recommendation = overall.get("recommendation", "unknown")
-            
+
             click.echo(f"Review Score: {score}/100")
             click.echo(f"Recommendation: {recommendation}")
 
             if recommendation in ["approve", "approve_with_suggestions"]:
-                click.echo("🎉 Pull request approved! SDLC cycle completed successfully.")
+                click.echo(
+                    "🎉 Pull request approved! SDLC cycle completed successfully."
+                )
                 click.echo(f"🔗 Final PR: {config.github_repo_url}/pull/{pr_number}")
                 break
             elif recommendation == "request_changes":
@@ -154,15 +190,17 @@ def full_cycle(issue_number: int, max_iterations: Optional[int]) -> None:
                     click.echo("Changes requested. Starting next iteration...")
                     continue
                 else:
-                    click.echo("Maximum iterations reached. Manual intervention may be needed.")
+                    click.echo(
+                        "Maximum iterations reached. Manual intervention may be needed."
+                    )
                     break
             else:
                 click.echo("Significant issues found. Manual intervention required.")
                 break
-        
+
         if iteration >= max_iter:
             click.echo(f"Reached maximum iterations ({max_iter}). Process stopped.")
-            
+
     except Exception as e:
         logger.error(f"Error in full cycle: {e}")
         click.echo(f"Error: {e}")
@@ -172,6 +210,7 @@ def full_cycle(issue_number: int, max_iterations: Optional[int]) -> None:
 @main.command()
 def config_info() -> None:
     """Display current configuration information."""
+    config = get_config()
     click.echo("AI Code Agent Configuration:")
     click.echo(f"Repository: {config.github_repo_owner}/{config.github_repo_name}")
     click.echo(f"LLM Model: {config.openai_model}")
@@ -183,35 +222,45 @@ def config_info() -> None:
 def validate_config() -> None:
     """Validate the current configuration."""
     click.echo("Validating configuration...")
-    
+
     errors = []
     warnings = []
-    
-    if not config.github_token:
-        errors.append("GITHUB_TOKEN is not set")
-    
-    if not config.github_repo_owner:
-        errors.append("GITHUB_REPO_OWNER is not set")
-        
-    if not config.github_repo_name:
-        errors.append("GITHUB_REPO_NAME is not set")
-    
-    if not config.openai_api_key:
-        errors.append("OPENAI_API_KEY is not set")
-
-    if config.max_iterations < 1 or config.max_iterations > 10:
-        warnings.append(f"MAX_ITERATIONS ({config.max_iterations}) should be between 1 and 10")
-    
+
+    try:
+        config = get_config()
+    except ValidationError as e:
+        config = None
+        for error in e.errors():
+            errors.append(f"{str(error['loc'][0]).upper()} is not set")
+
+    if config is not None:
+        if not config.github_token:
+            errors.append("GITHUB_TOKEN is not set")
+
+        if not config.github_repo_owner:
+            errors.append("GITHUB_REPO_OWNER is not set")
+
+        if not config.github_repo_name:
+            errors.append("GITHUB_REPO_NAME is not set")
+
+        if not config.openai_api_key:
+            errors.append("OPENAI_API_KEY is not set")
+
+        if config.max_iterations < 1 or config.max_iterations > 10:
+            warnings.append(
+                f"MAX_ITERATIONS ({config.max_iterations}) should be between 1 and 10"
+            )
+
     if errors:
         click.echo("Configuration errors found:")
         for error in errors:
             click.echo(f"  • {error}")
-    
+
     if warnings:
         click.echo("Configuration warnings:")
         for warning in warnings:
             click.echo(f"  • {warning}")
-    
+
     if not errors and not warnings:
         click.echo("Configuration is valid!")
     elif not errors:
@@ -222,4 +271,4 @@ def validate_config() -> None:
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,20 +2,190 @@ import asyncio
 import logging
 import re
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
 
+import orjson
+
+from .diff_utils import apply_unified_diff, number_lines
 from .github_client import GitHubClient
+from .json_utils import extract_json
 from .openai_client import OpenAIClient
 
 logger = logging.getLogger(__name__)
 
+MULTI_FILE_MAX_TOKENS = 16000
+
+_FENCE_OPEN = re.compile(r"^```[a-zA-Z]*\n")
+_FENCE_CLOSE = re.compile(r"\n```$")
+
+
+def _strip_fences(content: str) -> str:
+    content = _FENCE_OPEN.sub("", content, count=1)
+    return _FENCE_CLOSE.sub("", content, count=1)
+
+
+ANALYZE_SYSTEM_PROMPT = """You are an expert software developer analyzing GitHub issues.
+        Your task is to understand the requirements and provide a structured analysis.
+
+        Analyze the issue and provide:
+        1. Summary of what needs to be implemented
+        2. List of files that need to be created or modified
+        3. Key functionality requirements
+        4. Technical approach
+        5. Dependencies or libraries needed
+
+        Respond in JSON format with the following structure:
+        {
+            "summary": "Brief description of what needs to be implemented",
+            "files_to_modify": ["list", "of", "files"],
+            "files_to_create": ["list", "of", "new", "files"],
+            "requirements": ["list", "of", "key", "requirements"],
+            "technical_approach": "Description of how to implement",
+            "dependencies": ["list", "of", "dependencies"]
+        }"""
+
+ANALYZE_USER_PROMPT_TMPL = """Issue Title: {title}
+
+Issue Description:
+{body}
+
+Please analyze this issue and provide the structured response."""
+
+MULTI_FILE_SYSTEM_PROMPT_TMPL = """You are an expert software developer implementing a GitHub issue.
+
+            Based on the issue analysis, modify the existing files and create the new files
+            required to implement the requested functionality.
+
+            Analysis:
+            - Summary: {summary}
+            - Requirements: {requirements}
+            - Technical Approach: {technical_approach}
+            - Dependencies: {dependencies}
+
+            Rules:
+            1. Preserve existing functionality unless it conflicts with requirements
+            2. Follow Python best practices and PEP 8
+            3. Add proper error handling
+            4. Include docstrings for new functions/classes
+            5. Add type hints where appropriate
+            6. Include necessary imports
+
+            Respond only with a JSON object mapping every requested file path to its
+            complete file content, no explanations:
+            {{
+                "path/to/file.py": "complete file content"
+            }}"""
+
+MODIFY_FILE_SECTION_TMPL = """File to modify: {file_path}
+
+Current content:
+```
+{current_content}
+```"""
+
+MODIFY_SYSTEM_PROMPT_TMPL = """You are an expert software developer modifying code files.
+
+            Based on the issue analysis, modify the existing file to implement the required functionality.
+
+            Analysis:
+            - Summary: {summary}
+            - Requirements: {requirements}
+            - Technical Approach: {technical_approach}
+
+            Rules:
+            1. Preserve existing functionality unless it conflicts with requirements
+            2. Follow Python best practices and PEP 8
+            3. Add proper error handling
+            4. Include docstrings for new functions/classes
+            5. Add type hints where appropriate
+
+            Return only the complete modified file content, no explanations."""
+
+MODIFY_USER_PROMPT_TMPL = """File to modify: {file_path}
+
+Current content:
+```
+{current_content}
+```
+
+Please provide the modified file content that implements the required functionality."""
+
+MODIFY_DIFF_SYSTEM_PROMPT_TMPL = """You are an expert software developer modifying code files.
+
+            Based on the issue analysis, change the existing file to implement the required functionality.
+
+            Analysis:
+            - Summary: {summary}
+            - Requirements: {requirements}
+            - Technical Approach: {technical_approach}
+
+            Rules:
+            1. Preserve existing functionality unless it conflicts with requirements
+            2. Follow Python best practices and PEP 8
+            3. Add proper error handling
+            4. Include docstrings for new functions/classes
+            5. Add type hints where appropriate
+
+            Return only a unified diff against the current file, no explanations:
+            start with "--- a/<path>" and "+++ b/<path>", use "@@ -start,count +start,count @@"
+            hunk headers and include 3 lines of unchanged context around every change."""
+
+MODIFY_DIFF_USER_PROMPT_TMPL = """File to modify: {file_path}
+
+Current content (line numbers are for reference only and are not part of the file):
+```
+{numbered_content}
+```
+
+Please provide a unified diff that implements the required functionality."""
+
+CREATE_SYSTEM_PROMPT_TMPL = """You are an expert software developer creating new code files.
+
+            Based on the issue analysis, create a new file that implements the required functionality.
+
+            Analysis:
+            - Summary: {summary}
+            - Requirements: {requirements}
+            - Technical Approach: {technical_approach}
+            - Dependencies: {dependencies}
+
+            Rules:
+            1. Follow Python best practices and PEP 8
+            2. Add proper error handling
+            3. Include comprehensive docstrings
+            4. Add type hints
+            5. Include necessary imports
+            6. Add basic tests if it's a test file
+
+            Return only the complete file content, no explanations."""
+
+CREATE_USER_PROMPT_TMPL = """Create new file: {file_path}
+
+Please provide the complete file content that implements the required functionality."""
+
+
+def _prompt_fields(analysis: dict) -> dict[str, str]:
+    """Render the analysis fields shared by the generation prompt templates once."""
+    return {
+        "summary": analysis.get("summary", ""),
+        "requirements": ", ".join(analysis.get("requirements", [])),
+        "technical_approach": analysis.get("technical_approach", ""),
+        "dependencies": ", ".join(analysis.get("dependencies", [])),
+    }
+
 
 class CodeAgent:
     def __init__(self, github_client: GitHubClient, llm_client: OpenAIClient) -> None:
         self.github_client = github_client
         self.llm_client = llm_client
+        self._base_sha: str | None = None
+        self._repo_files_cache: dict[str, frozenset[str]] = {}
+        self._file_cache: dict[tuple[str, str], str] = {}
+
+    async def process_issue(self, issue_number: int) -> int | None:
+        self._base_sha = None
+        self._repo_files_cache.clear()
+        self._file_cache.clear()
 
-    async def process_issue(self, issue_number: int) -> Optional[int]:
         try:
             issue = self.github_client.get_issue(issue_number)
             logger.info(f"Processing issue #{issue_number}: {issue.title}")
@@ -38,12 +208,12 @@ class CodeAgent:
 
             pr_title = f"Fix #{issue_number}: {issue.title}"
             pr_body = self._generate_pr_description(issue, analysis)
-            
+
             pr = self.github_client.create_pull_request(
                 title=pr_title,
                 body=pr_body,
                 head_branch=branch_name,
-                base_branch="main"
+                base_branch="main",
             )
 
             logger.info(f"Created pull request #{pr.number} for issue #{issue_number}")
@@ -53,193 +223,328 @@ class CodeAgent:
             logger.error(f"Error processing issue {issue_number}: {e}")
             return None
 
-    async def _analyze_issue(self, title: str, body: str) -> Optional[Dict]:
+    async def _analyze_issue(self, title: str, body: str) -> dict | None:
         """Analyze issue requirements and determine what needs to be implemented."""
-        system_prompt = """You are an expert software developer analyzing GitHub issues.
-        Your task is to understand the requirements and provide a structured analysis.
-        
-        Analyze the issue and provide:
-        1. Summary of what needs to be implemented
-        2. List of files that need to be created or modified
-        3. Key functionality requirements
-        4. Technical approach
-        5. Dependencies or libraries needed
-        
-        Respond in JSON format with the following structure:
-        {
-            "summary": "Brief description of what needs to be implemented",
-            "files_to_modify": ["list", "of", "files"],
-            "files_to_create": ["list", "of", "new", "files"],
-            "requirements": ["list", "of", "key", "requirements"],
-            "technical_approach": "Description of how to implement",
-            "dependencies": ["list", "of", "dependencies"]
-        }"""
-
-        user_prompt = f"""Issue Title: {title}
+        system_prompt = ANALYZE_SYSTEM_PROMPT
 
-Issue Description:
-{body}
-
-Please analyze this issue and provide the structured response."""
+        user_prompt = ANALYZE_USER_PROMPT_TMPL.format_map(
+            {"title": title, "body": body}
+        )
 
         try:
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
             ]
-            
-            response = await self.llm_client.generate_response(messages)
 
-            import json
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            response = await self.llm_client.generate_response(messages, temperature=0)
+
+            json_text = extract_json(response)
+            if json_text:
+                return orjson.loads(json_text)
             else:
                 logger.error("Could not extract JSON from LLM response")
                 return None
-                
+
         except Exception as e:
             logger.error(f"Error analyzing issue: {e}")
             return None
 
     async def _generate_and_apply_changes(
-        self, analysis: Dict, branch_name: str, issue_number: int
+        self, analysis: dict, branch_name: str, issue_number: int
     ) -> bool:
         try:
-            repo_files = self.github_client.list_repository_files()
+            repo_files = await self._list_repository_files()
+            prompt_fields = _prompt_fields(analysis)
+
+            generated_files = await self._generate_all_files(
+                analysis, prompt_fields, repo_files, issue_number
+            )
+            if generated_files is not None:
+                return await self._commit_files(generated_files, branch_name)
 
-            all_changes_applied = True
+            logger.warning(
+                "Multi-file generation failed, falling back to per-file requests"
+            )
 
+            # Generation runs concurrently; the commits below move the branch head one at a time
+            paths = []
+            tasks = []
             for file_path in analysis.get("files_to_modify", []):
                 if file_path in repo_files:
-                    success = await self._modify_existing_file(
-                        file_path, analysis, branch_name, issue_number
+                    paths.append(file_path)
+                    tasks.append(
+                        self._modify_existing_file(
+                            file_path, prompt_fields, issue_number
+                        )
                     )
-                    if not success:
-                        all_changes_applied = False
                 else:
                     logger.warning(f"File {file_path} not found in repository")
 
             for file_path in analysis.get("files_to_create", []):
-                success = await self._create_new_file(
-                    file_path, analysis, branch_name, issue_number
+                paths.append(file_path)
+                tasks.append(
+                    self._create_new_file(file_path, prompt_fields, issue_number)
                 )
-                if not success:
-                    all_changes_applied = False
 
-            return all_changes_applied
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            generated = {}
+            for file_path, result in zip(paths, results, strict=True):
+                if isinstance(result, BaseException) or result is None:
+                    # Nothing has been pushed yet, so the branch stays untouched
+                    logger.error(f"Error generating {file_path}: {result}")
+                    return False
+                generated[file_path] = result
+            return await self._commit_files(generated, branch_name)
 
         except Exception as e:
             logger.error(f"Error generating and applying changes: {e}")
             return False
 
-    async def _modify_existing_file(
-        self, file_path: str, analysis: Dict, branch_name: str, issue_number: int
-    ) -> bool:
-        try:
-            current_content = self.github_client.get_file_content(file_path, "main")
+    async def _get_base_sha(self) -> str:
+        if self._base_sha is None:
+            self._base_sha = await asyncio.to_thread(
+                self.github_client.get_branch_sha, "main"
+            )
+        return self._base_sha
+
+    async def _list_repository_files(self) -> frozenset[str]:
+        """List repository files on main, cached per base commit for the current run."""
+        base_sha = await self._get_base_sha()
+        if base_sha not in self._repo_files_cache:
+            repo_files = await asyncio.to_thread(
+                self.github_client.list_repository_files
+            )
+            # Only used for membership checks, so store as a set
+            self._repo_files_cache[base_sha] = frozenset(repo_files)
+        return self._repo_files_cache[base_sha]
+
+    async def _get_main_file_content(self, file_path: str) -> str:
+        """Get a file's content on main, cached per base commit for the current run."""
+        key = (await self._get_base_sha(), file_path)
+        if key not in self._file_cache:
+            self._file_cache[key] = await asyncio.to_thread(
+                self.github_client.get_file_content, file_path, "main"
+            )
+        return self._file_cache[key]
+
+    async def _generate_all_files(
+        self,
+        analysis: dict,
+        prompt_fields: dict[str, str],
+        repo_files: frozenset[str],
+        issue_number: int,
+    ) -> dict[str, tuple[str, str]] | None:
+        """Generate all modified and created files with a single LLM request.
+
+        Returns a mapping of file path to (content, commit message), or None if
+        the combined response could not be used and per-file generation is needed.
+        """
+        files_to_modify = []
+        for file_path in analysis.get("files_to_modify", []):
+            if file_path in repo_files:
+                files_to_modify.append(file_path)
+            else:
+                logger.warning(f"File {file_path} not found in repository")
+        files_to_create = list(analysis.get("files_to_create", []))
 
-            system_prompt = f"""You are an expert software developer modifying code files.
-            
-            Based on the issue analysis, modify the existing file to implement the required functionality.
-            
-            Analysis:
-            - Summary: {analysis.get('summary', '')}
-            - Requirements: {', '.join(analysis.get('requirements', []))}
-            - Technical Approach: {analysis.get('technical_approach', '')}
-            
-            Rules:
-            1. Preserve existing functionality unless it conflicts with requirements
-            2. Follow Python best practices and PEP 8
-            3. Add proper error handling
-            4. Include docstrings for new functions/classes
-            5. Add type hints where appropriate
-            
-            Return only the complete modified file content, no explanations."""
+        if not files_to_modify and not files_to_create:
+            return {}
+
+        try:
+            current_contents = await asyncio.gather(
+                *(
+                    self._get_main_file_content(file_path)
+                    for file_path in files_to_modify
+                )
+            )
 
-            user_prompt = f"""File to modify: {file_path}
+            system_prompt = MULTI_FILE_SYSTEM_PROMPT_TMPL.format_map(prompt_fields)
 
-Current content:
-```
-{current_content}
-```
+            sections = []
+            for file_path, current_content in zip(
+                files_to_modify, current_contents, strict=True
+            ):
+                sections.append(
+                    MODIFY_FILE_SECTION_TMPL.format_map(
+                        {"file_path": file_path, "current_content": current_content}
+                    )
+                )
+            for file_path in files_to_create:
+                sections.append(f"Create new file: {file_path}")
 
-Please provide the modified file content that implements the required functionality."""
+            user_prompt = (
+                "\n\n".join(sections)
+                + "\n\nPlease provide the complete content of every file listed above."
+            )
 
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
+            ]
+
+            response = await self.llm_client.generate_response(
+                messages, max_tokens=MULTI_FILE_MAX_TOKENS
+            )
+
+            json_text = extract_json(response)
+            if not json_text:
+                logger.error("Could not extract JSON from multi-file LLM response")
+                return None
+
+            # A truncated response (max_tokens reached) fails to parse or misses files
+            files = orjson.loads(json_text)
+            if not isinstance(files, dict):
+                return None
+            missing = [
+                p
+                for p in files_to_modify + files_to_create
+                if not isinstance(files.get(p), str)
             ]
-            
-            modified_content = await self.llm_client.generate_response(messages)
+            if missing:
+                logger.error(f"Multi-file LLM response is missing files: {missing}")
+                return None
 
-            modified_content = re.sub(r'^```[a-zA-Z]*\n', '', modified_content)
-            modified_content = re.sub(r'\n```$', '', modified_content)
+            generated = {}
+            for file_path in files_to_modify:
+                generated[file_path] = (
+                    _strip_fences(files[file_path]),
+                    f"Modify {file_path} for issue #{issue_number}",
+                )
+            for file_path in files_to_create:
+                generated[file_path] = (
+                    _strip_fences(files[file_path]),
+                    f"Create {file_path} for issue #{issue_number}",
+                )
+            return generated
+
+        except Exception as e:
+            logger.error(f"Error generating files: {e}")
+            return None
 
-            commit_message = f"Modify {file_path} for issue #{issue_number}"
-            self.github_client.update_file(
-                file_path, modified_content, commit_message, branch_name
+    async def _commit_files(
+        self, files: dict[str, tuple[str, str]], branch_name: str
+    ) -> bool:
+        """Commit each (content, message) in turn; stops at the first failure.
+
+        Every Contents API write moves the branch head, so concurrent writes to
+        the same branch conflict with each other.
+        """
+        for file_path, (content, message) in files.items():
+            if not await self._commit_file(file_path, content, message, branch_name):
+                return False
+        return True
+
+    async def _commit_file(
+        self, file_path: str, content: str, commit_message: str, branch_name: str
+    ) -> bool:
+        try:
+            await asyncio.to_thread(
+                self.github_client.update_file,
+                file_path,
+                content,
+                commit_message,
+                branch_name,
             )
-            
-            logger.info(f"Modified file {file_path}")
+
+            logger.info(f"Committed file {file_path}")
             return True
 
         except Exception as e:
-            logger.error(f"Error modifying file {file_path}: {e}")
+            logger.error(f"Error committing file {file_path}: {e}")
             return False
 
-    async def _create_new_file(
-        self, file_path: str, analysis: Dict, branch_name: str, issue_number: int
-    ) -> bool:
+    async def _modify_existing_file(
+        self, file_path: str, prompt_fields: dict[str, str], issue_number: int
+    ) -> tuple[str, str] | None:
+        """Generate the modified file; returns (content, commit message) or None."""
         try:
-            system_prompt = f"""You are an expert software developer creating new code files.
-            
-            Based on the issue analysis, create a new file that implements the required functionality.
-            
-            Analysis:
-            - Summary: {analysis.get('summary', '')}
-            - Requirements: {', '.join(analysis.get('requirements', []))}
-            - Technical Approach: {analysis.get('technical_approach', '')}
-            - Dependencies: {', '.join(analysis.get('dependencies', []))}
-            
-            Rules:
-            1. Follow Python best practices and PEP 8
-            2. Add proper error handling
-            3. Include comprehensive docstrings
-            4. Add type hints
-            5. Include necessary imports
-            6. Add basic tests if it's a test file
-            
-            Return only the complete file content, no explanations."""
+            current_content = await self._get_main_file_content(file_path)
+
+            modified_content = await self._generate_file_patch(
+                file_path, current_content, prompt_fields
+            )
+            if modified_content is None:
+                logger.warning(
+                    f"Diff for {file_path} did not apply cleanly, requesting full file"
+                )
+                modified_content = await self._generate_full_file(
+                    file_path, current_content, prompt_fields
+                )
 
-            user_prompt = f"""Create new file: {file_path}
+            return modified_content, f"Modify {file_path} for issue #{issue_number}"
 
-Please provide the complete file content that implements the required functionality."""
+        except Exception as e:
+            logger.error(f"Error modifying file {file_path}: {e}")
+            return None
+
+    async def _generate_file_patch(
+        self, file_path: str, current_content: str, prompt_fields: dict[str, str]
+    ) -> str | None:
+        """Ask for a unified diff and apply it; None if it does not apply cleanly."""
+        system_prompt = MODIFY_DIFF_SYSTEM_PROMPT_TMPL.format_map(prompt_fields)
+
+        user_prompt = MODIFY_DIFF_USER_PROMPT_TMPL.format_map(
+            {"file_path": file_path, "numbered_content": number_lines(current_content)}
+        )
+
+        messages = [
+            self.llm_client.create_system_message(system_prompt),
+            self.llm_client.create_user_message(user_prompt),
+        ]
+
+        diff_text = _strip_fences(
+            (await self.llm_client.generate_response(messages)).strip()
+        )
+
+        return apply_unified_diff(current_content, diff_text)
+
+    async def _generate_full_file(
+        self, file_path: str, current_content: str, prompt_fields: dict[str, str]
+    ) -> str:
+        system_prompt = MODIFY_SYSTEM_PROMPT_TMPL.format_map(prompt_fields)
+
+        user_prompt = MODIFY_USER_PROMPT_TMPL.format_map(
+            {"file_path": file_path, "current_content": current_content}
+        )
+
+        messages = [
+            self.llm_client.create_system_message(system_prompt),
+            self.llm_client.create_user_message(user_prompt),
+        ]
+
+        modified_content = await self.llm_client.generate_response(messages)
+
+        return _strip_fences(modified_content)
+
+    async def _create_new_file(
+        self, file_path: str, prompt_fields: dict[str, str], issue_number: int
+    ) -> tuple[str, str] | None:
+        """Generate the new file; returns (content, commit message) or None."""
+        try:
+            system_prompt = CREATE_SYSTEM_PROMPT_TMPL.format_map(prompt_fields)
+
+            user_prompt = CREATE_USER_PROMPT_TMPL.format_map({"file_path": file_path})
 
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
             ]
-            
-            file_content = await self.llm_client.generate_response(messages)
 
-            file_content = re.sub(r'^```[a-zA-Z]*\n', '', file_content)
-            file_content = re.sub(r'\n```$', '', file_content)
+            file_content = await self.llm_client.generate_response(messages)
 
-            commit_message = f"Create {file_path} for issue #{issue_number}"
-            self.github_client.update_file(
-                file_path, file_content, commit_message, branch_name
+            return (
+                _strip_fences(file_content),
+                f"Create {file_path} for issue #{issue_number}",
             )
-            
-            logger.info(f"Created file {file_path}")
-            return True
 
         except Exception as e:
             logger.error(f"Error creating file {file_path}: {e}")
-            return False
+            return None
 
-    def _generate_pr_description(self, issue, analysis: Dict) -> str:
-        description = f"""## Fixes #{issue.number}
+    def _generate_pr_description(self, issue, analysis: dict) -> str:
+        parts: list[str] = [
+            f"""## Fixes #{issue.number}
 
 **Issue Title:** {issue.title}
 
@@ -247,29 +552,32 @@ Please provide the complete file content that implements the required functional
 
 ### Changes Made:
 """
-        
-        if analysis.get('files_to_create'):
-            description += "\n**New Files:**\n"
-            for file_path in analysis['files_to_create']:
-                description += f"- `{file_path}`\n"
-        
-        if analysis.get('files_to_modify'):
-            description += "\n**Modified Files:**\n"
-            for file_path in analysis['files_to_modify']:
-                description += f"- `{file_path}`\n"
-
-        if analysis.get('requirements'):
-            description += "\n**Requirements Implemented:**\n"
-            for req in analysis['requirements']:
-                description += f"- {req}\n"
-
-        if analysis.get('technical_approach'):
-            description += f"\n**Technical Approach:**\n{analysis['technical_approach']}\n"
-
-        description += "\n### Testing\n"
-        description += "- Code follows project standards\n"
-        description += "- All tests pass\n"
-        description += "- No linting errors\n"
-        description += "- Functionality works as expected\n"
-
-        return description
\ No newline at end of file
+        ]
+
+        if analysis.get("files_to_create"):
+            parts.append("\n**New Files:**\n")
+            for file_path in analysis["files_to_create"]:
+                parts.append(f"- `{file_path}`\n")
+
+        if analysis.get("files_to_modify"):
+            parts.append("\n**Modified Files:**\n")
+            for file_path in analysis["files_to_modify"]:
+                parts.append(f"- `{file_path}`\n")
+
+        if analysis.get("requirements"):
+            parts.append("\n**Requirements Implemented:**\n")
+            for req in analysis["requirements"]:
+                parts.append(f"- {req}\n")
+
+        if analysis.get("technical_approach"):
+            parts.append(
+                f"\n**Technical Approach:**\n{analysis['technical_approach']}\n"
+            )
+
+        parts.append("\n### Testing\n")
+        parts.append("- Code follows project standards\n")
+        parts.append("- All tests pass\n")
+        parts.append("- No linting errors\n")
+        parts.append("- Functionality works as expected\n")
+
+        return "".join(parts)
@@ -1,18 +1,23 @@
-import os
-from typing import Optional
+from collections.abc import Mapping
+from contextvars import ContextVar
+from functools import lru_cache
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
+# Set while from_env builds settings, so only the given mapping is read
+_from_mapping: ContextVar[bool] = ContextVar("_from_mapping", default=False)
+
+
+class AgentSettings(BaseSettings):
+    """Settings shared by the CLI Config and the GitHub App Settings."""
 
-class Config(BaseSettings):
-    openai_api_key: str = Field(..., env="OPENAI_API_KEY")
     openai_model: str = Field(default="gpt-4o-mini", env="OPENAI_MODEL")
-    openai_base_url: str = Field(default="https://openrouter.ai/api/v1/chat/completions", env="OPENAI_BASE_URL")  
+    openai_base_url: str = Field(
+        default="https://openrouter.ai/api/v1/chat/completions", env="OPENAI_BASE_URL"
+    )
 
-    github_token: str = Field(..., env="GITHUB_TOKEN")
-    github_repo_owner: str = Field(..., env="GITHUB_REPO_OWNER")
-    github_repo_name: str = Field(..., env="GITHUB_REPO_NAME")
+    llm_concurrency: int = Field(default=8, env="LLM_CONCURRENCY")
 
     max_iterations: int = Field(default=5, env="MAX_ITERATIONS")
     code_agent_name: str = Field(default="AI Code Agent", env="CODE_AGENT_NAME")
@@ -31,8 +36,44 @@ class Config(BaseSettings):
         env_file_encoding = "utf-8"
         case_sensitive = False
 
+    @classmethod
+    def from_env(cls, env: Mapping[str, str]):
+        """Build settings from env alone, ignoring os.environ and the .env file."""
+        lowered = {key.lower(): value for key, value in env.items()}
+        values = {name: lowered[name] for name in cls.model_fields if name in lowered}
+        token = _from_mapping.set(True)
+        try:
+            return cls(**values)
+        finally:
+            _from_mapping.reset(token)
+
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls,
+        init_settings,
+        env_settings,
+        dotenv_settings,
+        file_secret_settings,
+    ):
+        if _from_mapping.get():
+            return (init_settings,)
+        return init_settings, env_settings, dotenv_settings, file_secret_settings
+
+
+class Config(AgentSettings):
+    openai_api_key: str = Field(..., env="OPENAI_API_KEY")
+
+    github_token: str = Field(..., env="GITHUB_TOKEN")
+    github_repo_owner: str = Field(..., env="GITHUB_REPO_OWNER")
+    github_repo_name: str = Field(..., env="GITHUB_REPO_NAME")
+
     @property
     def github_repo_url(self) -> str:
         return f"https://github.com/{self.github_repo_owner}/{self.github_repo_name}"
 
-config = Config()
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Return the shared Config, loading it on first use."""
+    return Config()
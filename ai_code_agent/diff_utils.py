@@ -0,0 +1,107 @@
+"""Apply unified diffs produced by the LLM to file content."""
+
+import re
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def number_lines(content: str) -> str:
+    """Prefix every line with its 1-based line number for diff prompts."""
+    return "\n".join(
+        f"{number:>4} | {line}" for number, line in enumerate(content.splitlines(), 1)
+    )
+
+
+def _parse_hunks(diff_text: str) -> list[tuple[int, list[str], list[str]]] | None:
+    hunks = []
+    current = None
+    # Lines the current hunk header still promises on each side
+    old_left = new_left = 0
+    for line in diff_text.split("\n"):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+            old_left = int(header.group(2) or 1)
+            new_left = int(header.group(4) or 1)
+            continue
+        if current is None or line.startswith("\\"):
+            continue
+        # Within the header's counts "--- x" removes "-- x" and "+++ x" adds
+        # "++ x"; only past them can it be a file header
+        if old_left <= 0 and new_left <= 0 and line.startswith(("--- ", "+++ ")):
+            continue
+
+        _, old_lines, new_lines = current
+        if line.startswith("-"):
+            old_lines.append(line[1:])
+            old_left -= 1
+        elif line.startswith("+"):
+            new_lines.append(line[1:])
+            new_left -= 1
+        else:
+            # Models often drop the leading space on blank context lines
+            context = line[1:] if line.startswith(" ") else line
+            old_lines.append(context)
+            new_lines.append(context)
+            old_left -= 1
+            new_left -= 1
+
+    # Trailing blank lines after the last hunk are separators, not context
+    if hunks:
+        _, old_lines, new_lines = hunks[-1]
+        while old_lines and new_lines and old_lines[-1] == "" and new_lines[-1] == "":
+            old_lines.pop()
+            new_lines.pop()
+
+    return hunks or None
+
+
+def _find_block(lines: list[str], block: list[str], expected: int, start: int) -> int:
+    """Locate block in lines at or after start, preferring the expected index."""
+    size = len(block)
+    if lines[expected : expected + size] == block and expected >= start:
+        return expected
+    for index in range(start, len(lines) - size + 1):
+        if lines[index : index + size] == block:
+            return index
+    return -1
+
+
+def apply_unified_diff(original: str, diff_text: str) -> str | None:
+    """Apply a unified diff to original.
+
+    Hunks are matched on their content rather than trusting the line numbers,
+    which models often get slightly wrong. Returns None if any hunk does not
+    apply cleanly so the caller can fall back to requesting the full file.
+    """
+    hunks = _parse_hunks(diff_text)
+    if not hunks:
+        return None
+
+    had_trailing_newline = original.endswith("\n")
+    lines = original.split("\n")
+    if had_trailing_newline:
+        lines.pop()
+
+    result: list[str] = []
+    position = 0
+    for old_start, old_lines, new_lines in hunks:
+        if old_lines:
+            index = _find_block(lines, old_lines, max(old_start - 1, 0), position)
+            if index < 0:
+                return None
+        else:
+            # Pure insertion after line old_start
+            index = old_start
+            if index < position or index > len(lines):
+                return None
+        result.extend(lines[position:index])
+        result.extend(new_lines)
+        position = index + len(old_lines)
+
+    result.extend(lines[position:])
+    patched = "\n".join(result)
+    if had_trailing_newline:
+        patched += "\n"
+    return patched
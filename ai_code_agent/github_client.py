@@ -1,21 +1,22 @@
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any
 
-import git
 from github import Github
 from github.Issue import Issue
 from github.PullRequest import PullRequest
-from github.Repository import Repository
 
 logger = logging.getLogger(__name__)
 
+# Largest page size GitHub's list endpoints accept; PyGithub defaults to 30
+PER_PAGE = 100
+
 
 class GitHubClient:
     def __init__(self, github_token: str, repo_owner: str, repo_name: str) -> None:
         self.github_token = github_token
         self.repo_owner = repo_owner
         self.repo_name = repo_name
-        self.github = Github(self.github_token)
+        self.github = Github(self.github_token, per_page=PER_PAGE)
         self.repo = self.github.get_repo(f"{self.repo_owner}/{self.repo_name}")
 
     def get_issue(self, issue_number: int) -> Issue:
@@ -31,6 +32,7 @@ class GitHubClient:
         except Exception as e:
             logger.error(f"Error getting pull request {pr_number}: {e}")
             raise
+
     def create_pull_request(
         self,
         title: str,
@@ -41,9 +43,7 @@ class GitHubClient:
 
         compare = self.repo.compare(base_branch, head_branch)
         if compare.ahead_by == 0:
-            raise ValueError(
-                f"Cannot create PR: branch '{head_branch}' has no changes"
-            )
+            raise ValueError(f"Cannot create PR: branch '{head_branch}' has no changes")
 
         head = f"{self.repo_owner}:{head_branch}"
 
@@ -70,21 +70,23 @@ class GitHubClient:
             logger.error(f"Error adding comment to PR {pr_number}: {e}")
             raise
 
-    def get_pr_files(self, pr_number: int) -> List[Dict[str, Any]]:
+    def get_pr_files(self, pr_number: int) -> list[dict[str, Any]]:
         """Get files changed in a pull request."""
         try:
             pr = self.get_pull_request(pr_number)
             files = []
             for file in pr.get_files():
-                files.append({
-                    "filename": file.filename,
-                    "status": file.status,
-                    "additions": file.additions,
-                    "deletions": file.deletions,
-                    "changes": file.changes,
-                    "patch": file.patch,
-                    "raw_url": file.raw_url,
-                })
+                files.append(
+                    {
+                        "filename": file.filename,
+                        "status": file.status,
+                        "additions": file.additions,
+                        "deletions": file.deletions,
+                        "changes": file.changes,
+                        "patch": file.patch,
+                        "raw_url": file.raw_url,
+                    }
+                )
             return files
         except Exception as e:
             logger.error(f"Error getting PR files for {pr_number}: {e}")
@@ -99,7 +101,7 @@ class GitHubClient:
             logger.error(f"Error getting PR diff for {pr_number}: {e}")
             raise
 
-    def close_issue(self, issue_number: int, comment: Optional[str] = None) -> None:
+    def close_issue(self, issue_number: int, comment: str | None = None) -> None:
         """Close an issue with optional comment."""
         try:
             issue = self.get_issue(issue_number)
@@ -116,15 +118,24 @@ class GitHubClient:
         try:
             base_ref = self.repo.get_git_ref(f"heads/{base_branch}")
             self.repo.create_git_ref(
-                ref=f"refs/heads/{branch_name}",
-                sha=base_ref.object.sha
+                ref=f"refs/heads/{branch_name}", sha=base_ref.object.sha
             )
             logger.info(f"Created branch {branch_name} from {base_branch}")
         except Exception as e:
             logger.error(f"Error creating branch {branch_name}: {e}")
             raise
 
-    def update_file(self, file_path: str, content: str, commit_message: str, branch: str) -> None:
+    def get_branch_sha(self, branch: str = "main") -> str:
+        """Get the head commit SHA of a branch."""
+        try:
+            return self.repo.get_git_ref(f"heads/{branch}").object.sha
+        except Exception as e:
+            logger.error(f"Error getting SHA of branch {branch}: {e}")
+            raise
+
+    def update_file(
+        self, file_path: str, content: str, commit_message: str, branch: str
+    ) -> None:
         try:
             try:
                 file = self.repo.get_contents(file_path, ref=branch)
@@ -171,7 +182,7 @@ class GitHubClient:
             logger.error(f"Error getting file content {file_path}: {e}")
             raise
 
-    def list_repository_files(self, path: str = "", branch: str = "main") -> List[str]:
+    def list_repository_files(self, path: str = "", branch: str = "main") -> list[str]:
         try:
             contents = self.repo.get_contents(path, ref=branch)
             files = []
@@ -183,4 +194,4 @@ class GitHubClient:
             return files
         except Exception as e:
             logger.error(f"Error listing repository files: {e}")
-            raise
\ No newline at end of file
+            raise
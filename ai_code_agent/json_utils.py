@@ -0,0 +1,74 @@
+"""Helpers for pulling JSON out of free-form LLM responses."""
+
+import orjson
+
+
+class JsonObjectScanner:
+    """Find the first balanced JSON object in text that arrives in pieces.
+
+    Tracks brace depth from the first "{", skipping braces that appear inside
+    string literals, so a streamed response can stop as soon as the object
+    closes.
+    """
+
+    def __init__(self) -> None:
+        self.result: str | None = None
+        self._parts: list[str] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> str | None:
+        """Scan the next piece; returns the object once it is complete."""
+        if self.result is not None:
+            return self.result
+
+        offset = 0
+        if not self._started:
+            offset = text.find("{")
+            if offset == -1:
+                return None
+            self._started = True
+
+        for i in range(offset, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[offset : i + 1])
+                    self.result = "".join(self._parts)
+                    self._parts = []
+                    return self.result
+
+        self._parts.append(text[offset:])
+        return None
+
+
+def extract_json(text: str) -> str | None:
+    """Return the first balanced JSON object in text, or None if there is none.
+
+    Scans once from the first "{", tracking brace depth and skipping braces
+    that appear inside string literals. A response that is nothing but an
+    object skips the scan.
+    """
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            if isinstance(orjson.loads(stripped), dict):
+                return stripped
+        except orjson.JSONDecodeError:
+            pass
+
+    return JsonObjectScanner().feed(text)
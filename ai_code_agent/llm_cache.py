@@ -0,0 +1,99 @@
+"""Content-addressed cache for deterministic LLM responses."""
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai_code_agent")
+
+
+def make_cache_key(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    payload = orjson.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+class LLMCache:
+    """In-memory LRU cache of LLM responses with optional disk persistence."""
+
+    def __init__(self, maxsize: int = 512, cache_dir: str | None = None) -> None:
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self.stats: dict[str, int] = {"hits": 0, "misses": 0}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, key: str) -> str | None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._entries[key]
+
+        content = self._read_from_disk(key)
+        if content is not None:
+            self._store(key, content)
+            self.stats["hits"] += 1
+            return content
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, content: str) -> None:
+        self._store(key, content)
+        self._write_to_disk(key, content)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, content: str) -> None:
+        self._entries[key] = content
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_from_disk(self, key: str) -> str | None:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return orjson.loads(f.read())["content"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read LLM cache entry {key}: {e}")
+            return None
+
+    def _write_to_disk(self, key: str, content: str) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            with open(self._path(key), "wb") as f:
+                f.write(orjson.dumps({"content": content}))
+        except Exception as e:
+            logger.warning(f"Failed to write LLM cache entry {key}: {e}")
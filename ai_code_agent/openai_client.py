@@ -1,66 +1,224 @@
-import json
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import random
+import time
+from collections.abc import Callable
 
-import aiohttp
-import requests
+import openai
 from openai import AsyncOpenAI
 
+from ._http import shared_httpx
+from .llm_cache import LLMCache, make_cache_key
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_LLM_CONCURRENCY = 8
+MAX_RETRY_ATTEMPTS = 5
+MAX_RETRY_WAIT = 30.0
+
+_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying, honoring Retry-After when given."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_WAIT)
+            except ValueError:
+                pass
+    # Full jitter keeps concurrent callers from retrying in lockstep
+    return random.uniform(0, min(MAX_RETRY_WAIT, 2**attempt))
+
 
 class OpenAIClient:
     def __init__(
         self,
-        openai_api_key: Optional[str] = None,
-        openai_model: str = "gpt-4o-mini",    
-        openai_base_url: Optional[str] = None,
+        openai_api_key: str | None = None,
+        openai_model: str = "gpt-4o-mini",
+        openai_base_url: str | None = None,
+        cache: LLMCache | None = None,
+        first_token_timeout_ms: int | None = None,
+        max_concurrency: int = DEFAULT_LLM_CONCURRENCY,
     ) -> None:
         self.openai_model = openai_model
+        self.cache = cache if cache is not None else LLMCache()
+        self.first_token_timeout_ms = first_token_timeout_ms
+        self.last_first_token_ms: float | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: dict[str, asyncio.Future[str]] = {}
 
         if not openai_api_key:
             raise ValueError("OpenAI API key is required")
+        self._openai_api_key = openai_api_key
+        self._openai_base_url = openai_base_url
         try:
-            if openai_base_url:
-                self.openai_client = AsyncOpenAI(
-                    api_key=openai_api_key,
-                    base_url=openai_base_url,
-                )
-            else:
-                self.openai_client = AsyncOpenAI(
-                    api_key=openai_api_key
-                )
-
+            self._connect()
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {e}")
             raise
 
+    def _connect(self) -> None:
+        """Build the API client on the current shared connection pool."""
+        self._http_client = shared_httpx()
+        if self._openai_base_url:
+            self.openai_client = AsyncOpenAI(
+                api_key=self._openai_api_key,
+                base_url=self._openai_base_url,
+                http_client=self._http_client,
+                max_retries=0,
+            )
+        else:
+            self.openai_client = AsyncOpenAI(
+                api_key=self._openai_api_key,
+                http_client=self._http_client,
+                max_retries=0,
+            )
+
     async def generate_response(
         self,
-        messages: List[Dict[str, str]],
+        messages: list[dict[str, str]],
         max_tokens: int = 4000,
         temperature: float = 0.7,
+        on_token: Callable[[str], None] | None = None,
+        until: Callable[[str], bool] | None = None,
     ) -> str:
+        """Stream a chat completion and return the full response text.
+
+        on_token is called with every non-empty content delta as it arrives.
+        until is called the same way; once it returns True the stream is
+        closed and the text so far returned. Concurrent identical deterministic
+        requests share one API call; callers that join an in-flight request
+        only receive the final text.
+        """
         if not self.openai_client:
-            raise ValueError(f"OpenAI client is not initialized")
-        
-        try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.openai_model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+            raise ValueError("OpenAI client is not initialized")
+
+        # Only deterministic, complete responses are safe to serve from the cache
+        cache_key = None
+        if temperature <= 0.01 and until is None:
+            cache_key = make_cache_key(
+                self.openai_model, messages, temperature, max_tokens
             )
-            return response.choices[0].message.content or ""
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            inflight = self._inflight.get(cache_key)
+            if inflight is not None:
+                # Shield so a cancelled waiter doesn't cancel the shared request
+                return await asyncio.shield(inflight)
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[cache_key] = future
+
+        try:
+            async with self._semaphore:
+                content = await self._stream_completion(
+                    messages, max_tokens, temperature, on_token, until
+                )
+            if cache_key is not None:
+                self.cache.set(cache_key, content)
+                future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            if cache_key is not None:
+                future.cancel()
+            raise
         except Exception as e:
+            if cache_key is not None:
+                future.set_exception(e)
+                # The caller gets the error from the raise below; mark it
+                # retrieved so an unawaited future doesn't log a warning
+                future.exception()
             logger.error(f"Error generating OpenAI response: {e}")
             raise
+        finally:
+            if cache_key is not None:
+                del self._inflight[cache_key]
+
+    async def _create_stream(
+        self,
+        messages: list[dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+    ):
+        """Open a completion stream, retrying rate limits and connection errors."""
+        if self._http_client.is_closed:
+            # The pool was closed with the event loop of an earlier asyncio.run
+            self._connect()
+        for attempt in range(MAX_RETRY_ATTEMPTS):
+            try:
+                return await self.openai_client.chat.completions.create(
+                    model=self.openai_model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                )
+            except _RETRYABLE_ERRORS as e:
+                if attempt == MAX_RETRY_ATTEMPTS - 1:
+                    raise
+                delay = _retry_delay(e, attempt)
+                logger.warning(
+                    f"OpenAI request failed ({type(e).__name__}), "
+                    f"retrying in {delay:.1f}s ({attempt + 1}/{MAX_RETRY_ATTEMPTS})"
+                )
+                await asyncio.sleep(delay)
+
+    async def _stream_completion(
+        self,
+        messages: list[dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        on_token: Callable[[str], None] | None,
+        until: Callable[[str], bool] | None = None,
+    ) -> str:
+        started = time.perf_counter()
+        stream = await self._create_stream(messages, max_tokens, temperature)
+
+        chunks = stream.__aiter__()
+        first_token_ms = None
+        parts: list[str] = []
+        while True:
+            try:
+                if first_token_ms is None and self.first_token_timeout_ms:
+                    chunk = await asyncio.wait_for(
+                        chunks.__anext__(), self.first_token_timeout_ms / 1000
+                    )
+                else:
+                    chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                break
+
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+                self.last_first_token_ms = first_token_ms
+                logger.debug(f"First token received after {first_token_ms:.0f} ms")
+
+            parts.append(delta)
+            if on_token:
+                on_token(delta)
+            if until and until(delta):
+                # Stop paying for tokens the caller has no use for
+                await stream.close()
+                break
+
+        return "".join(parts)
 
-    def create_system_message(self, content: str) -> Dict[str, str]:
+    def create_system_message(self, content: str) -> dict[str, str]:
         return {"role": "system", "content": content}
 
-    def create_user_message(self, content: str) -> Dict[str, str]:
+    def create_user_message(self, content: str) -> dict[str, str]:
         return {"role": "user", "content": content}
 
-    def create_assistant_message(self, content: str) -> Dict[str, str]:
-        return {"role": "assistant", "content": content}
\ No newline at end of file
+    def create_assistant_message(self, content: str) -> dict[str, str]:
+        return {"role": "assistant", "content": content}
@@ -1,28 +1,42 @@
 """AI Reviewer Agent for analyzing pull requests and providing feedback."""
 
-import asyncio
-import json
 import logging
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Optional
 
-from .github_client import GitHubClient
+import orjson
+
+from .json_utils import extract_json
 from .openai_client import OpenAIClient
 
+if TYPE_CHECKING:
+    # PyGithub and GitPython are slow to import and the app never passes a client
+    from .github_client import GitHubClient
+
 logger = logging.getLogger(__name__)
 
+# Closing keywords first, then any bare issue reference
+_ISSUE_REFS = (
+    re.compile(r"(?:fix|fixes|close|closes|resolve|resolves)\s*#(\d+)"),
+    re.compile(r"#(\d+)"),
+)
+
 
 class ReviewerAgent:
-    def __init__(self, github_client: GitHubClient, llm_client: OpenAIClient) -> None:
+    def __init__(
+        self, github_client: Optional["GitHubClient"], llm_client: OpenAIClient
+    ) -> None:
+        # Only review_pull_request and comment posting use the GitHub client;
+        # callers that pass PR data to _perform_comprehensive_review can omit it
         self.github_client = github_client
         self.llm_client = llm_client
 
-    async def review_pull_request(self, pr_number: int) -> Dict[str, any]:
+    async def review_pull_request(self, pr_number: int) -> dict[str, any]:
         try:
             logger.info(f"Starting review of pull request #{pr_number}")
-            
+
             pr = self.github_client.get_pull_request(pr_number)
-            
+
             issue_number = self._extract_issue_number(pr.title, pr.body or "")
             issue = None
             if issue_number:
@@ -32,13 +46,13 @@ class ReviewerAgent:
                     logger.warning(f"Could not fetch issue #{issue_number}: {e}")
 
             pr_files = self.github_client.get_pr_files(pr_number)
-            
+
             review_result = await self._perform_comprehensive_review(
                 pr, issue, pr_files
             )
-            
+
             await self._post_review_results(pr_number, review_result)
-            
+
             logger.info(f"Completed review of pull request #{pr_number}")
             return review_result
 
@@ -47,44 +61,42 @@ class ReviewerAgent:
             return {"status": "error", "message": str(e)}
 
     async def _perform_comprehensive_review(
-        self, pr, issue, pr_files: List[Dict]
-    ) -> Dict[str, any]:
+        self, pr, issue, pr_files: list[dict]
+    ) -> dict[str, any]:
         try:
             code_quality_result = await self._analyze_code_quality(pr_files)
-            
+
             requirements_result = await self._check_requirements_compliance(
                 pr, issue, pr_files
             )
-            
+
             security_result = await self._analyze_security_and_practices(pr_files)
-            
+
             overall_assessment = await self._generate_overall_assessment(
-                code_quality_result,
-                requirements_result,
-                security_result,
-                pr,
-                issue
+                code_quality_result, requirements_result, security_result, pr, issue
             )
-            
+
             return {
                 "status": "completed",
                 "overall_assessment": overall_assessment,
                 "code_quality": code_quality_result,
                 "requirements_compliance": requirements_result,
                 "security_analysis": security_result,
-                "recommendation": overall_assessment.get("recommendation", "needs_work"),
-                "score": overall_assessment.get("score", 0)
+                "recommendation": overall_assessment.get(
+                    "recommendation", "needs_work"
+                ),
+                "score": overall_assessment.get("score", 0),
             }
 
         except Exception as e:
             logger.error(f"Error performing comprehensive review: {e}")
             return {"status": "error", "message": str(e)}
 
-    async def _analyze_code_quality(self, pr_files: List[Dict]) -> Dict[str, any]:
+    async def _analyze_code_quality(self, pr_files: list[dict]) -> dict[str, any]:
         """Analyze code quality of the changes."""
         try:
             system_prompt = """You are an expert code reviewer focusing on code quality.
-            
+
             Analyze the provided code changes and evaluate:
             1. Code structure and organization
             2. Naming conventions
@@ -94,7 +106,7 @@ class ReviewerAgent:
             6. Type hints usage
             7. Code complexity
             8. Potential bugs or issues
-            
+
             Provide a JSON response with:
             {
                 "score": 0-100,
@@ -108,7 +120,9 @@ class ReviewerAgent:
             code_changes = []
             for file_info in pr_files:
                 if file_info.get("patch"):
-                    code_changes.append(f"File: {file_info['filename']}\n{file_info['patch']}")
+                    code_changes.append(
+                        f"File: {file_info['filename']}\n{file_info['patch']}"
+                    )
 
             user_prompt = f"""Please analyze the following code changes:
 
@@ -118,42 +132,46 @@ Provide your code quality analysis."""
 
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
             ]
-            
-            response = await self.llm_client.generate_response(messages)
-            
+
+            response = await self.llm_client.generate_response(messages, temperature=0)
+
             # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            json_text = extract_json(response)
+            if json_text:
+                return orjson.loads(json_text)
             else:
-                return {"score": 50, "summary": "Could not parse analysis", "issues": []}
+                return {
+                    "score": 50,
+                    "summary": "Could not parse analysis",
+                    "issues": [],
+                }
 
         except Exception as e:
             logger.error(f"Error analyzing code quality: {e}")
             return {"score": 0, "summary": f"Analysis failed: {str(e)}", "issues": []}
 
     async def _check_requirements_compliance(
-        self, pr, issue, pr_files: List[Dict]
-    ) -> Dict[str, any]:
+        self, pr, issue, pr_files: list[dict]
+    ) -> dict[str, any]:
         """Check if the PR meets the requirements from the issue."""
         try:
             if not issue:
                 return {
                     "score": 50,
                     "summary": "No related issue found for requirements check",
-                    "compliance_items": []
+                    "compliance_items": [],
                 }
 
             system_prompt = """You are an expert at verifying if code changes meet specified requirements.
-            
+
             Compare the issue requirements with the implemented changes and evaluate:
             1. Are all requirements addressed?
             2. Is the implementation correct?
             3. Are there any missing features?
             4. Does the solution match the expected approach?
-            
+
             Provide a JSON response with:
             {
                 "score": 0-100,
@@ -163,11 +181,15 @@ Provide your code quality analysis."""
             }"""
 
             # Prepare analysis data
-            issue_content = f"Title: {issue.title}\nDescription: {issue.body or 'No description'}"
-            pr_content = f"Title: {pr.title}\nDescription: {pr.body or 'No description'}"
-            
+            issue_content = (
+                f"Title: {issue.title}\nDescription: {issue.body or 'No description'}"
+            )
+            pr_content = (
+                f"Title: {pr.title}\nDescription: {pr.body or 'No description'}"
+            )
+
             changed_files = [f"- {f['filename']} ({f['status']})" for f in pr_files]
-            
+
             user_prompt = f"""Issue Requirements:
 {issue_content}
 
@@ -181,15 +203,15 @@ Please analyze if the implementation meets the requirements."""
 
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
             ]
-            
-            response = await self.llm_client.generate_response(messages)
-            
+
+            response = await self.llm_client.generate_response(messages, temperature=0)
+
             # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            json_text = extract_json(response)
+            if json_text:
+                return orjson.loads(json_text)
             else:
                 return {"score": 50, "summary": "Could not parse compliance analysis"}
 
@@ -197,11 +219,13 @@ Please analyze if the implementation meets the requirements."""
             logger.error(f"Error checking requirements compliance: {e}")
             return {"score": 0, "summary": f"Compliance check failed: {str(e)}"}
 
-    async def _analyze_security_and_practices(self, pr_files: List[Dict]) -> Dict[str, any]:
+    async def _analyze_security_and_practices(
+        self, pr_files: list[dict]
+    ) -> dict[str, any]:
         """Analyze security issues and best practices."""
         try:
             system_prompt = """You are a security expert and best practices reviewer.
-            
+
             Analyze the code changes for:
             1. Security vulnerabilities
             2. Input validation
@@ -210,7 +234,7 @@ Please analyze if the implementation meets the requirements."""
             5. Best practices compliance
             6. Performance considerations
             7. Maintainability issues
-            
+
             Provide a JSON response with:
             {
                 "score": 0-100,
@@ -221,19 +245,21 @@ Please analyze if the implementation meets the requirements."""
             }"""
 
             # Prepare code for analysis (focus on Python files)
-            python_files = [f for f in pr_files if f['filename'].endswith('.py')]
+            python_files = [f for f in pr_files if f["filename"].endswith(".py")]
             code_snippets = []
-            
+
             for file_info in python_files[:5]:  # Limit to 5 files
                 if file_info.get("patch"):
-                    code_snippets.append(f"File: {file_info['filename']}\n{file_info['patch']}")
+                    code_snippets.append(
+                        f"File: {file_info['filename']}\n{file_info['patch']}"
+                    )
 
             if not code_snippets:
                 return {
                     "score": 80,
                     "summary": "No Python files to analyze",
                     "security_issues": [],
-                    "best_practices": []
+                    "best_practices": [],
                 }
 
             user_prompt = f"""Please analyze the following code changes for security and best practices:
@@ -244,15 +270,15 @@ Provide your security and best practices analysis."""
 
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
             ]
-            
-            response = await self.llm_client.generate_response(messages)
-            
+
+            response = await self.llm_client.generate_response(messages, temperature=0)
+
             # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            json_text = extract_json(response)
+            if json_text:
+                return orjson.loads(json_text)
             else:
                 return {"score": 50, "summary": "Could not parse security analysis"}
 
@@ -261,23 +287,18 @@ Provide your security and best practices analysis."""
             return {"score": 0, "summary": f"Security analysis failed: {str(e)}"}
 
     async def _generate_overall_assessment(
-        self,
-        code_quality: Dict,
-        requirements: Dict,
-        security: Dict,
-        pr,
-        issue
-    ) -> Dict[str, any]:
+        self, code_quality: dict, requirements: dict, security: dict, pr, issue
+    ) -> dict[str, any]:
         """Generate an overall assessment and recommendation."""
         try:
             # Calculate weighted score
             code_score = code_quality.get("score", 0)
             req_score = requirements.get("score", 0)
             sec_score = security.get("score", 0)
-            
+
             # Weighted average: code quality 40%, requirements 40%, security 20%
-            overall_score = (code_score * 0.4 + req_score * 0.4 + sec_score * 0.2)
-            
+            overall_score = code_score * 0.4 + req_score * 0.4 + sec_score * 0.2
+
             # Determine recommendation
             if overall_score >= 85:
                 recommendation = "approve"
@@ -295,8 +316,16 @@ Provide your security and best practices analysis."""
             # Count critical issues
             critical_issues = 0
             for analysis in [code_quality, security]:
-                issues = analysis.get("issues", []) + analysis.get("security_issues", [])
-                critical_issues += len([i for i in issues if i.get("severity") == "high" or i.get("type") == "error"])
+                issues = analysis.get("issues", []) + analysis.get(
+                    "security_issues", []
+                )
+                critical_issues += len(
+                    [
+                        i
+                        for i in issues
+                        if i.get("severity") == "high" or i.get("type") == "error"
+                    ]
+                )
 
             return {
                 "score": round(overall_score, 1),
@@ -307,8 +336,8 @@ Provide your security and best practices analysis."""
                 "breakdown": {
                     "code_quality": code_score,
                     "requirements_compliance": req_score,
-                    "security_and_practices": sec_score
-                }
+                    "security_and_practices": sec_score,
+                },
             }
 
         except Exception as e:
@@ -317,16 +346,16 @@ Provide your security and best practices analysis."""
                 "score": 0,
                 "recommendation": "error",
                 "status": "❌ Review failed",
-                "summary": f"Assessment failed: {str(e)}"
+                "summary": f"Assessment failed: {str(e)}",
             }
 
-    async def _post_review_results(self, pr_number: int, review_result: Dict) -> None:
+    async def _post_review_results(self, pr_number: int, review_result: dict) -> None:
         """Post review results as comments on the pull request."""
         try:
             # Generate main review comment
             comment = self._format_review_comment(review_result)
             self.github_client.add_comment_to_pr(pr_number, comment)
-            
+
             # If there are critical issues, add individual comments for each
             if review_result.get("code_quality", {}).get("issues"):
                 issues_comment = self._format_issues_comment(
@@ -338,13 +367,13 @@ Provide your security and best practices analysis."""
         except Exception as e:
             logger.error(f"Error posting review results: {e}")
 
-    def _format_review_comment(self, review_result: Dict) -> str:
+    def _format_review_comment(self, review_result: dict) -> str:
         """Format the main review comment."""
         overall = review_result.get("overall_assessment", {})
         code_quality = review_result.get("code_quality", {})
         requirements = review_result.get("requirements_compliance", {})
         security = review_result.get("security_analysis", {})
-        
+
         comment = f"""## 🤖 AI Code Review
 
 ### {overall.get('status', 'Review Completed')}
@@ -353,7 +382,7 @@ Provide your security and best practices analysis."""
 
 ### 📊 Breakdown:
 - **Code Quality:** {overall.get('breakdown', {}).get('code_quality', 0)}/100
-- **Requirements Compliance:** {overall.get('breakdown', {}).get('requirements_compliance', 0)}/100  
+- **Requirements Compliance:** {overall.get('breakdown', {}).get('requirements_compliance', 0)}/100
 - **Security & Best Practices:** {overall.get('breakdown', {}).get('security_and_practices', 0)}/100
 
 ### 📝 Summary:
@@ -383,31 +412,35 @@ Provide your security and best practices analysis."""
 """
 
         # Add recommendation
-        recommendation = overall.get('recommendation', 'needs_work')
-        if recommendation == 'approve':
+        recommendation = overall.get("recommendation", "needs_work")
+        if recommendation == "approve":
             comment += "### 🎉 Recommendation: **APPROVE** ✅\n"
-        elif recommendation == 'approve_with_suggestions':
+        elif recommendation == "approve_with_suggestions":
             comment += "### 💡 Recommendation: **APPROVE WITH SUGGESTIONS** ⚠️\n"
-        elif recommendation == 'request_changes':
+        elif recommendation == "request_changes":
             comment += "### 🔄 Recommendation: **REQUEST CHANGES** 🔄\n"
         else:
             comment += "### ❌ Recommendation: **NEEDS SIGNIFICANT WORK** ❌\n"
 
-        comment += "\n---\n*This review was generated automatically by AI Reviewer Agent*"
-        
+        comment += (
+            "\n---\n*This review was generated automatically by AI Reviewer Agent*"
+        )
+
         return comment
 
-    def _format_issues_comment(self, issues: List[Dict]) -> str:
+    def _format_issues_comment(self, issues: list[dict]) -> str:
         """Format issues into a separate comment."""
         if not issues:
             return ""
-            
+
         comment = "## 🐛 Detailed Issues Found:\n\n"
-        
+
         for issue in issues:
             severity = issue.get("type", "info").upper()
-            emoji = "🔴" if severity == "ERROR" else "🟡" if severity == "WARNING" else "🔵"
-            
+            emoji = (
+                "🔴" if severity == "ERROR" else "🟡" if severity == "WARNING" else "🔵"
+            )
+
             comment += f"{emoji} **{severity}**: {issue.get('message', 'No message')}\n"
             if issue.get("file"):
                 comment += f"   📁 File: `{issue['file']}`"
@@ -415,22 +448,17 @@ Provide your security and best practices analysis."""
                     comment += f" (Line {issue['line']})"
                 comment += "\n"
             comment += "\n"
-        
+
         return comment
 
-    def _extract_issue_number(self, title: str, body: str) -> Optional[int]:
+    def _extract_issue_number(self, title: str, body: str) -> int | None:
         """Extract issue number from PR title or body."""
         # Look for patterns like "Fix #123", "Fixes #123", "Closes #123"
-        patterns = [
-            r'(?:fix|fixes|close|closes|resolve|resolves)\s*#(\d+)',
-            r'#(\d+)',
-        ]
-        
         text = f"{title} {body}".lower()
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+
+        for pattern in _ISSUE_REFS:
+            match = pattern.search(text)
             if match:
                 return int(match.group(1))
-        
-        return None
\ No newline at end of file
+
+        return None
@@ -1,29 +1,18 @@
-import os
-from typing import Optional
+from functools import lru_cache
 
 from pydantic import Field
-from pydantic_settings import BaseSettings
 
+from ai_code_agent.config import AgentSettings
 
-class Settings(BaseSettings):
+
+class Settings(AgentSettings):
     debug: bool = Field(default=False, env="DEBUG")
-    log_level: str = Field(default="INFO", env="LOG_LEVEL")
-    log_format: str = Field(
-        default="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        env="LOG_FORMAT"
-    )
 
     github_app_id: str = Field(..., env="GITHUB_APP_ID")
     github_app_private_key: str = Field(..., env="GITHUB_APP_PRIVATE_KEY")
     github_webhook_secret: str = Field(..., env="GITHUB_WEBHOOK_SECRET")
 
-    openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
-    openai_model: str = Field(default="gpt-4o-mini", env="OPENAI_MODEL")  
-    openai_base_url: str = Field(default="https://openrouter.ai/api/v1/chat/completions", env="OPENAI_BASE_URL")  
-
-    max_iterations: int = Field(default=5, env="MAX_ITERATIONS")
-    code_agent_name: str = Field(default="AI Code Agent", env="CODE_AGENT_NAME")
-    reviewer_agent_name: str = Field(default="AI Reviewer Agent", env="REVIEWER_AGENT_NAME")
+    openai_api_key: str | None = Field(default=None, env="OPENAI_API_KEY")
 
     database_url: str = Field(default="sqlite:///./app.db", env="DATABASE_URL")
 
@@ -31,21 +20,31 @@ class Settings(BaseSettings):
     ci_check_interval: int = Field(default=60, env="CI_CHECK_INTERVAL")
     ci_max_wait_time: int = Field(default=1800, env="CI_MAX_WAIT_TIME")  # 30 minutes
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    # Files generated and fetched in parallel within one iteration
+    max_github_concurrency: int = Field(default=5, env="MAX_GITHUB_CONCURRENCY")
 
+    # Code iterations running at once, across all repositories
+    max_concurrent_iterations: int = Field(default=4, env="MAX_CONCURRENT_ITERATIONS")
+
+    # Directory persisting the analysis and file generation cache; memory only when unset
+    llm_cache_dir: str | None = Field(default=None, env="LLM_CACHE_DIR")
 
     def get_private_key(self) -> str:
-        if self.github_app_private_key.startswith("/") or self.github_app_private_key.endswith(".pem"):
+        if self.github_app_private_key.startswith(
+            "/"
+        ) or self.github_app_private_key.endswith(".pem"):
             try:
-                with open(self.github_app_private_key, "r") as f:
+                with open(self.github_app_private_key) as f:
                     return f.read()
             except FileNotFoundError:
-                raise ValueError(f"Private key file not found: {self.github_app_private_key}")
-        
+                raise ValueError(
+                    f"Private key file not found: {self.github_app_private_key}"
+                ) from None
+
         return self.github_app_private_key
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the shared Settings, loading them on first use."""
+    return Settings()
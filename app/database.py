@@ -1,24 +1,93 @@
+from collections.abc import AsyncIterator
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from functools import lru_cache
+from typing import Any
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    bindparam,
+    case,
+    event,
+    func,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import validates
+from sqlalchemy.pool import StaticPool
 
-from .config import settings
+from .config import get_settings
+
+# DATABASE_URL keeps its plain sqlite:// / postgresql:// form; these are the
+# asyncio drivers used for each backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def _async_url(database_url: str) -> URL:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.get_driver_name() != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """Create the database engine on first use."""
+    database_url = _async_url(get_settings().database_url)
+    if database_url.get_backend_name() != "sqlite":
+        return create_async_engine(
+            database_url, pool_pre_ping=True, pool_size=10, max_overflow=20
+        )
+
+    engine_args = {"connect_args": {"check_same_thread": False}}
+    if database_url.database in (None, "", ":memory:"):
+        # An in-memory database only exists on its one connection
+        engine_args["poolclass"] = StaticPool
+    engine = create_async_engine(database_url, **engine_args)
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # Runs once per pooled connection, not per session
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound to the engine at session creation so importing this module stays cheap.
+# Objects keep their loaded values after commit, so mutations don't need a
+# refresh SELECT before being returned.
+SessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
+
 class IterationStatus(str, Enum):
     """Status of an iteration cycle."""
+
     RUNNING = "running"
     WAITING_CI = "waiting_ci"
     REVIEWING = "reviewing"
@@ -27,190 +96,382 @@ class IterationStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
-class IssueIteration(Base):    
+class IssueIteration(Base):
     __tablename__ = "issue_iterations"
-    
+    __table_args__ = (
+        # Partial indexes for the hot "active iteration" lookups. The predicates
+        # match how "is_active == True" is rendered so the planners can use them.
+        # Also enforces at most one active iteration per issue, so concurrent
+        # webhook deliveries can't both start one
+        Index(
+            "uq_one_active_per_issue",
+            "repo_full_name",
+            "issue_number",
+            unique=True,
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        # Most rows never get a PR, so leave them out of the PR lookup index
+        Index(
+            "ix_pr_active",
+            "repo_full_name",
+            "pr_number",
+            postgresql_where=text("pr_number IS NOT NULL AND is_active = true"),
+            sqlite_where=text("pr_number IS NOT NULL AND is_active = 1"),
+        ),
+        Index(
+            "ix_active_status",
+            "status",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    
-    repo_full_name = Column(String, nullable=False, index=True)
-    issue_number = Column(Integer, nullable=False, index=True)
+
+    repo_full_name = Column(String, nullable=False)
+    # repo_full_name split once at creation so callers never re-parse it
+    owner = Column(String, nullable=True)
+    repo_name = Column(String, nullable=True)
+    issue_number = Column(Integer, nullable=False)
     pr_number = Column(Integer, nullable=True)
     installation_id = Column(Integer, nullable=False)
-    
+
     current_iteration = Column(Integer, default=0)
     max_iterations = Column(Integer, default=5)
-    status = Column(String, default=IterationStatus.RUNNING)
-    
+    # Stored as VARCHAR on every backend, matching databases created before the
+    # enum; a native Postgres ENUM would need a migration of the column type
+    status = Column(
+        SAEnum(
+            IterationStatus,
+            name="iteration_status",
+            native_enum=False,
+            values_callable=lambda statuses: [status.value for status in statuses],
+        ),
+        default=IterationStatus.RUNNING,
+        nullable=False,
+    )
+
     issue_title = Column(String, nullable=True)
     issue_body = Column(Text, nullable=True)
     branch_name = Column(String, nullable=True)
-    
+
     last_review_score = Column(Integer, nullable=True)
     last_review_recommendation = Column(String, nullable=True)
     last_review_feedback = Column(Text, nullable=True)
-    
+    # What earlier code iterations touched and were told, fed back into analysis
+    iteration_memory = Column(JSON, nullable=True)
+
     last_ci_status = Column(String, nullable=True)
     last_ci_conclusion = Column(String, nullable=True)
-    
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
-    
+
     is_active = Column(Boolean, default=True)
 
+    @validates("status")
+    def _validate_status(self, key: str, value):
+        # Hold the enum member, as a row loaded from the database would, since
+        # objects are not refreshed after commit and callers also pass strings
+        return IterationStatus(value)
+
+
+# Columns update_iteration may set, computed once instead of probing with hasattr
+IssueIteration._mutable_fields = frozenset(
+    column.name
+    for column in IssueIteration.__table__.columns
+    if column.name not in {"id", "created_at"}
+)
+
+
+# Module-level statements with bound parameters, so each lookup reuses the
+# compiled SQL from the statement cache
+_Q_BY_ID = select(IssueIteration).where(IssueIteration.id == bindparam("iteration_id"))
+
+_Q_ACTIVE_BY_ISSUE = (
+    select(IssueIteration)
+    .where(
+        IssueIteration.repo_full_name == bindparam("repo_full_name"),
+        IssueIteration.issue_number == bindparam("issue_number"),
+        IssueIteration.is_active.is_(True),
+    )
+    .limit(1)
+)
+
+_Q_ACTIVE_BY_PR = (
+    select(IssueIteration)
+    .where(
+        IssueIteration.repo_full_name == bindparam("repo_full_name"),
+        IssueIteration.pr_number == bindparam("pr_number"),
+        IssueIteration.is_active.is_(True),
+    )
+    .limit(1)
+)
+
+_ACTIVE_STATUSES = [
+    IterationStatus.RUNNING,
+    IterationStatus.WAITING_CI,
+    IterationStatus.REVIEWING,
+]
+
+_Q_ALL_ACTIVE = select(IssueIteration).where(
+    IssueIteration.is_active.is_(True), IssueIteration.status.in_(_ACTIVE_STATUSES)
+)
+
+
+def _add_missing_columns(connection) -> None:
+    table = IssueIteration.__table__
+    existing = {
+        column["name"] for column in inspect(connection).get_columns(table.name)
+    }
+    added = [column for column in table.columns if column.name not in existing]
+    for column in added:
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(
+            text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+        )
+
+    if {"owner", "repo_name"} & {column.name for column in added}:
+        rows = connection.execute(select(table.c.id, table.c.repo_full_name)).all()
+        for row_id, repo_full_name in rows:
+            owner, _, repo_name = repo_full_name.partition("/")
+            connection.execute(
+                update(table)
+                .where(table.c.id == row_id)
+                .values(owner=owner, repo_name=repo_name)
+            )
+
+
+def _deactivate_duplicate_active(connection) -> None:
+    """Keep only the newest active iteration per issue, so uq_one_active_per_issue can be built.
+
+    Databases from before the index may hold several, left by concurrent deliveries.
+    """
+    table = IssueIteration.__table__
+    newest = (
+        select(func.max(table.c.id))
+        .where(table.c.is_active.is_(True))
+        .group_by(table.c.repo_full_name, table.c.issue_number)
+    )
+    connection.execute(
+        update(table)
+        .where(table.c.is_active.is_(True), table.c.id.not_in(newest))
+        .values(is_active=False)
+    )
+
+
+def _create_schema(connection) -> None:
+    Base.metadata.create_all(bind=connection)
+    # create_all skips existing tables, so add columns and indexes introduced since
+    _add_missing_columns(connection)
+    _deactivate_duplicate_active(connection)
+    for index in IssueIteration.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+
 
 async def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+    async with get_engine().begin() as connection:
+        await connection.run_sync(_create_schema)
+
+
+async def close_db() -> None:
+    """Close pooled connections, whose aiosqlite threads would block exit."""
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
 
 
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal(bind=get_engine()) as db:
         yield db
-    finally:
-        db.close()
 
 
 class DatabaseManager:
     def __init__(self):
         self.session_factory = SessionLocal
-    
-    def get_session(self) -> Session:
-        return self.session_factory()
-    
-    def get_active_iteration(
-        self, 
-        repo_full_name: str, 
-        issue_number: int
-    ) -> Optional[IssueIteration]:
-        with self.get_session() as db:
-            return db.query(IssueIteration).filter(
-                IssueIteration.repo_full_name == repo_full_name,
-                IssueIteration.issue_number == issue_number,
-                IssueIteration.is_active == True
-            ).first()
-    
-    def create_iteration(
+
+    def get_session(self) -> AsyncSession:
+        return self.session_factory(bind=get_engine())
+
+    async def get_active_iteration(
+        self, repo_full_name: str, issue_number: int
+    ) -> IssueIteration | None:
+        async with self.get_session() as db:
+            result = await db.execute(
+                _Q_ACTIVE_BY_ISSUE,
+                {"repo_full_name": repo_full_name, "issue_number": issue_number},
+            )
+            return result.scalar_one_or_none()
+
+    async def create_iteration(
         self,
         repo_full_name: str,
         issue_number: int,
         installation_id: int,
         issue_title: str = None,
         issue_body: str = None,
-        max_iterations: int = None
+        max_iterations: int = None,
     ) -> IssueIteration:
-        with self.get_session() as db:
-            existing = db.query(IssueIteration).filter(
+        owner, _, repo_name = repo_full_name.partition("/")
+        deactivate = (
+            update(IssueIteration)
+            .where(
                 IssueIteration.repo_full_name == repo_full_name,
                 IssueIteration.issue_number == issue_number,
-                IssueIteration.is_active == True
-            ).all()
-            
-            for iteration in existing:
-                iteration.is_active = False
-            
-            iteration = IssueIteration(
-                repo_full_name=repo_full_name,
-                issue_number=issue_number,
-                installation_id=installation_id,
-                issue_title=issue_title,
-                issue_body=issue_body,
-                max_iterations=max_iterations or settings.max_iterations,
-                current_iteration=0,
-                status=IterationStatus.RUNNING
+                IssueIteration.is_active.is_(True),
             )
-            
-            db.add(iteration)
-            db.commit()
-            db.refresh(iteration)
-            return iteration
-    
-    def update_iteration(
-        self,
-        iteration_id: int,
-        **kwargs
-    ) -> Optional[IssueIteration]:
-        with self.get_session() as db:
-            iteration = db.query(IssueIteration).filter(
-                IssueIteration.id == iteration_id
-            ).first()
-            
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+
+        async with self.get_session() as db:
+            for attempt in range(2):
+                iteration = IssueIteration(
+                    repo_full_name=repo_full_name,
+                    owner=owner,
+                    repo_name=repo_name,
+                    issue_number=issue_number,
+                    installation_id=installation_id,
+                    issue_title=issue_title,
+                    issue_body=issue_body,
+                    max_iterations=max_iterations or get_settings().max_iterations,
+                    current_iteration=0,
+                    status=IterationStatus.RUNNING,
+                )
+
+                await db.execute(deactivate)
+                db.add(iteration)
+                try:
+                    await db.commit()
+                    return iteration
+                except IntegrityError:
+                    # A concurrent call committed its active row after our
+                    # UPDATE ran; retire that one too and insert again
+                    await db.rollback()
+                    if attempt:
+                        raise
+
+    async def update_iteration(
+        self, iteration_id: int, **kwargs
+    ) -> IssueIteration | None:
+        unknown = kwargs.keys() - IssueIteration._mutable_fields
+        if unknown:
+            raise ValueError(f"Unknown iteration fields: {', '.join(sorted(unknown))}")
+
+        async with self.get_session() as db:
+            result = await db.execute(_Q_BY_ID, {"iteration_id": iteration_id})
+            iteration = result.scalar_one_or_none()
+
             if not iteration:
                 return None
-            
+
             for key, value in kwargs.items():
-                if hasattr(iteration, key):
-                    setattr(iteration, key, value)
-            
+                setattr(iteration, key, value)
+
             iteration.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(iteration)
+            await db.commit()
             return iteration
-    
-    def increment_iteration(self, iteration_id: int) -> Optional[IssueIteration]:
-        with self.get_session() as db:
-            iteration = db.query(IssueIteration).filter(
-                IssueIteration.id == iteration_id
-            ).first()
-            
+
+    async def increment_iteration(self, iteration_id: int) -> IssueIteration | None:
+        now = datetime.utcnow()
+        # SET expressions see the pre-update row, so this is one atomic step
+        exhausted = (
+            IssueIteration.current_iteration + 1 >= IssueIteration.max_iterations
+        )
+        stmt = (
+            update(IssueIteration)
+            .where(IssueIteration.id == iteration_id)
+            .values(
+                current_iteration=IssueIteration.current_iteration + 1,
+                status=case(
+                    (exhausted, IterationStatus.FAILED), else_=IssueIteration.status
+                ),
+                completed_at=case((exhausted, now), else_=IssueIteration.completed_at),
+                updated_at=now,
+            )
+            .returning(IssueIteration)
+        )
+
+        async with self.get_session() as db:
+            result = await db.execute(stmt)
+            iteration = result.scalar_one_or_none()
             if not iteration:
                 return None
-            
-            iteration.current_iteration += 1
-            iteration.updated_at = datetime.utcnow()
-            
-            if iteration.current_iteration >= iteration.max_iterations:
-                iteration.status = IterationStatus.FAILED
-                iteration.completed_at = datetime.utcnow()
-            
-            db.commit()
-            db.refresh(iteration)
+
+            await db.commit()
             return iteration
-    
-    def complete_iteration(
+
+    async def complete_iteration(
         self,
         iteration_id: int,
-        status: IterationStatus = IterationStatus.COMPLETED
-    ) -> Optional[IssueIteration]:
-        with self.get_session() as db:
-            iteration = db.query(IssueIteration).filter(
-                IssueIteration.id == iteration_id
-            ).first()
-            
+        status: IterationStatus = IterationStatus.COMPLETED,
+        **fields,
+    ) -> IssueIteration | None:
+        """Close an iteration, also writing any other fields in the same commit."""
+        unknown = fields.keys() - IssueIteration._mutable_fields
+        if unknown:
+            raise ValueError(f"Unknown iteration fields: {', '.join(sorted(unknown))}")
+
+        async with self.get_session() as db:
+            result = await db.execute(_Q_BY_ID, {"iteration_id": iteration_id})
+            iteration = result.scalar_one_or_none()
+
             if not iteration:
                 return None
-            
+
+            for key, value in fields.items():
+                setattr(iteration, key, value)
+
             iteration.status = status
             iteration.completed_at = datetime.utcnow()
             iteration.updated_at = datetime.utcnow()
             iteration.is_active = False
-            
-            db.commit()
-            db.refresh(iteration)
+
+            await db.commit()
             return iteration
-    
-    def get_iteration_by_pr(
-        self, 
-        repo_full_name: str, 
-        pr_number: int
-    ) -> Optional[IssueIteration]:
-        with self.get_session() as db:
-            return db.query(IssueIteration).filter(
-                IssueIteration.repo_full_name == repo_full_name,
-                IssueIteration.pr_number == pr_number,
-                IssueIteration.is_active == True
-            ).first()
-    
-    def get_all_active_iterations(self) -> list[IssueIteration]:
-        with self.get_session() as db:
-            return db.query(IssueIteration).filter(
-                IssueIteration.is_active == True,
-                IssueIteration.status.in_([
-                    IterationStatus.RUNNING,
-                    IterationStatus.WAITING_CI,
-                    IterationStatus.REVIEWING
-                ])
-            ).all()
+
+    async def get_iteration_by_pr(
+        self, repo_full_name: str, pr_number: int
+    ) -> IssueIteration | None:
+        async with self.get_session() as db:
+            result = await db.execute(
+                _Q_ACTIVE_BY_PR,
+                {"repo_full_name": repo_full_name, "pr_number": pr_number},
+            )
+            return result.scalar_one_or_none()
+
+    async def get_all_active_iterations(self) -> list[IssueIteration]:
+        async with self.get_session() as db:
+            result = await db.execute(_Q_ALL_ACTIVE)
+            return list(result.scalars().all())
+
+    async def get_iteration_stats(self) -> dict[str, Any]:
+        """Iteration counts overall, active and per status, with the database time."""
+        async with self.get_session() as db:
+            stats = await db.execute(
+                select(
+                    IssueIteration.status, func.count(IssueIteration.id).label("count")
+                ).group_by(IssueIteration.status)
+            )
+            status_counts = {status.value: count for status, count in stats}
+
+            total_iterations = await db.scalar(select(func.count(IssueIteration.id)))
+
+            active_iterations = await db.scalar(
+                select(func.count(IssueIteration.id)).where(
+                    IssueIteration.is_active.is_(True)
+                )
+            )
+
+            timestamp = await db.scalar(select(func.now()))
+
+            return {
+                "total_iterations": total_iterations,
+                "active_iterations": active_iterations,
+                "status_breakdown": status_counts,
+                "timestamp": timestamp,
+            }
 
 
 db_manager = DatabaseManager()
@@ -1,139 +1,236 @@
-import time
+import asyncio
 import logging
-from typing import Dict, Optional
+import time
+from collections.abc import AsyncGenerator
 from datetime import datetime, timedelta
 
-import jwt
 import httpx
+import jwt
+import orjson
 from cryptography.hazmat.primitives import serialization
 
-from ..config import settings
+from ..config import get_settings
 
 logger = logging.getLogger(__name__)
 
 
+class InstallationTokenAuth(httpx.Auth):
+    """Attach the current installation token to every request.
+
+    Pooled clients outlive a single token, so the token is looked up per
+    request; it comes from the cache until it is close to expiring.
+    """
+
+    def __init__(self, app_auth: "GitHubAppAuth", installation_id: int):
+        self._app_auth = app_auth
+        self._installation_id = installation_id
+
+    async def async_auth_flow(
+        self, request: httpx.Request
+    ) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        token = await self._app_auth.get_installation_token(self._installation_id)
+        request.headers["Authorization"] = f"token {token}"
+        response = yield request
+        self._app_auth.record_rate_limit(self._installation_id, response)
+
+        if response.status_code == 401:
+            # Token was revoked or expired early; fetch a fresh one and retry once
+            self._app_auth.clear_token_cache(self._installation_id)
+            token = await self._app_auth.get_installation_token(self._installation_id)
+            request.headers["Authorization"] = f"token {token}"
+            yield request
+
+
 class GitHubAppAuth:
     def __init__(self):
-        self.app_id = settings.github_app_id
-        self._private_key: Optional[str] = None
-        self._installation_tokens: Dict[int, Dict] = {}
-    
+        self.app_id = get_settings().github_app_id
+        self._private_key: str | None = None
+        self._installation_tokens: dict[int, dict] = {}
+        # One mint at a time per installation; concurrent misses wait for it
+        self._token_locks: dict[int, asyncio.Lock] = {}
+        self._clients: dict[int, httpx.AsyncClient] = {}
+        # App-level (JWT) calls: token minting and installation lookups
+        self._app_client: httpx.AsyncClient | None = None
+        # (installation_id, resource) -> (requests remaining, reset as a Unix time), from the
+        # last response; REST ("core") and GraphQL draw on separate budgets
+        self._rate_limits: dict[tuple[int, str], tuple[int, float]] = {}
+
     @property
     def private_key(self) -> str:
         if self._private_key is None:
             self._private_key = self._load_private_key()
         return self._private_key
-    
+
     def _load_private_key(self) -> str:
         try:
-            private_key_content = settings.get_private_key()
+            private_key_content = get_settings().get_private_key()
             serialization.load_pem_private_key(
-                private_key_content.encode(),
-                password=None
+                private_key_content.encode(), password=None
             )
-            
+
             return private_key_content
         except Exception as e:
             logger.error(f"Failed to load GitHub App private key: {e}")
-            raise ValueError(f"Invalid GitHub App private key: {e}")
-    
+            raise ValueError(f"Invalid GitHub App private key: {e}") from e
+
     def generate_jwt(self) -> str:
         now = int(time.time())
-        
-        payload = {
-            "iat": now - 60,
-            "exp": now + 600,
-            "iss": self.app_id
-        }
-        
+
+        payload = {"iat": now - 60, "exp": now + 600, "iss": self.app_id}
+
         try:
-            token = jwt.encode(
-                payload,
-                self.private_key,
-                algorithm="RS256"
-            )
+            token = jwt.encode(payload, self.private_key, algorithm="RS256")
             return token
         except Exception as e:
             logger.error(f"Failed to generate JWT: {e}")
-            raise ValueError(f"Failed to generate JWT: {e}")
-    
+            raise ValueError(f"Failed to generate JWT: {e}") from e
+
+    def _cached_token(self, installation_id: int) -> str | None:
+        """The cached token, unless it expires within five minutes."""
+        token_data = self._installation_tokens.get(installation_id)
+        if token_data is None:
+            return None
+        expires_at = datetime.fromisoformat(
+            token_data["expires_at"].replace("Z", "+00:00")
+        )
+        if expires_at > datetime.now().astimezone() + timedelta(minutes=5):
+            return token_data["token"]
+        return None
+
     async def get_installation_token(self, installation_id: int) -> str:
-        if installation_id in self._installation_tokens:
-            token_data = self._installation_tokens[installation_id]
-            expires_at = datetime.fromisoformat(token_data["expires_at"].replace("Z", "+00:00"))
-            
-            if expires_at > datetime.now().astimezone() + timedelta(minutes=5):
-                return token_data["token"]
-        
+        token = self._cached_token(installation_id)
+        if token is not None:
+            return token
+
+        lock = self._token_locks.setdefault(installation_id, asyncio.Lock())
+        async with lock:
+            # Another request may have minted one while this waited
+            token = self._cached_token(installation_id)
+            if token is not None:
+                return token
+            return await self._mint_installation_token(installation_id)
+
+    async def _mint_installation_token(self, installation_id: int) -> str:
         jwt_token = self.generate_jwt()
-        
-        url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-        headers = {
-            "Authorization": f"Bearer {jwt_token}",
-            "Accept": "application/vnd.github.v3+json",
-            "User-Agent": "AI-Coding-Agent/1.0"
-        }
-        
+
+        url = (
+            f"https://api.github.com/app/installations/{installation_id}/access_tokens"
+        )
+        headers = {"Authorization": f"Bearer {jwt_token}"}
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers)
-                response.raise_for_status()
-                
-                token_data = response.json()
-                
-                self._installation_tokens[installation_id] = token_data
-                
-                logger.info(f"Generated new installation token for installation {installation_id}")
-                return token_data["token"]
-                
+            response = await self._get_app_client().post(url, headers=headers)
+            response.raise_for_status()
+
+            token_data = orjson.loads(response.content)
+
+            self._installation_tokens[installation_id] = token_data
+
+            logger.info(
+                f"Generated new installation token for installation {installation_id}"
+            )
+            return token_data["token"]
+
         except httpx.HTTPStatusError as e:
-            logger.error(f"Failed to get installation token: {e.response.status_code} - {e.response.text}")
-            raise ValueError(f"Failed to get installation token: {e}")
+            logger.error(
+                f"Failed to get installation token: {e.response.status_code} - {e.response.text}"
+            )
+            raise ValueError(f"Failed to get installation token: {e}") from e
         except Exception as e:
             logger.error(f"Error getting installation token: {e}")
-            raise ValueError(f"Error getting installation token: {e}")
-    
-    async def get_installation_id(self, owner: str, repo: str) -> Optional[int]:
+            raise ValueError(f"Error getting installation token: {e}") from e
+
+    async def get_installation_id(self, owner: str, repo: str) -> int | None:
         jwt_token = self.generate_jwt()
-        
+
         url = f"https://api.github.com/repos/{owner}/{repo}/installation"
-        headers = {
-            "Authorization": f"Bearer {jwt_token}",
-            "Accept": "application/vnd.github.v3+json",
-            "User-Agent": "AI-Coding-Agent/1.0"
-        }
-        
+        headers = {"Authorization": f"Bearer {jwt_token}"}
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers)
-                
-                if response.status_code == 404:
-                    logger.warning(f"GitHub App not installed on {owner}/{repo}")
-                    return None
-                
-                response.raise_for_status()
-                installation_data = response.json()
-                return installation_data["id"]
-                
+            response = await self._get_app_client().get(url, headers=headers)
+
+            if response.status_code == 404:
+                logger.warning(f"GitHub App not installed on {owner}/{repo}")
+                return None
+
+            response.raise_for_status()
+            installation_data = orjson.loads(response.content)
+            return installation_data["id"]
+
         except httpx.HTTPStatusError as e:
-            logger.error(f"Failed to get installation ID: {e.response.status_code} - {e.response.text}")
+            logger.error(
+                f"Failed to get installation ID: {e.response.status_code} - {e.response.text}"
+            )
             return None
         except Exception as e:
             logger.error(f"Error getting installation ID: {e}")
             return None
-    
-    async def get_authenticated_client(self, installation_id: int) -> httpx.AsyncClient:
-        token = await self.get_installation_token(installation_id)
-        
+
+    @staticmethod
+    def _new_client(auth: httpx.Auth | None = None) -> httpx.AsyncClient:
         headers = {
-            "Authorization": f"token {token}",
             "Accept": "application/vnd.github.v3+json",
-            "User-Agent": "AI-Coding-Agent/1.0"
+            "User-Agent": "AI-Coding-Agent/1.0",
         }
-        
-        return httpx.AsyncClient(headers=headers)
-    
-    def clear_token_cache(self, installation_id: Optional[int] = None) -> None:
+
+        return httpx.AsyncClient(
+            headers=headers,
+            auth=auth,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_keepalive_connections=50, keepalive_expiry=300),
+            ),
+        )
+
+    def _get_app_client(self) -> httpx.AsyncClient:
+        """Return the pooled client for JWT-authenticated calls; auth is per request."""
+        if self._app_client is None or self._app_client.is_closed:
+            self._app_client = self._new_client()
+        return self._app_client
+
+    async def get_authenticated_client(self, installation_id: int) -> httpx.AsyncClient:
+        """Return the pooled client for an installation, creating it on first use.
+
+        The client is shared and long-lived; callers must not close it.
+        """
+        client = self._clients.get(installation_id)
+        if client is not None and not client.is_closed:
+            return client
+
+        client = self._new_client(InstallationTokenAuth(self, installation_id))
+        self._clients[installation_id] = client
+        return client
+
+    async def close_clients(self) -> None:
+        """Close all pooled installation clients and the app client."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        if self._app_client is not None:
+            clients.append(self._app_client)
+            self._app_client = None
+        for client in clients:
+            await client.aclose()
+
+    def record_rate_limit(self, installation_id: int, response: httpx.Response) -> None:
+        remaining = response.headers.get("x-ratelimit-remaining")
+        reset = response.headers.get("x-ratelimit-reset")
+        if remaining is not None and reset is not None:
+            resource = response.headers.get("x-ratelimit-resource", "core")
+            self._rate_limits[(installation_id, resource)] = (
+                int(remaining),
+                float(reset),
+            )
+
+    def rate_limit_wait(self, installation_id: int, resource: str = "core") -> float:
+        """Seconds until the installation's budget for resource resets, or 0 if requests remain."""
+        remaining, reset = self._rate_limits.get((installation_id, resource), (1, 0.0))
+        if remaining > 0:
+            return 0.0
+        return max(0.0, reset - time.time())
+
+    def clear_token_cache(self, installation_id: int | None = None) -> None:
         if installation_id:
             self._installation_tokens.pop(installation_id, None)
         else:
@@ -1,82 +1,356 @@
+import asyncio
+import base64
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import Any
 
 import httpx
+import orjson
 
 from .github_app.auth import github_app_auth
-from .config import settings
 
 logger = logging.getLogger(__name__)
 
+# Repository metadata is served from memory for REPO_METADATA_TTL seconds and
+# revalidated with If-None-Match afterwards; 304s don't count against the
+# rate limit. Shared by all clients: (owner, repo) -> (fetched_at, etag, data)
+REPO_METADATA_TTL = 300
+REPO_METADATA_MAX_ENTRIES = 1024
+_repo_metadata_cache: dict[
+    tuple[str, str], tuple[float, str | None, dict[str, Any]]
+] = {}
+
+# Other read endpoints send the ETag of their last response for the same URL,
+# so an unchanged PR, page or listing comes back as a free 304.
+# (installation_id, url) -> (etag, data, next page url), least recently used first
+CONDITIONAL_CACHE_MAX_ENTRIES = 512
+_conditional_cache: "OrderedDict[tuple[int, str], tuple[str, Any, str | None]]" = (
+    OrderedDict()
+)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+RAW_HEADERS = {"Accept": "application/vnd.github.raw+json"}
+
+# Largest page size the list endpoints accept
+PER_PAGE = 100
+
+# Workflow runs are listed newest first; older ones are never needed, and a
+# busy repository has thousands of them
+WORKFLOW_RUNS_LIMIT = 100
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# A pull request with its head commit's combined check state and latest review,
+# which over REST takes the PR, status and check-runs endpoints
+_PR_STATE_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!) {
+  repository(owner: $owner, name: $repo) {
+    pullRequest(number: $number) {
+      number
+      title
+      body
+      state
+      mergeable
+      headRefOid
+      commits(last: 1) { nodes { commit { statusCheckRollup { state } } } }
+      reviews(last: 1) { nodes { state } }
+    }
+  }
+}
+"""
+
+# Paths looked up per GraphQL query by get_files_text
+GRAPHQL_FILES_PER_QUERY = 50
+
+# Bodies larger than this are base64-encoded off the event loop
+LARGE_BODY_THRESHOLD = 64 * 1024
+
+
+@lru_cache(maxsize=128)
+def _b64(data: bytes) -> str:
+    # Cached because retries push the same content to the branch again
+    return base64.b64encode(data).decode("ascii")
+
+
+async def _encode_body(data: bytes) -> str:
+    if len(data) > LARGE_BODY_THRESHOLD:
+        return await asyncio.to_thread(_b64, data)
+    return _b64(data)
+
+
+# Responses larger than this are decoded off the event loop; below it the
+# thread hop costs more than the decode
+LARGE_RESPONSE_THRESHOLD = 32 * 1024
+
+
+async def _decode_json(response: httpx.Response) -> Any:
+    if len(response.content) > LARGE_RESPONSE_THRESHOLD:
+        return await asyncio.to_thread(orjson.loads, response.content)
+    return orjson.loads(response.content)
+
+
+class GitHubRateLimited(httpx.HTTPStatusError):
+    """Primary or secondary rate limit hit; retry_after is the wait GitHub asks for."""
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        request: httpx.Request,
+        response: httpx.Response,
+        retry_after: float,
+    ):
+        super().__init__(message, request=request, response=response)
+        self.retry_after = retry_after
+
+
+class GitHubServerError(httpx.HTTPStatusError):
+    """A 5xx from GitHub, usually transient."""
+
+
+# GitHub asks for at least a minute when a secondary limit sends no headers
+DEFAULT_RETRY_AFTER = 60.0
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """Seconds to wait before retrying, or None if this is not a rate limit."""
+    retry_after = response.headers.get("retry-after")
+    if retry_after is not None:
+        return float(retry_after)
+    if response.headers.get("x-ratelimit-remaining") == "0":
+        reset = response.headers.get("x-ratelimit-reset")
+        if reset is not None:
+            return max(0.0, float(reset) - time.time())
+    if response.status_code == 429:
+        return DEFAULT_RETRY_AFTER
+    return None
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    """raise_for_status, raising rate limits and server errors as the typed subclasses."""
+    status = response.status_code
+    if status in (403, 429):
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            raise GitHubRateLimited(
+                f"GitHub rate limit on {response.request.url} (retry after {retry_after:.0f}s)",
+                request=response.request,
+                response=response,
+                retry_after=retry_after,
+            )
+    elif status >= 500:
+        raise GitHubServerError(
+            f"GitHub server error {status} on {response.request.url}",
+            request=response.request,
+            response=response,
+        )
+    response.raise_for_status()
+
 
 class GitHubAppClient:
     def __init__(self, installation_id: int):
         self.installation_id = installation_id
-        self._client: Optional[httpx.AsyncClient] = None
-    
+        self._client: httpx.AsyncClient | None = None
+
     async def __aenter__(self):
-        self._client = await github_app_auth.get_authenticated_client(self.installation_id)
+        self._client = await github_app_auth.get_authenticated_client(
+            self.installation_id
+        )
         return self
-    
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._client:
-            await self._client.aclose()
-    
-    async def get_issue(self, owner: str, repo: str, issue_number: int) -> Dict[str, Any]:
+        # The underlying client is pooled per installation and stays open
+        self._client = None
+
+    async def _send_json(self, method: str, url: str, data: Any) -> httpx.Response:
+        """Send data as a JSON body encoded with orjson rather than the stdlib.
+
+        Writes wait out an exhausted rate budget instead of spending a request
+        on a guaranteed 403.
+        """
+        resource = "graphql" if url == GRAPHQL_URL else "core"
+        wait = github_app_auth.rate_limit_wait(self.installation_id, resource)
+        if wait > 0:
+            logger.warning(
+                f"{resource} rate limit exhausted for installation {self.installation_id}, waiting {wait:.0f}s"
+            )
+            await asyncio.sleep(wait)
+        return await self._client.request(
+            method, url, content=orjson.dumps(data), headers=JSON_HEADERS
+        )
+
+    async def _paginate(
+        self, url: str, params: dict[str, Any] | None = None, key: str | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield the items of a list endpoint, following the Link rel="next" pages.
+
+        key names the list inside object responses such as workflow runs.
+        """
+        params = {**(params or {}), "per_page": PER_PAGE}
+        while url:
+            page, url = await self._get_conditional(url, params)
+            for item in page[key] if key else page:
+                yield item
+            # The next URL already carries the query string
+            params = None
+
+    async def _get_conditional(
+        self, url: str, params: dict[str, Any] | None = None
+    ) -> tuple[Any, str | None]:
+        """GET JSON, revalidating the last copy with If-None-Match.
+
+        Returns the body and the Link rel="next" URL. The body may be shared
+        with other callers, so it must not be modified.
+        """
+        # Per installation: a 304 answered for one installation's token must
+        # never return a body fetched with another's
+        key = (self.installation_id, str(httpx.URL(url, params=params)))
+        cached = _conditional_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else None
+
+        response = await self._client.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            _conditional_cache.move_to_end(key)
+            return cached[1], cached[2]
+
+        _raise_for_status(response)
+        data = await _decode_json(response)
+        next_url = response.links.get("next", {}).get("url")
+
+        etag = response.headers.get("ETag")
+        if etag:
+            _conditional_cache[key] = (etag, data, next_url)
+            _conditional_cache.move_to_end(key)
+            if len(_conditional_cache) > CONDITIONAL_CACHE_MAX_ENTRIES:
+                _conditional_cache.popitem(last=False)
+        else:
+            _conditional_cache.pop(key, None)
+        return data, next_url
+
+    async def get_issue(
+        self, owner: str, repo: str, issue_number: int
+    ) -> dict[str, Any]:
         url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}"
-        
+
         response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()
-    
-    async def get_pull_request(self, owner: str, repo: str, pr_number: int) -> Dict[str, Any]:
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
+    async def get_pull_request(
+        self, owner: str, repo: str, pr_number: int
+    ) -> dict[str, Any]:
         url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}"
-        
-        response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()
-    
-    async def create_branch(self, owner: str, repo: str, branch_name: str, base_sha: str) -> Dict[str, Any]:
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/refs"
-        
-        data = {
-            "ref": f"refs/heads/{branch_name}",
-            "sha": base_sha
-        }
-        
-        response = await self._client.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
-    async def update_branch(self, owner: str, repo: str, branch_name: str, new_sha: str) -> Dict[str, Any]:
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/refs/heads/{branch_name}"
-        
-        data = {
-            "sha": new_sha,
-            "force": True
+
+        pr_data, _ = await self._get_conditional(url)
+        return pr_data
+
+    async def graphql(self, query: str, variables: dict[str, Any]) -> dict[str, Any]:
+        response = await self._send_json(
+            "POST", GRAPHQL_URL, {"query": query, "variables": variables}
+        )
+        _raise_for_status(response)
+
+        payload = await _decode_json(response)
+        if payload.get("errors"):
+            raise ValueError(f"GraphQL query failed: {payload['errors']}")
+        return payload["data"]
+
+    async def get_pull_request_state(
+        self, owner: str, repo: str, pr_number: int
+    ) -> dict[str, Any]:
+        """Get a PR, its combined CI state and its latest review state in one request.
+
+        Carries the REST fields used by the review flow (title, body, head.sha)
+        plus ci_state (SUCCESS, FAILURE, ERROR, PENDING, EXPECTED, or None when
+        the head commit has no checks) and review_state.
+        """
+        data = await self.graphql(
+            _PR_STATE_QUERY, {"owner": owner, "repo": repo, "number": pr_number}
+        )
+        pr = data["repository"]["pullRequest"]
+        commits = pr["commits"]["nodes"]
+        rollup = commits[0]["commit"]["statusCheckRollup"] if commits else None
+        reviews = pr["reviews"]["nodes"]
+
+        return {
+            "number": pr["number"],
+            "title": pr["title"],
+            "body": pr["body"],
+            "state": pr["state"],
+            "mergeable": pr["mergeable"],
+            "head": {"sha": pr["headRefOid"]},
+            "ci_state": rollup["state"] if rollup else None,
+            "review_state": reviews[0]["state"] if reviews else None,
         }
-        
-        response = await self._client.patch(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
-    async def get_default_branch(self, owner: str, repo: str) -> str:
+
+    async def create_branch(
+        self, owner: str, repo: str, branch_name: str, base_sha: str
+    ) -> dict[str, Any]:
+        url = f"https://api.github.com/repos/{owner}/{repo}/git/refs"
+
+        data = {"ref": f"refs/heads/{branch_name}", "sha": base_sha}
+
+        response = await self._send_json("POST", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
+    async def update_branch(
+        self, owner: str, repo: str, branch_name: str, new_sha: str
+    ) -> dict[str, Any]:
+        url = (
+            f"https://api.github.com/repos/{owner}/{repo}/git/refs/heads/{branch_name}"
+        )
+
+        data = {"sha": new_sha, "force": True}
+
+        response = await self._send_json("PATCH", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
+    async def get_repository(self, owner: str, repo: str) -> dict[str, Any]:
+        """Get repository metadata, cached and revalidated with its ETag."""
+        key = (owner, repo)
+        cached = _repo_metadata_cache.get(key)
+        if cached and time.monotonic() - cached[0] < REPO_METADATA_TTL:
+            return cached[2]
+
         url = f"https://api.github.com/repos/{owner}/{repo}"
-        
-        response = await self._client.get(url)
-        response.raise_for_status()
-        repo_data = response.json()
+        headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+
+        response = await self._client.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            repo_data = cached[2]
+        else:
+            _raise_for_status(response)
+            repo_data = orjson.loads(response.content)
+
+        if (
+            key not in _repo_metadata_cache
+            and len(_repo_metadata_cache) >= REPO_METADATA_MAX_ENTRIES
+        ):
+            _repo_metadata_cache.pop(next(iter(_repo_metadata_cache)))
+        _repo_metadata_cache[key] = (
+            time.monotonic(),
+            response.headers.get("ETag") or (cached and cached[1]),
+            repo_data,
+        )
+        return repo_data
+
+    async def get_default_branch(self, owner: str, repo: str) -> str:
+        repo_data = await self.get_repository(owner, repo)
         return repo_data["default_branch"]
-    
+
     async def get_branch_sha(self, owner: str, repo: str, branch: str) -> str:
         url = f"https://api.github.com/repos/{owner}/{repo}/git/refs/heads/{branch}"
-        
+
         response = await self._client.get(url)
-        response.raise_for_status()
-        ref_data = response.json()
+        _raise_for_status(response)
+        ref_data = orjson.loads(response.content)
         return ref_data["object"]["sha"]
-    
+
     async def create_or_update_file(
         self,
         owner: str,
@@ -85,231 +359,304 @@ class GitHubAppClient:
         content: str,
         message: str,
         branch: str,
-        sha: Optional[str] = None
-    ) -> Dict[str, Any]:
-        import base64
-        
+        sha: str | None = None,
+    ) -> dict[str, Any]:
         url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-        
-        encoded_content = base64.b64encode(content.encode()).decode()
-        
-        data = {
-            "message": message,
-            "content": encoded_content,
-            "branch": branch
-        }
-        
+
+        encoded_content = await _encode_body(content.encode("utf-8"))
+
+        data = {"message": message, "content": encoded_content, "branch": branch}
+
         if sha:
             data["sha"] = sha
-        
-        response = await self._client.put(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
-    async def get_file_content(
+
+        response = await self._send_json("PUT", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
+    async def commit_files(
         self,
         owner: str,
         repo: str,
-        path: str,
-        branch: str = None
-    ) -> Optional[Dict[str, Any]]:
+        branch: str,
+        files: list[tuple[str, bytes]],
+        message: str,
+        base_sha: str | None = None,
+        modes: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """Commit several files to a branch as a single commit via the Git Data API.
+
+        base_sha is the branch head the commit builds on, looked up when not
+        given. modes maps existing paths to their tree mode so executables and
+        symlinks keep it; other paths are committed as regular files. Text
+        files go inline in the tree request; only binary content needs a blob
+        of its own.
+        """
+        modes = modes or {}
+        base_url = f"https://api.github.com/repos/{owner}/{repo}/git"
+        if base_sha is None:
+            base_sha = await self.get_branch_sha(owner, repo, branch)
+
+        async def tree_entry(path: str, content: bytes) -> dict[str, str]:
+            entry = {"path": path, "mode": modes.get(path, "100644"), "type": "blob"}
+            try:
+                entry["content"] = content.decode("utf-8")
+                return entry
+            except UnicodeDecodeError:
+                pass
+            data = {"content": await _encode_body(content), "encoding": "base64"}
+            response = await self._send_json("POST", f"{base_url}/blobs", data)
+            _raise_for_status(response)
+            entry["sha"] = orjson.loads(response.content)["sha"]
+            return entry
+
+        entries = await asyncio.gather(
+            *(tree_entry(path, content) for path, content in files)
+        )
+
+        tree_data = {"base_tree": base_sha, "tree": entries}
+        response = await self._send_json("POST", f"{base_url}/trees", tree_data)
+        _raise_for_status(response)
+        tree_sha = orjson.loads(response.content)["sha"]
+
+        commit_data = {"message": message, "tree": tree_sha, "parents": [base_sha]}
+        response = await self._send_json("POST", f"{base_url}/commits", commit_data)
+        _raise_for_status(response)
+        commit = orjson.loads(response.content)
+
+        response = await self._send_json(
+            "PATCH", f"{base_url}/refs/heads/{branch}", {"sha": commit["sha"]}
+        )
+        _raise_for_status(response)
+        return commit
+
+    async def get_file_content(
+        self, owner: str, repo: str, path: str, branch: str = None
+    ) -> dict[str, Any] | None:
         url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-        
+
         params = {}
         if branch:
             params["ref"] = branch
-        
+
         try:
             response = await self._client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+            _raise_for_status(response)
+            return await _decode_json(response)
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 return None
             raise
-    
+
     async def create_pull_request(
-        self,
-        owner: str,
-        repo: str,
-        title: str,
-        body: str,
-        head: str,
-        base: str
-    ) -> Dict[str, Any]:
+        self, owner: str, repo: str, title: str, body: str, head: str, base: str
+    ) -> dict[str, Any]:
         url = f"https://api.github.com/repos/{owner}/{repo}/pulls"
-        
-        data = {
-            "title": title,
-            "body": body,
-            "head": head,
-            "base": base
-        }
-        
-        response = await self._client.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
+
+        data = {"title": title, "body": body, "head": head, "base": base}
+
+        response = await self._send_json("POST", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
     async def update_pull_request(
         self,
         owner: str,
         repo: str,
         pr_number: int,
-        title: Optional[str] = None,
-        body: Optional[str] = None
-    ) -> Dict[str, Any]:
+        title: str | None = None,
+        body: str | None = None,
+    ) -> dict[str, Any]:
         url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}"
-        
+
         data = {}
         if title:
             data["title"] = title
         if body:
             data["body"] = body
-        
-        response = await self._client.patch(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
+
+        response = await self._send_json("PATCH", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
     async def create_issue_comment(
-        self,
-        owner: str,
-        repo: str,
-        issue_number: int,
-        body: str
-    ) -> Dict[str, Any]:
+        self, owner: str, repo: str, issue_number: int, body: str
+    ) -> dict[str, Any]:
         """Create a comment on an issue or pull request."""
         url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}/comments"
-        
+
         data = {"body": body}
-        
-        response = await self._client.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
+
+        response = await self._send_json("POST", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
     async def create_pull_request_review(
         self,
         owner: str,
         repo: str,
         pr_number: int,
         body: str,
-        event: str = "COMMENT"  # APPROVE, REQUEST_CHANGES, COMMENT
-    ) -> Dict[str, Any]:
+        event: str = "COMMENT",  # APPROVE, REQUEST_CHANGES, COMMENT
+    ) -> dict[str, Any]:
         """Create a pull request review."""
         url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}/reviews"
-        
-        data = {
-            "body": body,
-            "event": event
-        }
-        
-        response = await self._client.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    
+
+        data = {"body": body, "event": event}
+
+        response = await self._send_json("POST", url, data)
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
     async def get_pull_request_files(
-        self,
-        owner: str,
-        repo: str,
-        pr_number: int
-    ) -> List[Dict[str, Any]]:
+        self, owner: str, repo: str, pr_number: int
+    ) -> list[dict[str, Any]]:
         """Get files changed in a pull request."""
         url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}/files"
-        
-        response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()
-    
+
+        return [item async for item in self._paginate(url)]
+
     async def get_workflow_runs(
         self,
         owner: str,
         repo: str,
-        branch: Optional[str] = None,
-        status: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Get workflow runs for a repository."""
+        branch: str | None = None,
+        status: str | None = None,
+        limit: int = WORKFLOW_RUNS_LIMIT,
+    ) -> list[dict[str, Any]]:
+        """Get the newest workflow runs for a repository, at most limit of them."""
         url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs"
-        
+
         params = {}
         if branch:
             params["branch"] = branch
         if status:
             params["status"] = status
-        
-        response = await self._client.get(url, params=params)
-        response.raise_for_status()
-        return response.json()["workflow_runs"]
-    
+
+        runs = []
+        pages = self._paginate(url, params, key="workflow_runs")
+        async for run in pages:
+            runs.append(run)
+            if len(runs) >= limit:
+                break
+        # Don't leave the next page request pending on the generator
+        await pages.aclose()
+        return runs
+
     async def get_workflow_run(
-        self,
-        owner: str,
-        repo: str,
-        run_id: int
-    ) -> Dict[str, Any]:
+        self, owner: str, repo: str, run_id: int
+    ) -> dict[str, Any]:
         """Get specific workflow run."""
         url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs/{run_id}"
-        
+
         response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()
-    
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
     async def get_workflow_run_jobs(
-        self,
-        owner: str,
-        repo: str,
-        run_id: int
-    ) -> List[Dict[str, Any]]:
+        self, owner: str, repo: str, run_id: int
+    ) -> list[dict[str, Any]]:
         """Get jobs for a workflow run."""
         url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs/{run_id}/jobs"
-        
-        response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()["jobs"]
-    
+
+        return [item async for item in self._paginate(url, key="jobs")]
+
     async def get_commit_status(
-        self,
-        owner: str,
-        repo: str,
-        sha: str
-    ) -> Dict[str, Any]:
+        self, owner: str, repo: str, sha: str
+    ) -> dict[str, Any]:
         """Get commit status."""
         url = f"https://api.github.com/repos/{owner}/{repo}/commits/{sha}/status"
-        
+
         response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()
-    
+        _raise_for_status(response)
+        return orjson.loads(response.content)
+
     async def get_check_runs(
-        self,
-        owner: str,
-        repo: str,
-        sha: str
-    ) -> List[Dict[str, Any]]:
+        self, owner: str, repo: str, sha: str
+    ) -> list[dict[str, Any]]:
         """Get check runs for a commit."""
         url = f"https://api.github.com/repos/{owner}/{repo}/commits/{sha}/check-runs"
-        
-        response = await self._client.get(url)
-        response.raise_for_status()
-        return response.json()["check_runs"]
-    
+
+        return [item async for item in self._paginate(url, key="check_runs")]
+
+    async def get_files_text(
+        self, owner: str, repo: str, ref: str, paths: list[str]
+    ) -> dict[str, str]:
+        """Get the text of several files at ref with one GraphQL query per 50 paths.
+
+        Paths that are missing, binary or too large for GraphQL are left out,
+        so callers can fall back to REST for them.
+        """
+
+        async def fetch(batch: list[str]) -> dict[str, str]:
+            params = ", ".join(f"$e{i}: String!" for i in range(len(batch)))
+            fields = " ".join(
+                f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text isBinary isTruncated }} }}"
+                for i in range(len(batch))
+            )
+            query = (
+                f"query($owner: String!, $repo: String!, {params}) "
+                f"{{ repository(owner: $owner, name: $repo) {{ {fields} }} }}"
+            )
+            variables = {"owner": owner, "repo": repo}
+            variables.update((f"e{i}", f"{ref}:{path}") for i, path in enumerate(batch))
+
+            data = await self.graphql(query, variables)
+            texts = {}
+            for i, path in enumerate(batch):
+                blob = data["repository"][f"f{i}"]
+                if (
+                    blob
+                    and blob.get("text") is not None
+                    and not blob["isBinary"]
+                    and not blob["isTruncated"]
+                ):
+                    texts[path] = blob["text"]
+            return texts
+
+        batches = [
+            paths[i : i + GRAPHQL_FILES_PER_QUERY]
+            for i in range(0, len(paths), GRAPHQL_FILES_PER_QUERY)
+        ]
+        texts: dict[str, str] = {}
+        for result in await asyncio.gather(*(fetch(batch) for batch in batches)):
+            texts.update(result)
+        return texts
+
+    async def get_tree(
+        self, owner: str, repo: str, tree_sha: str, recursive: bool = True
+    ) -> dict[str, Any]:
+        """Get a git tree, by default with every path below it."""
+        url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{tree_sha}"
+
+        params = {"recursive": "1"} if recursive else {}
+
+        response = await self._client.get(url, params=params)
+        _raise_for_status(response)
+        return await _decode_json(response)
+
+    async def get_blob_raw(self, owner: str, repo: str, sha: str) -> bytes:
+        """Get a blob's content as raw bytes."""
+        url = f"https://api.github.com/repos/{owner}/{repo}/git/blobs/{sha}"
+
+        response = await self._client.get(url, headers=RAW_HEADERS)
+        _raise_for_status(response)
+        return response.content
+
     async def list_repository_files(
-        self,
-        owner: str,
-        repo: str,
-        path: str = "",
-        branch: str = None
-    ) -> List[Dict[str, Any]]:
+        self, owner: str, repo: str, path: str = "", branch: str = None
+    ) -> list[dict[str, Any]]:
         """List files in repository directory."""
         url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-        
+
         params = {}
         if branch:
             params["ref"] = branch
-        
-        response = await self._client.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+
+        listing, _ = await self._get_conditional(url, params)
+        return listing
 
 
 async def get_github_client(installation_id: int) -> GitHubAppClient:
     """Get authenticated GitHub client for installation."""
-    return GitHubAppClient(installation_id)
\ No newline at end of file
+    return GitHubAppClient(installation_id)
@@ -1,26 +1,35 @@
 """Main FastAPI application for AI Coding Agent GitHub App."""
 
 import logging
+import queue
+from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from logging.handlers import QueueHandler, QueueListener
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
-from .config import settings
-from .database import init_db
-from .routers import webhook, admin, health
+from ai_code_agent._http import close_shared_httpx
 
+from .config import get_settings
+from .database import close_db, init_db
+from .github_app.auth import github_app_auth
+from .orchestrator import orchestrator
+from .routers import admin, health, webhook
+
+settings = get_settings()
+
+# Configure logging. File writes go through a queue so the event loop
+# never blocks on disk I/O; the listener thread does the actual writing.
+log_queue: queue.Queue = queue.Queue(-1)
+file_log_listener = QueueListener(log_queue, logging.FileHandler("app.log"))
+file_log_listener.start()
 
-# Configure logging
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper()),
     format=settings.log_format,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("app.log")
-    ]
+    handlers=[logging.StreamHandler(), QueueHandler(log_queue)],
 )
 
 logger = logging.getLogger(__name__)
@@ -33,11 +42,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Starting AI Code Agent GitHub App...")
     await init_db()
     logger.info("Database initialized")
-    
-    yield
-    
+
+    async with orchestrator:
+        yield
+
     # Shutdown
     logger.info("Shutting down AI Code Agent GitHub App...")
+    await close_shared_httpx()
+    await github_app_auth.close_clients()
+    await close_db()
+    file_log_listener.stop()
 
 
 # Create FastAPI app
@@ -45,7 +59,8 @@ app = FastAPI(
     title="AI Coding Agent GitHub App",
     description="Automated SDLC service with iterative code development and review",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -63,10 +78,7 @@ app.add_middleware(
 async def global_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """Global exception handler."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "Internal server error"}
-    )
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 
 # Include routers
@@ -81,16 +93,17 @@ async def root() -> dict:
     return {
         "message": "AI Code Agent GitHub App",
         "version": "1.0.0",
-        "status": "running"
+        "status": "running",
     }
 
 
 if __name__ == "__main__":
     import uvicorn
+
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.debug,
-        log_level=settings.log_level.lower()
-    )
\ No newline at end of file
+        log_level=settings.log_level.lower(),
+    )
@@ -1,307 +1,900 @@
 import asyncio
+import base64
+import difflib
+import hashlib
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime
-
-from .database import db_manager, IssueIteration, IterationStatus
-from .github_client import get_github_client
-from .github_app.auth import github_app_auth
-from .config import settings
-from ai_code_agent.code_agent import CodeAgent
-from ai_code_agent.reviewer_agent import ReviewerAgent
+import random
+import time
+import types
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+import orjson
+from sqlalchemy.exc import SQLAlchemyError
+
+from ai_code_agent.diff_utils import apply_unified_diff, number_lines
+from ai_code_agent.json_utils import JsonObjectScanner, extract_json
+from ai_code_agent.llm_cache import LLMCache
 from ai_code_agent.openai_client import OpenAIClient
+from ai_code_agent.reviewer_agent import ReviewerAgent
+
+from .config import get_settings
+from .database import IssueIteration, IterationStatus, db_manager
+from .github_client import (
+    GitHubAppClient,
+    GitHubRateLimited,
+    GitHubServerError,
+    get_github_client,
+)
 
 logger = logging.getLogger(__name__)
 
+# How long a repository's default branch and its head SHA are reused
+REPO_META_TTL = 60
+
+# Attempts after the first for comment and review writes that hit a rate limit
+# or a 5xx; backoff doubles up to GITHUB_RETRY_MAX_DELAY seconds
+GITHUB_WRITE_RETRIES = 5
+GITHUB_RETRY_MAX_DELAY = 60
+
+# Completion waits this long for the final PR comment; a slower post (typically
+# one backing off on a rate limit) carries on in the background
+FINAL_COMMENT_TIMEOUT = 10.0
+
+# While other checks are pending the combined CI state is polled again this
+# often, at most this many times; after that the triggering event decides, so a
+# lagging rollup or a required check that never reports can't strand the cycle
+CI_RECHECK_DELAY = 60.0
+CI_RECHECK_ATTEMPTS = 10
+
+# A PR comment at least this similar to the last one of its kind, with the same
+# score/recommendation/status, is not posted again
+SIMILAR_COMMENT_RATIO = 0.95
+# PRs whose last posted comments are remembered
+RECENT_COMMENTS_MAX = 256
+
+# Rough input size above which the PR description is built in a worker thread
+LARGE_DESCRIPTION_THRESHOLD = 64 * 1024
+
+# Files to modify at least this large are changed through a unified diff, so
+# the model returns only the changed hunks rather than the whole file
+DIFF_MODIFY_THRESHOLD = 4 * 1024
+
+# Entries kept per section of an iteration's memory
+MEMORY_MAX_ENTRIES = 5
+MEMORY_MAX_FILES = 50
+
+
+_PR_TEMPLATE_TAIL = """
+### Testing
+- [ ] Code follows project standards
+- [ ] All tests pass
+- [ ] No linting errors
+- [ ] Functionality works as expected
+"""
+
+# Shared read-only default for missing review sections
+_EMPTY: Mapping[str, Any] = types.MappingProxyType({})
+_CI_ICON = {"success": "✅"}
+# Failures of GitHub or the database that are logged without a traceback;
+# anything else is a bug and keeps one
+_EXPECTED_ERRORS = (httpx.HTTPError, SQLAlchemyError)
+
+# Review recommendations that end the cycle once CI is green
+_APPROVE_RECOMMENDATIONS = frozenset({"approve", "approve_with_suggestions"})
+
+# (recommendation, CI green) -> how the cycle ends, or None for another code
+# iteration while any remain; unlisted combinations fail the cycle
+_REVIEW_POLICY: dict[tuple[str, bool], tuple[IterationStatus, str] | None] = {
+    **{
+        (recommendation, True): (
+            IterationStatus.COMPLETED,
+            "Code approved and CI passed",
+        )
+        for recommendation in _APPROVE_RECOMMENDATIONS
+    },
+    ("request_changes", True): None,
+    ("request_changes", False): None,
+}
+
+# Combined check states meaning some of the head commit's checks haven't finished
+_CI_PENDING_STATES = frozenset({"PENDING", "EXPECTED"})
+
+_REVIEW_COMMENT_TEMPLATE = """## AI Code Review - Iteration {iteration}
+
+### {status}
+
+**Overall Score:** {score}/100
+
+**CI Status:** {ci_conclusion} ({ci_icon})
+
+### Analysis:
+- **Code Quality:** {code_quality}
+- **Requirements Compliance:** {requirements_compliance}
+- **Security & Best Practices:** {security_analysis}
+
+### Recommendation: **{recommendation}**
+
+{summary}
+
+---
+*This review was generated automatically by AI Coding Agent*"""
+
+_CYCLE_COMPLETED_TEMPLATE = """## SDLC Cycle Completed Successfully!
+
+The automated development cycle has been completed successfully after {current_iteration} iteration(s).
+
+**Final Status:** {message}
+
+This PR is ready for human review and merge."""
+
+_CYCLE_FAILED_TEMPLATE = """## SDLC Cycle Failed
+
+The automated development cycle could not be completed successfully.
+
+**Reason:** {message}
+**Iterations:** {current_iteration}/{max_iterations}
+
+Manual intervention may be required to resolve the remaining issues."""
+
+# Final comment per end status; any other status reads as a failure
+_FINAL_TEMPLATES: dict[IterationStatus, str] = {
+    IterationStatus.COMPLETED: _CYCLE_COMPLETED_TEMPLATE,
+    IterationStatus.FAILED: _CYCLE_FAILED_TEMPLATE,
+}
+
+
+def _strip_code_fence(text: str) -> str:
+    """Drop a leading ```lang line and a trailing ``` line, if present."""
+    if text.startswith("```"):
+        newline = text.find("\n")
+        if newline != -1 and (newline == 3 or text[3:newline].isalpha()):
+            text = text[newline + 1 :]
+    if text.endswith("\n```"):
+        return text[:-4]
+    if text.endswith("\n```\n"):
+        return text[:-5] + "\n"
+    return text
+
+
+def _update_memory(
+    memory: dict[str, list[str]] | None, analysis: dict[str, Any], feedback: str | None
+) -> dict[str, list[str]]:
+    """Fold one code iteration's analysis and the feedback it answered into memory."""
+    memory = memory or {}
+    files = memory.get("key_files", []) + [
+        path
+        for path in analysis.get("files_to_modify", [])
+        + analysis.get("files_to_create", [])
+        if path not in memory.get("key_files", [])
+    ]
+    approaches = memory.get("approaches", [])
+    if analysis.get("technical_approach"):
+        approaches = approaches + [analysis["technical_approach"]]
+    corrections = memory.get("corrections", [])
+    if feedback and (not corrections or corrections[-1] != feedback):
+        corrections = corrections + [feedback]
+    return {
+        "key_files": files[-MEMORY_MAX_FILES:],
+        "approaches": approaches[-MEMORY_MAX_ENTRIES:],
+        "corrections": corrections[-MEMORY_MAX_ENTRIES:],
+    }
+
+
+def _format_memory(memory: dict[str, list[str]] | None, feedback: str | None) -> str:
+    """Render memory as a prompt section; the current feedback is sent on its own."""
+    if not memory:
+        return ""
+    sections = []
+    if memory.get("key_files"):
+        sections.append("Files changed so far: " + ", ".join(memory["key_files"]))
+    if memory.get("approaches"):
+        sections.append(
+            "Approaches tried:\n" + "\n".join(f"- {a}" for a in memory["approaches"])
+        )
+    earlier = [c for c in memory.get("corrections", []) if c != feedback]
+    if earlier:
+        sections.append(
+            "Earlier review feedback:\n" + "\n".join(f"- {c}" for c in earlier)
+        )
+    return "\n\n".join(sections)
+
+
+def _is_near_duplicate(previous: str, new: str) -> bool:
+    """Whether new is at least SIMILAR_COMMENT_RATIO similar to previous."""
+    if previous == new:
+        return True
+    matcher = difflib.SequenceMatcher(None, previous, new, autojunk=False)
+    # Cheap upper bounds first; ratio() is quadratic in the worst case
+    return (
+        matcher.real_quick_ratio() >= SIMILAR_COMMENT_RATIO
+        and matcher.quick_ratio() >= SIMILAR_COMMENT_RATIO
+        and matcher.ratio() >= SIMILAR_COMMENT_RATIO
+    )
+
+
+def _git_blob_sha(content: bytes) -> str:
+    """SHA git assigns to a blob with this content, as listed in trees."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _cache_key(*parts: Any) -> str:
+    """Content address of the inputs that fully determine an LLM step."""
+    return hashlib.sha256(orjson.dumps(parts)).hexdigest()
+
+
+# System prompts are kept free of per-request data so the provider can reuse
+# its cached prefix across calls; everything variable goes in the user message
+ANALYZE_SYSTEM_PROMPT = """You are an expert software developer analyzing GitHub issues.
+Analyze the issue and provide a structured response for implementation.
+
+Consider:
+1. What needs to be implemented
+2. Files to create or modify
+3. Technical approach
+4. Dependencies needed
+
+If this is a follow-up iteration, also consider the previous feedback.
+
+Respond in JSON format:
+{
+    "summary": "Brief description",
+    "files_to_modify": ["list", "of", "files"],
+    "files_to_create": ["list", "of", "new", "files"],
+    "requirements": ["list", "of", "requirements"],
+    "technical_approach": "Implementation approach",
+    "dependencies": ["list", "of", "dependencies"]
+}"""
+
+MODIFY_SYSTEM_PROMPT = """You are an expert software developer modifying code files.
+
+Modify the existing file to implement the required functionality.
+
+Rules:
+1. Preserve existing functionality unless it conflicts
+2. Follow best practices and coding standards
+3. Add proper error handling and documentation
+4. Include type hints where appropriate
+
+Return only the complete modified file content."""
+
+MODIFY_DIFF_SYSTEM_PROMPT = """You are an expert software developer modifying code files.
+
+Change the existing file to implement the required functionality.
+
+Rules:
+1. Preserve existing functionality unless it conflicts
+2. Follow best practices and coding standards
+3. Add proper error handling and documentation
+4. Include type hints where appropriate
+
+Return only a unified diff against the current file, no explanations: start
+with "--- a/<path>" and "+++ b/<path>", use "@@ -start,count +start,count @@"
+hunk headers and include 3 lines of unchanged context around every change."""
+
+CREATE_SYSTEM_PROMPT = """You are an expert software developer creating new code files.
+
+Create a new file that implements the required functionality.
+
+Rules:
+1. Follow best practices and coding standards
+2. Add comprehensive documentation
+3. Include proper error handling
+4. Add type hints and imports
+
+Return only the complete file content."""
+
+
+@dataclass(frozen=True, slots=True)
+class ReviewContext:
+    """Everything one review pass reads, fixed when the review starts."""
+
+    repo_full_name: str
+    owner: str
+    repo: str
+    issue_number: int
+    issue_title: str | None
+    issue_body: str | None
+    pr_number: int
+    pr_data: dict[str, Any]
+    pr_files: list[dict[str, Any]]
+    ci_status: str | None
+    ci_conclusion: str | None
+    iteration: int
+    installation_id: int
+
 
 class SDLCOrchestrator:
     def __init__(self):
+        settings = get_settings()
         self.llm_client = OpenAIClient(
             openai_api_key=settings.openai_api_key,
             openai_model=settings.openai_model,
-            openai_base_url=settings.openai_base_url
+            openai_base_url=settings.openai_base_url,
+            max_concurrency=settings.llm_concurrency,
         )
-    
-    async def start_issue_cycle(
+        # One entered client per installation, kept for the orchestrator's lifetime
+        self._client_pool: dict[int, GitHubAppClient] = {}
+        # Analysis and file results keyed by their inputs, so restarts and CI
+        # re-runs with unchanged inputs skip the LLM
+        self._llm_cache = LLMCache(cache_dir=settings.llm_cache_dir)
+        # Reviews get PR data from the pooled app client, so no PyGithub client
+        self._reviewer = ReviewerAgent(None, self.llm_client)
+        # "owner/repo" -> (expires_at, default_branch, base_sha)
+        self._repo_meta_cache: dict[str, tuple[float, str, str]] = {}
+        # (repo_full_name, pr_number) -> lock serializing CI events for that PR
+        self._ci_locks: dict[tuple[str, int], asyncio.Lock] = {}
+        # (repo_full_name, pr_number, kind) -> (marker, text) of the last comment posted
+        self._recent_comments: OrderedDict[tuple[str, int, str], tuple[Any, str]] = (
+            OrderedDict()
+        )
+        # Caps code iterations globally; follow-ups queue for a fixed set of workers
+        self._iteration_slots = asyncio.Semaphore(settings.max_concurrent_iterations)
+        self._iteration_queue: asyncio.Queue[IssueIteration] = asyncio.Queue()
+        self._iteration_workers: list[asyncio.Task] = []
+        # (iteration id, cycle) pairs whose final comment was posted or is in flight
+        self._posted_finals: OrderedDict[tuple[int, int], None] = OrderedDict()
+        # (repo_full_name, pr_number) -> the scheduled re-check of a pending CI state
+        self._ci_rechecks: dict[tuple[str, int], asyncio.Task] = {}
+        # Final comments that outlived FINAL_COMMENT_TIMEOUT, kept referenced until done
+        self._background_posts: set[asyncio.Future] = set()
+        # LLM cache key -> the running generation, joined by identical requests
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Reviews that came back without an overall assessment and were not posted
+        self._empty_reviews = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Stop the iteration workers and release all pooled GitHub clients."""
+        workers = self._iteration_workers + list(self._ci_rechecks.values())
+        self._iteration_workers = []
+        self._ci_rechecks.clear()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        if self._background_posts:
+            _, pending = await asyncio.wait(
+                self._background_posts, timeout=FINAL_COMMENT_TIMEOUT
+            )
+            for post in pending:
+                post.cancel()
+
+        clients = list(self._client_pool.values())
+        self._client_pool.clear()
+        for client in clients:
+            await client.__aexit__(None, None, None)
+
+    async def _gh_call_with_retry(
         self,
-        repo_full_name: str,
-        issue_number: int,
-        installation_id: int
-    ) -> Optional[IssueIteration]:
+        call: Callable[[], Awaitable[Any]],
+        max_retries: int = GITHUB_WRITE_RETRIES,
+    ) -> Any:
+        """Await call(), retrying rate limits after Retry-After and 5xx with backoff."""
+        for attempt in range(max_retries + 1):
+            try:
+                return await call()
+            except GitHubRateLimited as e:
+                if attempt == max_retries:
+                    raise
+                delay = e.retry_after
+            except GitHubServerError:
+                if attempt == max_retries:
+                    raise
+                delay = min(GITHUB_RETRY_MAX_DELAY, 2**attempt)
+
+            delay += random.uniform(0, 0.5)
+            logger.warning(
+                "GitHub write failed (attempt %s), retrying in %.1fs",
+                attempt + 1,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+    def _is_repeat_comment(
+        self, key: tuple[str, int, str], marker: Any, text: str
+    ) -> bool:
+        """Whether text repeats the last comment of this kind on the PR."""
+        previous = self._recent_comments.get(key)
+        if previous is None or previous[0] != marker:
+            return False
+        self._recent_comments.move_to_end(key)
+        return _is_near_duplicate(previous[1], text)
+
+    def _remember_comment(
+        self, key: tuple[str, int, str], marker: Any, text: str
+    ) -> None:
+        self._recent_comments[key] = (marker, text)
+        self._recent_comments.move_to_end(key)
+        if len(self._recent_comments) > RECENT_COMMENTS_MAX:
+            self._recent_comments.popitem(last=False)
+
+    async def _single_flight(
+        self, key: str, factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run factory() once for concurrent callers with the same key."""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Shield so a cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Raised to this caller below; don't warn if nobody joined
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def cache_stats(self) -> dict[str, int]:
+        """Hit and miss counts of the analysis and file generation cache."""
+        return {**self._llm_cache.stats, "size": len(self._llm_cache)}
+
+    def review_stats(self) -> dict[str, int]:
+        """Counts of reviews dropped before posting."""
+        return {"empty_reviews": self._empty_reviews}
+
+    async def _get_repo_meta(self, github, owner: str, repo: str) -> tuple[str, str]:
+        """Get the default branch and its head SHA, cached for REPO_META_TTL seconds."""
+        key = f"{owner}/{repo}"
+        cached = self._repo_meta_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+
+        default_branch = await github.get_default_branch(owner, repo)
+        base_sha = await github.get_branch_sha(owner, repo, default_branch)
+        self._repo_meta_cache[key] = (
+            time.monotonic() + REPO_META_TTL,
+            default_branch,
+            base_sha,
+        )
+        return default_branch, base_sha
+
+    async def get_client(self, installation_id: int) -> GitHubAppClient:
+        """Return the pooled client for an installation; callers must not close it."""
+        client = self._client_pool.get(installation_id)
+        if client is None:
+            client = await get_github_client(installation_id)
+            await client.__aenter__()
+            self._client_pool[installation_id] = client
+        return client
+
+    async def start_issue_cycle(
+        self, repo_full_name: str, issue_number: int, installation_id: int
+    ) -> IssueIteration | None:
         try:
-            logger.info(f"Starting SDLC cycle for {repo_full_name}#{issue_number}")
-            
-            existing_iteration = db_manager.get_active_iteration(repo_full_name, issue_number)
+            logger.info("Starting SDLC cycle for %s#%s", repo_full_name, issue_number)
+
+            existing_iteration = await db_manager.get_active_iteration(
+                repo_full_name, issue_number
+            )
             if existing_iteration:
-                logger.info(f"Active iteration already exists for issue #{issue_number} (ID: {existing_iteration.id})")
+                logger.info(
+                    "Active iteration already exists for issue #%s (ID: %s)",
+                    issue_number,
+                    existing_iteration.id,
+                )
                 return existing_iteration
-            
+
             owner, repo = repo_full_name.split("/")
-            
-            async with await get_github_client(installation_id) as github:
-                issue_data = await github.get_issue(owner, repo, issue_number)
-            
-            iteration = db_manager.create_iteration(
+
+            github = await self.get_client(installation_id)
+            issue_data = await github.get_issue(owner, repo, issue_number)
+
+            iteration = await db_manager.create_iteration(
                 repo_full_name=repo_full_name,
                 issue_number=issue_number,
                 installation_id=installation_id,
                 issue_title=issue_data.get("title"),
                 issue_body=issue_data.get("body"),
-                max_iterations=settings.max_iterations
+                max_iterations=get_settings().max_iterations,
             )
-            
+
             await self._run_code_iteration(iteration)
-            
+
             return iteration
-            
+
         except Exception as e:
-            logger.error(f"Failed to start issue cycle: {e}", exc_info=True)
+            logger.error("Failed to start issue cycle: %s", e, exc_info=True)
             return None
-    
+
     async def restart_issue_cycle(
-        self,
-        repo_full_name: str,
-        issue_number: int,
-        installation_id: int
-    ) -> Optional[IssueIteration]:
+        self, repo_full_name: str, issue_number: int, installation_id: int
+    ) -> IssueIteration | None:
         try:
-            logger.info(f"Restarting SDLC cycle for {repo_full_name}#{issue_number}")
-            
-            existing_iteration = db_manager.get_active_iteration(repo_full_name, issue_number)
+            logger.info("Restarting SDLC cycle for %s#%s", repo_full_name, issue_number)
+
+            existing_iteration = await db_manager.get_active_iteration(
+                repo_full_name, issue_number
+            )
             if existing_iteration:
-                logger.info(f"Marking existing iteration {existing_iteration.id} as failed to restart")
-                db_manager.complete_iteration(existing_iteration.id, IterationStatus.FAILED)
-            
+                logger.info(
+                    "Marking existing iteration %s as failed to restart",
+                    existing_iteration.id,
+                )
+                await db_manager.complete_iteration(
+                    existing_iteration.id, IterationStatus.FAILED
+                )
+
             owner, repo = repo_full_name.split("/")
-            
-            async with await get_github_client(installation_id) as github:
-                issue_data = await github.get_issue(owner, repo, issue_number)
-            
-            iteration = db_manager.create_iteration(
+
+            github = await self.get_client(installation_id)
+            issue_data = await github.get_issue(owner, repo, issue_number)
+
+            iteration = await db_manager.create_iteration(
                 repo_full_name=repo_full_name,
                 issue_number=issue_number,
                 installation_id=installation_id,
                 issue_title=issue_data.get("title"),
                 issue_body=issue_data.get("body"),
-                max_iterations=settings.max_iterations
+                max_iterations=get_settings().max_iterations,
             )
-            
+
             await self._run_code_iteration(iteration)
-            
+
             return iteration
-            
+
         except Exception as e:
-            logger.error(f"Failed to restart issue cycle: {e}", exc_info=True)
+            logger.error("Failed to restart issue cycle: %s", e, exc_info=True)
             return None
-    
+
+    def _enqueue_code_iteration(self, iteration: IssueIteration) -> None:
+        """Schedule a follow-up iteration, starting the workers on first use."""
+        if not self._iteration_workers:
+            self._iteration_workers = [
+                asyncio.create_task(self._iteration_worker())
+                for _ in range(get_settings().max_concurrent_iterations)
+            ]
+        self._iteration_queue.put_nowait(iteration)
+
+    async def _iteration_worker(self) -> None:
+        while True:
+            iteration = await self._iteration_queue.get()
+            try:
+                await self._run_code_iteration(iteration)
+            finally:
+                self._iteration_queue.task_done()
+
     async def _run_code_iteration(self, iteration: IssueIteration) -> bool:
+        async with self._iteration_slots:
+            return await self._execute_code_iteration(iteration)
+
+    async def _execute_code_iteration(self, iteration: IssueIteration) -> bool:
         try:
-            logger.info(f"Running code iteration {iteration.current_iteration + 1} for {iteration.repo_full_name}#{iteration.issue_number}")
-            
-            iteration = db_manager.increment_iteration(iteration.id)
+            logger.info(
+                "Running code iteration %s for %s#%s",
+                iteration.current_iteration + 1,
+                iteration.repo_full_name,
+                iteration.issue_number,
+            )
+
+            iteration = await db_manager.increment_iteration(iteration.id)
             if not iteration:
                 logger.error("Failed to increment iteration")
                 return False
-            
+
             if iteration.current_iteration >= iteration.max_iterations:
-                await self._complete_iteration(iteration, IterationStatus.FAILED, 
-                                             "Maximum iterations reached")
+                await self._complete_iteration(
+                    iteration, IterationStatus.FAILED, "Maximum iterations reached"
+                )
                 return False
-            
-            owner, repo = iteration.repo_full_name.split("/")
-            
+
             context = {
                 "repo_full_name": iteration.repo_full_name,
+                "owner": iteration.owner,
+                "repo": iteration.repo_name,
                 "issue_number": iteration.issue_number,
                 "issue_title": iteration.issue_title,
                 "issue_body": iteration.issue_body,
                 "iteration": iteration.current_iteration,
                 "branch_name": iteration.branch_name,
                 "pr_number": iteration.pr_number,
-                "last_review_feedback": iteration.last_review_feedback
+                "last_review_feedback": iteration.last_review_feedback,
+                "memory": iteration.iteration_memory,
             }
-            
-            async with await get_github_client(iteration.installation_id) as github:
-                result = await self._execute_code_agent(github, context)
-            
+
+            github = await self.get_client(iteration.installation_id)
+            result = await self._execute_code_agent(github, context)
+
             if not result:
-                await self._complete_iteration(iteration, IterationStatus.FAILED, 
-                                             "Code generation failed")
+                await self._complete_iteration(
+                    iteration, IterationStatus.FAILED, "Code generation failed"
+                )
                 return False
-            
-            db_manager.update_iteration(
+
+            await db_manager.update_iteration(
                 iteration.id,
                 branch_name=result.get("branch_name"),
                 pr_number=result.get("pr_number"),
-                status=IterationStatus.WAITING_CI
+                iteration_memory=_update_memory(
+                    iteration.iteration_memory,
+                    result["analysis"],
+                    iteration.last_review_feedback,
+                ),
+                status=IterationStatus.WAITING_CI,
+            )
+
+            logger.info(
+                "Code iteration completed, waiting for CI. PR: %s",
+                result.get("pr_number"),
             )
-            
-            logger.info(f"Code iteration completed, waiting for CI. PR: {result.get('pr_number')}")
             return True
-            
+
         except Exception as e:
-            logger.error(f"Code iteration failed: {e}", exc_info=True)
+            logger.error("Code iteration failed: %s", e, exc_info=True)
             await self._complete_iteration(iteration, IterationStatus.FAILED, str(e))
             return False
-    
+
     async def _execute_code_agent(
-        self, 
-        github, 
-        context: Dict[str, Any]
-    ) -> Optional[Dict[str, Any]]:
+        self, github, context: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        # The analysis needs nothing from the branch, so the LLM call runs
+        # while the branch is set up
+        analysis_task = asyncio.create_task(self._analyze_issue_requirements(context))
         try:
-            owner, repo = context["repo_full_name"].split("/")
+            owner, repo = context["owner"], context["repo"]
             issue_number = context["issue_number"]
-            
+
             branch_name = context.get("branch_name")
             if not branch_name:
                 branch_name = f"agent/issue-{issue_number}"
-            
-            default_branch = await github.get_default_branch(owner, repo)
-            base_sha = await github.get_branch_sha(owner, repo, default_branch)
-            
+
+            default_branch, base_sha = await self._get_repo_meta(github, owner, repo)
+
             try:
                 await github.create_branch(owner, repo, branch_name, base_sha)
-                logger.info(f"Created branch {branch_name}")
+                logger.info("Created branch %s", branch_name)
             except Exception as e:
                 error_str = str(e).lower()
-                if "422" in error_str or "already exists" in error_str or "reference already exists" in error_str:
-                    logger.info(f"Branch {branch_name} already exists, will update it")
+                if (
+                    "422" in error_str
+                    or "already exists" in error_str
+                    or "reference already exists" in error_str
+                ):
+                    logger.info("Branch %s already exists, will update it", branch_name)
                     try:
                         await github.update_branch(owner, repo, branch_name, base_sha)
-                        logger.info(f"Updated branch {branch_name} to latest commit")
+                        logger.info("Updated branch %s to latest commit", branch_name)
                     except Exception as update_e:
-                        logger.warning(f"Could not update branch {branch_name}: {update_e}, continuing anyway")
+                        logger.warning(
+                            "Could not update branch %s: %s, continuing anyway",
+                            branch_name,
+                            update_e,
+                        )
                 else:
-                    logger.error(f"Failed to create branch: {e}")
+                    logger.error("Failed to create branch: %s", e)
                     return None
-            
-            analysis = await self._analyze_issue_requirements(context)
+
+            analysis = await analysis_task
             if not analysis:
                 return None
-            
+            if not analysis.get("files_to_modify") and not analysis.get(
+                "files_to_create"
+            ):
+                # Nothing to commit; a PR without changes would be rejected anyway
+                logger.warning(
+                    "Analysis of issue #%s lists no files to change", issue_number
+                )
+                return None
+
             changes_applied = await self._apply_code_changes(
                 github, owner, repo, branch_name, analysis, context
             )
-            
+
             if not changes_applied:
                 return None
-            
+
+            pr_body = await self._build_pr_description(context, analysis)
             pr_number = context.get("pr_number")
             if pr_number:
                 pr_title = f"Fix #{issue_number}: {context['issue_title']} (Iteration {context['iteration']})"
-                pr_body = self._generate_pr_description(context, analysis)
-                
+
                 await github.update_pull_request(
                     owner, repo, pr_number, title=pr_title, body=pr_body
                 )
-                logger.info(f"Updated PR #{pr_number}")
+                logger.info("Updated PR #%s", pr_number)
             else:
                 pr_title = f"Fix #{issue_number}: {context['issue_title']}"
-                pr_body = self._generate_pr_description(context, analysis)
-                
+
                 pr_data = await github.create_pull_request(
                     owner, repo, pr_title, pr_body, branch_name, default_branch
                 )
                 pr_number = pr_data["number"]
-                logger.info(f"Created PR #{pr_number}")
-            
+                logger.info("Created PR #%s", pr_number)
+
             return {
                 "branch_name": branch_name,
                 "pr_number": pr_number,
-                "analysis": analysis
+                "analysis": analysis,
             }
-            
+
         except Exception as e:
-            logger.error(f"Code agent execution failed: {e}", exc_info=True)
+            logger.error("Code agent execution failed: %s", e, exc_info=True)
             return None
-    
-    async def _analyze_issue_requirements(self, context: Dict[str, Any]) -> Optional[Dict]:
+        finally:
+            analysis_task.cancel()
+
+    async def _analyze_issue_requirements(self, context: dict[str, Any]) -> dict | None:
         """Analyze issue requirements using LLM."""
         try:
-            system_prompt = """You are an expert software developer analyzing GitHub issues.
-            Analyze the issue and provide a structured response for implementation.
-            
-            Consider:
-            1. What needs to be implemented
-            2. Files to create or modify
-            3. Technical approach
-            4. Dependencies needed
-            
-            If this is a follow-up iteration, also consider the previous feedback.
-            
-            Respond in JSON format:
-            {
-                "summary": "Brief description",
-                "files_to_modify": ["list", "of", "files"],
-                "files_to_create": ["list", "of", "new", "files"],
-                "requirements": ["list", "of", "requirements"],
-                "technical_approach": "Implementation approach",
-                "dependencies": ["list", "of", "dependencies"]
-            }"""
-            
             user_prompt = f"""Issue #{context['issue_number']}: {context['issue_title']}
 
 Description:
 {context['issue_body'] or 'No description provided'}
 
 Iteration: {context['iteration']}"""
-            
-            if context.get('last_review_feedback'):
-                user_prompt += f"\n\nPrevious review feedback:\n{context['last_review_feedback']}"
-            
-            messages = [
-                self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
-            ]
-            
-            response = await self.llm_client.generate_response(messages)
-            
-            import json
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            
+
+            memory = _format_memory(
+                context.get("memory"), context.get("last_review_feedback")
+            )
+            if memory:
+                user_prompt += f"\n\nFrom earlier iterations:\n{memory}"
+
+            if context.get("last_review_feedback"):
+                user_prompt += (
+                    f"\n\nPrevious review feedback:\n{context['last_review_feedback']}"
+                )
+
+            cache_key = _cache_key(
+                "analyze",
+                context["issue_title"],
+                context["issue_body"],
+                context.get("last_review_feedback"),
+                memory,
+            )
+            response = self._llm_cache.get(cache_key)
+            if response is None:
+                messages = [
+                    self.llm_client.create_system_message(ANALYZE_SYSTEM_PROMPT),
+                    self.llm_client.create_user_message(user_prompt),
+                ]
+
+                # The analysis is one JSON object; stop reading once it closes
+                scanner = JsonObjectScanner()
+                response = await self._single_flight(
+                    cache_key,
+                    lambda: self.llm_client.generate_response(
+                        messages, until=lambda delta: scanner.feed(delta) is not None
+                    ),
+                )
+
+            json_text = extract_json(response)
+            if json_text:
+                analysis = orjson.loads(json_text)
+                self._llm_cache.set(cache_key, response)
+                return analysis
+
             logger.error("Could not parse LLM analysis response")
             return None
-            
+
         except Exception as e:
-            logger.error(f"Issue analysis failed: {e}", exc_info=True)
+            logger.error("Issue analysis failed: %s", e, exc_info=True)
             return None
-    
+
     async def _apply_code_changes(
         self,
         github,
         owner: str,
         repo: str,
         branch_name: str,
-        analysis: Dict,
-        context: Dict[str, Any]
+        analysis: dict,
+        context: dict[str, Any],
     ) -> bool:
         try:
-            repo_files = await github.list_repository_files(owner, repo)
-            
-            for file_path in analysis.get("files_to_modify", []):
-                success = await self._modify_file(
-                    github, owner, repo, branch_name, file_path, analysis, context
-                )
-                if not success:
-                    logger.warning(f"Failed to modify {file_path}")
-            
-            for file_path in analysis.get("files_to_create", []):
-                success = await self._create_file(
-                    github, owner, repo, branch_name, file_path, analysis, context
+            # One recursive tree listing gives the blob SHA of every path, so
+            # existing files are read with a single blob fetch each
+            branch_sha = await github.get_branch_sha(owner, repo, branch_name)
+            tree = await github.get_tree(owner, repo, branch_sha)
+            blobs = [entry for entry in tree["tree"] if entry["type"] == "blob"]
+            context["tree"] = {entry["path"]: entry["sha"] for entry in blobs}
+            # Executables and symlinks have to keep their mode when rewritten
+            context["tree_modes"] = {entry["path"]: entry["mode"] for entry in blobs}
+            context["tree_truncated"] = tree.get("truncated", False)
+
+            files_to_modify = analysis.get("files_to_modify", [])
+            files_to_create = analysis.get("files_to_create", [])
+            # Current text of every file to modify in one round trip; anything
+            # missing here is read over REST by _modify_file
+            context["file_texts"] = {}
+            if files_to_modify:
+                try:
+                    context["file_texts"] = await github.get_files_text(
+                        owner, repo, branch_sha, files_to_modify
+                    )
+                except _EXPECTED_ERRORS + (ValueError,) as e:
+                    logger.warning(
+                        "Batched file fetch failed, reading files one by one: %s", e
+                    )
+
+            semaphore = asyncio.Semaphore(get_settings().max_github_concurrency)
+
+            async def guarded(coro):
+                async with semaphore:
+                    return await coro
+
+            # Files are independent, so overlap their fetches and LLM calls
+            contents = await asyncio.gather(
+                *(
+                    guarded(
+                        self._modify_file(
+                            github,
+                            owner,
+                            repo,
+                            branch_name,
+                            file_path,
+                            analysis,
+                            context,
+                        )
+                    )
+                    for file_path in files_to_modify
+                ),
+                *(
+                    guarded(self._create_file(file_path, analysis, context))
+                    for file_path in files_to_create
+                ),
+            )
+
+            changed_files = []
+            actions = ["modify"] * len(files_to_modify) + ["create"] * len(
+                files_to_create
+            )
+            for file_path, action, content in zip(
+                files_to_modify + files_to_create, actions, contents, strict=True
+            ):
+                if content is None:
+                    logger.warning("Failed to %s %s", action, file_path)
+                    continue
+
+                encoded = content.encode()
+                if context["tree"].get(file_path) == _git_blob_sha(encoded):
+                    # Regenerated identically; committing it would be a no-op
+                    logger.info("%s is unchanged, skipping", file_path)
+                    continue
+                changed_files.append((file_path, encoded))
+
+            if not changed_files:
+                # No commit means no PR can be opened and no CI run will start
+                logger.warning(
+                    "No file changed for issue #%s, nothing to commit",
+                    context["issue_number"],
                 )
-                if not success:
-                    logger.warning(f"Failed to create {file_path}")
-            
+                return False
+
+            # One commit for the whole iteration instead of one per file
+            commit_message = f"Apply changes for issue #{context['issue_number']} (iteration {context['iteration']})"
+            await github.commit_files(
+                owner,
+                repo,
+                branch_name,
+                changed_files,
+                commit_message,
+                base_sha=branch_sha,
+                modes=context["tree_modes"],
+            )
+            logger.info("Committed %s files to %s", len(changed_files), branch_name)
             return True
-            
+
         except Exception as e:
-            logger.error(f"Failed to apply code changes: {e}", exc_info=True)
+            logger.error("Failed to apply code changes: %s", e, exc_info=True)
             return False
-    
+
     async def _modify_file(
         self,
         github,
@@ -309,97 +902,138 @@ Iteration: {context['iteration']}"""
         repo: str,
         branch_name: str,
         file_path: str,
-        analysis: Dict,
-        context: Dict[str, Any]
-    ) -> bool:
+        analysis: dict,
+        context: dict[str, Any],
+    ) -> str | None:
+        """Generate the new content of an existing file."""
         try:
-            file_data = await github.get_file_content(owner, repo, file_path, branch_name)
-            if not file_data:
-                logger.warning(f"File {file_path} not found, will create instead")
-                return await self._create_file(github, owner, repo, branch_name, file_path, analysis, context)
-            
-            import base64
-            current_content = base64.b64decode(file_data["content"]).decode()
-            
+            current_content = context.get("file_texts", {}).get(file_path)
+            if current_content is None:
+                current_content = await self._read_file(
+                    github, owner, repo, branch_name, file_path, context
+                )
+
+            if current_content is None:
+                logger.warning("File %s not found, will create instead", file_path)
+                return await self._create_file(file_path, analysis, context)
+
             modified_content = await self._generate_file_content(
                 file_path, current_content, analysis, context, is_modification=True
             )
-            
+
             if not modified_content:
-                return False
-            
-            commit_message = f"Modify {file_path} for issue #{context['issue_number']} (iteration {context['iteration']})"
-            
-            await github.create_or_update_file(
-                owner, repo, file_path, modified_content, commit_message, branch_name, file_data["sha"]
-            )
-            
-            logger.info(f"Modified file {file_path}")
-            return True
-            
+                return None
+
+            logger.info("Generated modification for %s", file_path)
+            return modified_content
+
         except Exception as e:
-            logger.error(f"Failed to modify file {file_path}: {e}", exc_info=True)
-            return False
-    
-    async def _create_file(
+            logger.error("Failed to modify file %s: %s", file_path, e, exc_info=True)
+            return None
+
+    async def _read_file(
         self,
         github,
         owner: str,
         repo: str,
         branch_name: str,
         file_path: str,
-        analysis: Dict,
-        context: Dict[str, Any]
-    ) -> bool:
+        context: dict[str, Any],
+    ) -> str | None:
+        """Read a file over REST, or None if it does not exist on the branch."""
+        blob_sha = context.get("tree", {}).get(file_path)
+        raw_content = None
+        if blob_sha:
+            # Raw bytes, without the base64 copy the JSON form carries
+            raw_content = await github.get_blob_raw(owner, repo, blob_sha)
+        elif context.get("tree_truncated", True):
+            # Not every path made it into the listing
+            file_data = await github.get_file_content(
+                owner, repo, file_path, branch_name
+            )
+            if file_data:
+                raw_content = base64.b64decode(file_data["content"])
+
+        if raw_content is None:
+            return None
+        return raw_content.decode("utf-8", errors="replace")
+
+    async def _create_file(
+        self, file_path: str, analysis: dict, context: dict[str, Any]
+    ) -> str | None:
+        """Generate the content of a new file."""
         try:
             file_content = await self._generate_file_content(
                 file_path, None, analysis, context, is_modification=False
             )
-            
+
             if not file_content:
-                return False
-            
-            commit_message = f"Create {file_path} for issue #{context['issue_number']} (iteration {context['iteration']})"
-            
-            await github.create_or_update_file(
-                owner, repo, file_path, file_content, commit_message, branch_name
-            )
-            
-            logger.info(f"Created file {file_path}")
-            return True
-            
+                return None
+
+            logger.info("Generated new file %s", file_path)
+            return file_content
+
         except Exception as e:
-            logger.error(f"Failed to create file {file_path}: {e}", exc_info=True)
-            return False
-    
+            logger.error("Failed to create file %s: %s", file_path, e, exc_info=True)
+            return None
+
     async def _generate_file_content(
         self,
         file_path: str,
-        current_content: Optional[str],
-        analysis: Dict,
-        context: Dict[str, Any],
-        is_modification: bool
-    ) -> Optional[str]:
+        current_content: str | None,
+        analysis: dict,
+        context: dict[str, Any],
+        is_modification: bool,
+    ) -> str | None:
         try:
+            # Sections shared by every file of the iteration come first
+            user_prompt = f"""Requirements:
+- Summary: {analysis.get('summary', '')}
+- Technical approach: {analysis.get('technical_approach', '')}
+- Requirements: {', '.join(analysis.get('requirements', []))}"""
+
+            if not is_modification:
+                user_prompt += (
+                    f"\n- Dependencies: {', '.join(analysis.get('dependencies', []))}"
+                )
+
+            if context.get("last_review_feedback"):
+                user_prompt += f"\n\nConsider this feedback from previous review:\n{context['last_review_feedback']}"
+
+            cache_key = _cache_key(
+                "generate",
+                file_path,
+                is_modification,
+                current_content or "",
+                analysis.get("summary", ""),
+                analysis.get("technical_approach", ""),
+                analysis.get("requirements", []),
+                analysis.get("dependencies", []),
+                context.get("last_review_feedback") or "",
+            )
+            cached = self._llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            if is_modification and len(current_content) >= DIFF_MODIFY_THRESHOLD:
+                patched = await self._single_flight(
+                    "patch:" + cache_key,
+                    lambda: self._generate_file_patch(
+                        file_path, current_content, user_prompt
+                    ),
+                )
+                if patched is not None:
+                    self._llm_cache.set(cache_key, patched)
+                    return patched
+                logger.warning(
+                    "Diff for %s did not apply cleanly, requesting full file", file_path
+                )
+
             if is_modification:
-                system_prompt = f"""You are an expert software developer modifying code files.
-                
-                Modify the existing file to implement the required functionality.
-                
-                Requirements:
-                - Summary: {analysis.get('summary', '')}
-                - Technical approach: {analysis.get('technical_approach', '')}
-                - Requirements: {', '.join(analysis.get('requirements', []))}
-                
-                Rules:
-                1. Preserve existing functionality unless it conflicts
-                2. Follow best practices and coding standards
-                3. Add proper error handling and documentation
-                4. Include type hints where appropriate
-                
-                Return only the complete modified file content."""
-                
-                user_prompt = f"""File to modify: {file_path}
+                system_prompt = MODIFY_SYSTEM_PROMPT
+                user_prompt += f"""
+
+File to modify: {file_path}
 
 Current content:
 ```
@@ -408,359 +1042,638 @@ Current content:
 
 Please provide the modified file content."""
             else:
-                system_prompt = f"""You are an expert software developer creating new code files.
-                
-                Create a new file that implements the required functionality.
-                
-                Requirements:
-                - Summary: {analysis.get('summary', '')}
-                - Technical approach: {analysis.get('technical_approach', '')}
-                - Requirements: {', '.join(analysis.get('requirements', []))}
-                - Dependencies: {', '.join(analysis.get('dependencies', []))}
-                
-                Rules:
-                1. Follow best practices and coding standards
-                2. Add comprehensive documentation
-                3. Include proper error handling
-                4. Add type hints and imports
-                
-                Return only the complete file content."""
-                
-                user_prompt = f"""Create new file: {file_path}
+                system_prompt = CREATE_SYSTEM_PROMPT
+                user_prompt += f"""
+
+Create new file: {file_path}
 
 Please provide the complete file content."""
-            
-            if context.get('last_review_feedback'):
-                user_prompt += f"\n\nConsider this feedback from previous review:\n{context['last_review_feedback']}"
-            
+
             messages = [
                 self.llm_client.create_system_message(system_prompt),
-                self.llm_client.create_user_message(user_prompt)
+                self.llm_client.create_user_message(user_prompt),
             ]
-            
-            response = await self.llm_client.generate_response(messages)
-            
+
+            response = await self._single_flight(
+                cache_key, lambda: self.llm_client.generate_response(messages)
+            )
+
             # Clean up response (remove code block markers)
-            import re
-            response = re.sub(r'^```[a-zA-Z]*\n', '', response)
-            response = re.sub(r'\n```$', '', response)
-            
+            response = _strip_code_fence(response)
+
+            if response:
+                self._llm_cache.set(cache_key, response)
             return response
-            
+
         except Exception as e:
-            logger.error(f"Failed to generate content for {file_path}: {e}", exc_info=True)
+            logger.error(
+                "Failed to generate content for %s: %s", file_path, e, exc_info=True
+            )
             return None
-    
-    def _generate_pr_description(self, context: Dict[str, Any], analysis: Dict) -> str:
+
+    async def _generate_file_patch(
+        self, file_path: str, current_content: str, requirements_prompt: str
+    ) -> str | None:
+        """Ask for a unified diff and apply it; None if it does not apply cleanly."""
+        user_prompt = f"""{requirements_prompt}
+
+File to modify: {file_path}
+
+Current content (line numbers are for reference only and are not part of the file):
+```
+{number_lines(current_content)}
+```
+
+Please provide a unified diff that implements the required functionality."""
+
+        messages = [
+            self.llm_client.create_system_message(MODIFY_DIFF_SYSTEM_PROMPT),
+            self.llm_client.create_user_message(user_prompt),
+        ]
+
+        diff_text = _strip_code_fence(
+            (await self.llm_client.generate_response(messages)).strip()
+        )
+        return apply_unified_diff(current_content, diff_text)
+
+    async def _build_pr_description(
+        self, context: dict[str, Any], analysis: dict
+    ) -> str:
+        """Generate the PR description, off the event loop when the inputs are large."""
+        size = (
+            len(str(analysis.get("technical_approach") or ""))
+            + len(str(context.get("last_review_feedback") or ""))
+            + sum(len(str(req)) for req in analysis.get("requirements") or ())
+        )
+        if size < LARGE_DESCRIPTION_THRESHOLD:
+            return self._generate_pr_description(context, analysis)
+        return await asyncio.to_thread(self._generate_pr_description, context, analysis)
+
+    def _generate_pr_description(self, context: dict[str, Any], analysis: dict) -> str:
         """Generate PR description."""
-        description = f"""## Fixes #{context['issue_number']}
+        parts = [
+            f"""## Fixes #{context['issue_number']}
 
 **Issue Title:** {context['issue_title']}
 
-**Iteration:** {context['iteration']}/{context.get('max_iterations', settings.max_iterations)}
+**Iteration:** {context['iteration']}/{context.get('max_iterations', get_settings().max_iterations)}
 
 **Summary:** {analysis.get('summary', 'No summary available')}
 
 ### Changes Made:
 """
-        
-        if analysis.get('files_to_create'):
-            description += "\n**New Files:**\n"
-            for file_path in analysis['files_to_create']:
-                description += f"- `{file_path}`\n"
-        
-        if analysis.get('files_to_modify'):
-            description += "\n**Modified Files:**\n"
-            for file_path in analysis['files_to_modify']:
-                description += f"- `{file_path}`\n"
-
-        if analysis.get('requirements'):
-            description += "\n**Requirements Implemented:**\n"
-            for req in analysis['requirements']:
-                description += f"- {req}\n"
-
-        if analysis.get('technical_approach'):
-            description += f"\n**Technical Approach:**\n{analysis['technical_approach']}\n"
-
-        if context.get('last_review_feedback'):
-            description += f"\n**Addressed Feedback:**\n{context['last_review_feedback']}\n"
-
-        description += "\n### Testing\n"
-        description += "- [ ] Code follows project standards\n"
-        description += "- [ ] All tests pass\n"
-        description += "- [ ] No linting errors\n"
-        description += "- [ ] Functionality works as expected\n"
-
-        return description
-    
+        ]
+
+        if analysis.get("files_to_create"):
+            parts.append("\n**New Files:**\n")
+            parts.extend(
+                f"- `{file_path}`\n" for file_path in analysis["files_to_create"]
+            )
+
+        if analysis.get("files_to_modify"):
+            parts.append("\n**Modified Files:**\n")
+            parts.extend(
+                f"- `{file_path}`\n" for file_path in analysis["files_to_modify"]
+            )
+
+        if analysis.get("requirements"):
+            parts.append("\n**Requirements Implemented:**\n")
+            parts.extend(f"- {req}\n" for req in analysis["requirements"])
+
+        if analysis.get("technical_approach"):
+            parts.append(
+                f"\n**Technical Approach:**\n{analysis['technical_approach']}\n"
+            )
+
+        if context.get("last_review_feedback"):
+            parts.append(
+                f"\n**Addressed Feedback:**\n{context['last_review_feedback']}\n"
+            )
+
+        parts.append(_PR_TEMPLATE_TAIL)
+        return "".join(parts)
+
     async def handle_ci_completion(
         self,
         repo_full_name: str,
         pr_number: int,
         ci_status: str,
-        ci_conclusion: str
+        ci_conclusion: str,
+        recheck_attempt: int = 0,
     ) -> bool:
         try:
-            logger.info(f"Handling CI completion for {repo_full_name} PR#{pr_number}: {ci_status}/{ci_conclusion}")
-            
-            iteration = db_manager.get_iteration_by_pr(repo_full_name, pr_number)
-            if not iteration:
-                logger.warning(f"No active iteration found for PR #{pr_number}")
-                return False
-            
-            if iteration.status == IterationStatus.REVIEWING:
-                logger.info(f"Review already in progress for iteration {iteration.id}, skipping")
-                return True
-            
-            if iteration.status != IterationStatus.WAITING_CI:
-                logger.info(f"Iteration {iteration.id} not waiting for CI (status: {iteration.status}), skipping")
-                return True
-            
-            db_manager.update_iteration(
-                iteration.id,
-                last_ci_status=ci_status,
-                last_ci_conclusion=ci_conclusion,
-                status=IterationStatus.REVIEWING
+            logger.info(
+                "Handling CI completion for %s PR#%s: %s/%s",
+                repo_full_name,
+                pr_number,
+                ci_status,
+                ci_conclusion,
             )
-            
-            await self._run_review_iteration(iteration)
-            
+
+            # A push just landed, so the cached base SHA may be behind
+            self._repo_meta_cache.pop(repo_full_name, None)
+
+            # setdefault runs without yielding, so concurrent events share one lock.
+            # Events that waited re-read the iteration and find it past WAITING_CI.
+            lock = self._ci_locks.setdefault(
+                (repo_full_name, pr_number), asyncio.Lock()
+            )
+            async with lock:
+                iteration = await db_manager.get_iteration_by_pr(
+                    repo_full_name, pr_number
+                )
+                if not iteration:
+                    logger.warning("No active iteration found for PR #%s", pr_number)
+                    return False
+
+                if iteration.status == IterationStatus.REVIEWING:
+                    logger.info(
+                        "Review already in progress for iteration %s, skipping",
+                        iteration.id,
+                    )
+                    return True
+
+                if iteration.status != IterationStatus.WAITING_CI:
+                    logger.info(
+                        "Iteration %s not waiting for CI (status: %s), skipping",
+                        iteration.id,
+                        iteration.status.value,
+                    )
+                    return True
+
+                # The event covers one workflow; the head commit's combined state
+                # covers all of them, and the same response serves the review
+                github = await self.get_client(iteration.installation_id)
+                try:
+                    pr_data = await github.get_pull_request_state(
+                        iteration.owner, iteration.repo_name, pr_number
+                    )
+                except Exception as e:
+                    logger.warning(
+                        "Could not fetch combined CI state for PR #%s: %s", pr_number, e
+                    )
+                    pr_data = None
+
+                if pr_data and pr_data["ci_state"]:
+                    if pr_data["ci_state"] not in _CI_PENDING_STATES:
+                        ci_conclusion = pr_data["ci_state"].lower()
+                    elif recheck_attempt < CI_RECHECK_ATTEMPTS:
+                        logger.info(
+                            "Other checks still running for PR #%s, waiting", pr_number
+                        )
+                        self._schedule_ci_recheck(
+                            repo_full_name,
+                            pr_number,
+                            ci_status,
+                            ci_conclusion,
+                            recheck_attempt + 1,
+                        )
+                        return True
+                    else:
+                        logger.warning(
+                            "Checks for PR #%s still %s after %s re-checks, going by this event",
+                            pr_number,
+                            pr_data["ci_state"],
+                            recheck_attempt,
+                        )
+
+                iteration = await db_manager.update_iteration(
+                    iteration.id,
+                    last_ci_status=ci_status,
+                    last_ci_conclusion=ci_conclusion,
+                    status=IterationStatus.REVIEWING,
+                )
+
+                await self._run_review_iteration(iteration, pr_data)
+
             return True
-            
+
         except Exception as e:
-            logger.error(f"Failed to handle CI completion: {e}", exc_info=True)
+            logger.error("Failed to handle CI completion: %s", e, exc_info=True)
             return False
-    
-    async def _run_review_iteration(self, iteration: IssueIteration) -> bool:
+
+    def _schedule_ci_recheck(
+        self,
+        repo_full_name: str,
+        pr_number: int,
+        ci_status: str,
+        ci_conclusion: str,
+        attempt: int,
+    ) -> None:
+        """Re-handle this CI event after CI_RECHECK_DELAY, replacing any earlier re-check."""
+        key = (repo_full_name, pr_number)
+        previous = self._ci_rechecks.get(key)
+        if previous is not None and previous is not asyncio.current_task():
+            # A newer event restarts the count
+            previous.cancel()
+
+        async def recheck():
+            await asyncio.sleep(CI_RECHECK_DELAY)
+            if self._ci_rechecks.get(key) is asyncio.current_task():
+                del self._ci_rechecks[key]
+            await self.handle_ci_completion(
+                repo_full_name,
+                pr_number,
+                ci_status,
+                ci_conclusion,
+                recheck_attempt=attempt,
+            )
+
+        self._ci_rechecks[key] = asyncio.create_task(recheck())
+
+    async def _run_review_iteration(
+        self, iteration: IssueIteration, pr_data: dict[str, Any] | None = None
+    ) -> bool:
         try:
-            logger.info(f"Running review for {iteration.repo_full_name}#{iteration.issue_number}")
-            
-            owner, repo = iteration.repo_full_name.split("/")
-            
-            async with await get_github_client(iteration.installation_id) as github:
-                pr_data = await github.get_pull_request(owner, repo, iteration.pr_number)
-                pr_files = await github.get_pull_request_files(owner, repo, iteration.pr_number)
-                
-                review_context = {
-                    "repo_full_name": iteration.repo_full_name,
-                    "issue_number": iteration.issue_number,
-                    "issue_title": iteration.issue_title,
-                    "issue_body": iteration.issue_body,
-                    "pr_number": iteration.pr_number,
-                    "pr_data": pr_data,
-                    "pr_files": pr_files,
-                    "ci_status": iteration.last_ci_status,
-                    "ci_conclusion": iteration.last_ci_conclusion,
-                    "iteration": iteration.current_iteration,
-                    "installation_id": iteration.installation_id
-                }
-                
-                review_result = await self._execute_reviewer_agent(review_context)
-                
-                if not review_result:
-                    await self._complete_iteration(iteration, IterationStatus.FAILED, "Review failed")
-                    return False
-                
-                db_manager.update_iteration(
-                    iteration.id,
-                    last_review_score=review_result.get("score"),
-                    last_review_recommendation=review_result.get("recommendation"),
-                    last_review_feedback=review_result.get("feedback")
+            logger.info(
+                "Running review for %s#%s",
+                iteration.repo_full_name,
+                iteration.issue_number,
+            )
+
+            owner, repo = iteration.owner, iteration.repo_name
+
+            github = await self.get_client(iteration.installation_id)
+            if pr_data is None:
+                pr_data, pr_files = await asyncio.gather(
+                    github.get_pull_request_state(owner, repo, iteration.pr_number),
+                    github.get_pull_request_files(owner, repo, iteration.pr_number),
                 )
-                
-                await self._post_review_results(github, review_context, review_result)
-                
-                await self._decide_next_action(iteration, review_result)
-                
-                return True
-                
+            else:
+                pr_files = await github.get_pull_request_files(
+                    owner, repo, iteration.pr_number
+                )
+
+            review_context = ReviewContext(
+                repo_full_name=iteration.repo_full_name,
+                owner=owner,
+                repo=repo,
+                issue_number=iteration.issue_number,
+                issue_title=iteration.issue_title,
+                issue_body=iteration.issue_body,
+                pr_number=iteration.pr_number,
+                pr_data=pr_data,
+                pr_files=pr_files,
+                ci_status=iteration.last_ci_status,
+                ci_conclusion=iteration.last_ci_conclusion,
+                iteration=iteration.current_iteration,
+                installation_id=iteration.installation_id,
+            )
+
+            review_result = await self._execute_reviewer_agent(review_context)
+
+            if not review_result:
+                await self._complete_iteration(
+                    iteration, IterationStatus.FAILED, "Review failed"
+                )
+                return False
+
+            # Written together with the status change in _decide_next_action
+            review_fields = {
+                "last_review_score": review_result.get("score"),
+                "last_review_recommendation": review_result.get("recommendation"),
+                "last_review_feedback": review_result.get("feedback"),
+            }
+
+            # A review that ends the cycle carries the final banner, saving a comment
+            outcome = self._review_outcome(iteration, review_result)
+            trailer = (
+                self._format_final_comment(iteration, *outcome) if outcome else None
+            )
+
+            trailer_posted = await self._post_review_results(
+                github, review_context, review_result, trailer
+            )
+
+            await self._decide_next_action(
+                iteration,
+                review_result,
+                review_fields,
+                final_comment_posted=trailer is not None and trailer_posted,
+            )
+
+            return True
+
         except Exception as e:
-            logger.error(f"Review iteration failed: {e}", exc_info=True)
+            logger.error("Review iteration failed: %s", e, exc_info=True)
             await self._complete_iteration(iteration, IterationStatus.FAILED, str(e))
             return False
-    
-    async def _execute_reviewer_agent(self, context: Dict[str, Any]) -> Optional[Dict]:
+
+    async def _execute_reviewer_agent(self, context: ReviewContext) -> dict | None:
         try:
-            async with await get_github_client(context.get("installation_id")) as github:
-                from ai_code_agent.github_client import GitHubClient
-                
-                owner, repo = context["repo_full_name"].split("/")
-                installation_token = await github_app_auth.get_installation_token(
-                    context.get("installation_id")
-                )
-                
-                github_client = GitHubClient(
-                    github_token=installation_token,
-                    repo_owner=owner,
-                    repo_name=repo
-                )
-                
-                reviewer_agent = ReviewerAgent(github_client, self.llm_client)
-                
-                pr_files_data = []
-                for file_info in context["pr_files"]:
-                    pr_files_data.append({
+            pr_files_data = []
+            for file_info in context.pr_files:
+                pr_files_data.append(
+                    {
                         "filename": file_info["filename"],
                         "status": file_info["status"],
                         "additions": file_info["additions"],
                         "deletions": file_info["deletions"],
                         "changes": file_info["changes"],
-                        "patch": file_info.get("patch", "")
-                    })
-                
-                review_result = await reviewer_agent._perform_comprehensive_review(
-                    context["pr_data"],
-                    {"title": context["issue_title"], "body": context["issue_body"]},
-                    pr_files_data
+                        "patch": file_info.get("patch", ""),
+                    }
                 )
-                
-                if context["ci_conclusion"] != "success":
-                    if review_result.get("overall_assessment", {}).get("score", 0) > 50:
-                        review_result["overall_assessment"]["score"] *= 0.8
-                        review_result["overall_assessment"]["summary"] += f" CI failed with status: {context['ci_conclusion']}"
-                
-                return review_result
-            
+
+            review_result = await self._reviewer._perform_comprehensive_review(
+                context.pr_data,
+                {"title": context.issue_title, "body": context.issue_body},
+                pr_files_data,
+            )
+
+            if context.ci_conclusion != "success":
+                if review_result.get("overall_assessment", _EMPTY).get("score", 0) > 50:
+                    review_result["overall_assessment"]["score"] *= 0.8
+                    review_result["overall_assessment"][
+                        "summary"
+                    ] += f" CI failed with status: {context.ci_conclusion}"
+
+            return review_result
+
         except Exception as e:
-            logger.error(f"Reviewer agent execution failed: {e}", exc_info=True)
+            logger.error("Reviewer agent execution failed: %s", e, exc_info=True)
             return None
-    
+
     async def _post_review_results(
-        self, 
-        github, 
-        context: Dict[str, Any], 
-        review_result: Dict
-    ) -> None:
+        self,
+        github,
+        context: ReviewContext,
+        review_result: dict,
+        trailer: str | None = None,
+    ) -> bool:
+        """Post the review as one PR review; returns whether it went out."""
+        comment_posted = False
+        if not review_result.get("overall_assessment"):
+            # A bare "N/A" template tells the PR nothing; the cycle still completes
+            self._empty_reviews += 1
+            logger.warning(
+                "Empty review result for PR #%s, not posting", context.pr_number
+            )
+            return comment_posted
         try:
-            owner, repo = context["repo_full_name"].split("/")
-            
-            comment = self._format_review_comment(review_result, context)
-            
-            await github.create_issue_comment(
-                owner, repo, context["pr_number"], comment
-            )
-            
-            recommendation = review_result.get("overall_assessment", {}).get("recommendation", "")
-            if recommendation == "approve" and context["ci_conclusion"] == "success":
+            owner, repo = context.owner, context.repo
+            pr_number = context.pr_number
+            overall = review_result.get("overall_assessment", _EMPTY)
+            recommendation = overall.get("recommendation", "")
+
+            if recommendation == "approve" and context.ci_conclusion == "success":
                 event = "APPROVE"
             elif recommendation == "request_changes":
                 event = "REQUEST_CHANGES"
             else:
                 event = "COMMENT"
-            
-            review_summary = review_result.get("overall_assessment", {}).get("summary", "")
-            await github.create_pull_request_review(
-                owner, repo, context["pr_number"], review_summary, event
-            )
-            
-            logger.info(f"Posted review results to PR #{context['pr_number']}")
-            
-        except Exception as e:
-            logger.error(f"Failed to post review results: {e}", exc_info=True)
-    
-    def _format_review_comment(self, review_result: Dict, context: Dict[str, Any]) -> str:
-        overall = review_result.get("overall_assessment", {})
-        
-        comment = f"""## AI Code Review - Iteration {context['iteration']}
 
-### {overall.get('status', 'Review Completed')}
+            # The full review, trailer included, is the review body, so one
+            # request carries both the write-up and the verdict
+            body = self._format_review_comment(review_result, context, trailer)
+            review_key = (context.repo_full_name, pr_number, "review")
+            review_marker = (
+                overall.get("score"),
+                recommendation,
+                context.ci_conclusion,
+                trailer is not None,
+                event,
+            )
 
-**Overall Score:** {overall.get('score', 0)}/100
+            if self._is_repeat_comment(review_key, review_marker, body):
+                logger.info(
+                    "%s review for PR #%s repeats the last one, not posting",
+                    event,
+                    pr_number,
+                )
+            else:
+                await self._post_review(github, owner, repo, pr_number, body, event)
+                self._remember_comment(review_key, review_marker, body)
+            comment_posted = True
 
-**CI Status:** {context['ci_conclusion']} ({'✅' if context['ci_conclusion'] == 'success' else '❌'})
+            logger.info("Posted review results to PR #%s", context.pr_number)
 
-### Analysis:
-- **Code Quality:** {review_result.get('code_quality', {}).get('summary', 'N/A')}
-- **Requirements Compliance:** {review_result.get('requirements_compliance', {}).get('summary', 'N/A')}
-- **Security & Best Practices:** {review_result.get('security_analysis', {}).get('summary', 'N/A')}
+        except _EXPECTED_ERRORS as e:
+            logger.warning("Failed to post review results: %s", e)
+        except Exception as e:
+            logger.error("Failed to post review results: %s", e, exc_info=True)
+        return comment_posted
 
-### Recommendation: **{overall.get('recommendation', 'unknown').upper()}**
+    async def _post_review(
+        self, github, owner: str, repo: str, pr_number: int, body: str, event: str
+    ) -> None:
+        try:
+            await self._gh_call_with_retry(
+                lambda: github.create_pull_request_review(
+                    owner, repo, pr_number, body, event
+                )
+            )
+        except httpx.HTTPStatusError as e:
+            # GitHub refuses APPROVE and REQUEST_CHANGES from the PR's own author,
+            # which the app is for the PRs it opens
+            if event == "COMMENT" or e.response.status_code != 422:
+                raise
+            logger.info(
+                "%s review refused on PR #%s, posting it as a comment review",
+                event,
+                pr_number,
+            )
+            await self._gh_call_with_retry(
+                lambda: github.create_pull_request_review(
+                    owner, repo, pr_number, body, "COMMENT"
+                )
+            )
 
-{overall.get('summary', 'No summary available')}
+    def _format_review_comment(
+        self, review_result: dict, context: ReviewContext, trailer: str | None = None
+    ) -> str:
+        overall = review_result.get("overall_assessment", _EMPTY)
 
----
-*This review was generated automatically by AI Coding Agent*"""
-        
+        comment = _REVIEW_COMMENT_TEMPLATE.format_map(
+            {
+                "iteration": context.iteration,
+                "status": overall.get("status", "Review Completed"),
+                "score": overall.get("score", 0),
+                "ci_conclusion": context.ci_conclusion,
+                "ci_icon": _CI_ICON.get(context.ci_conclusion, "❌"),
+                "code_quality": review_result.get("code_quality", _EMPTY).get(
+                    "summary", "N/A"
+                ),
+                "requirements_compliance": review_result.get(
+                    "requirements_compliance", _EMPTY
+                ).get("summary", "N/A"),
+                "security_analysis": review_result.get("security_analysis", _EMPTY).get(
+                    "summary", "N/A"
+                ),
+                "recommendation": overall.get("recommendation", "unknown").upper(),
+                "summary": overall.get("summary", "No summary available"),
+            }
+        )
+        if trailer:
+            comment += "\n\n---\n\n" + trailer
         return comment
-    
+
+    def _review_outcome(
+        self, iteration: IssueIteration, review_result: dict
+    ) -> tuple[IterationStatus, str] | None:
+        """The status and reason a review ends the cycle with, or None if another iteration follows."""
+        recommendation = review_result.get("overall_assessment", _EMPTY).get(
+            "recommendation", ""
+        )
+        key = (recommendation, iteration.last_ci_conclusion == "success")
+
+        if key in _REVIEW_POLICY:
+            outcome = _REVIEW_POLICY[key]
+            if (
+                outcome is not None
+                or iteration.current_iteration < iteration.max_iterations
+            ):
+                return outcome
+
+        return (
+            IterationStatus.FAILED,
+            f"Max iterations reached or unresolvable issues. Last recommendation: {recommendation}",
+        )
+
     async def _decide_next_action(
-        self, 
-        iteration: IssueIteration, 
-        review_result: Dict
+        self,
+        iteration: IssueIteration,
+        review_result: dict,
+        review_fields: dict[str, Any],
+        final_comment_posted: bool = False,
     ) -> None:
         try:
-            overall = review_result.get("overall_assessment", {})
-            recommendation = overall.get("recommendation", "")
-            ci_success = iteration.last_ci_conclusion == "success"
-            
-            if recommendation in ["approve", "approve_with_suggestions"] and ci_success:
-                await self._complete_iteration(
-                    iteration, 
-                    IterationStatus.COMPLETED,
-                    "Code approved and CI passed"
-                )
-                return
-            
-            if (recommendation == "request_changes" and 
-                iteration.current_iteration < iteration.max_iterations):
-                
-                db_manager.update_iteration(
-                    iteration.id,
-                    status=IterationStatus.RUNNING
+            outcome = self._review_outcome(iteration, review_result)
+
+            if outcome is None:
+                await db_manager.update_iteration(
+                    iteration.id, status=IterationStatus.RUNNING, **review_fields
                 )
-                
-                asyncio.create_task(self._run_code_iteration(iteration))
+
+                self._enqueue_code_iteration(iteration)
                 return
-            
+
+            status, message = outcome
             await self._complete_iteration(
                 iteration,
-                IterationStatus.FAILED,
-                f"Max iterations reached or unresolvable issues. Last recommendation: {recommendation}"
+                status,
+                message,
+                post_comment=not final_comment_posted,
+                **review_fields,
+            )
+
+        except _EXPECTED_ERRORS as e:
+            logger.warning("Failed to decide next action: %s", e)
+            await self._complete_iteration(
+                iteration, IterationStatus.FAILED, str(e), **review_fields
             )
-            
         except Exception as e:
-            logger.error(f"Failed to decide next action: {e}", exc_info=True)
-            await self._complete_iteration(iteration, IterationStatus.FAILED, str(e))
-    
+            logger.error("Failed to decide next action: %s", e, exc_info=True)
+            await self._complete_iteration(
+                iteration, IterationStatus.FAILED, str(e), **review_fields
+            )
+
     async def _complete_iteration(
-        self, 
-        iteration: IssueIteration, 
+        self,
+        iteration: IssueIteration,
         status: IterationStatus,
-        message: str
+        message: str,
+        post_comment: bool = True,
+        **fields,
     ) -> None:
-        try:
-            db_manager.complete_iteration(iteration.id, status)
-            
-            if iteration.pr_number:
-                async with await get_github_client(iteration.installation_id) as github:
-                    owner, repo = iteration.repo_full_name.split("/")
-                    
-                    if status == IterationStatus.COMPLETED:
-                        final_comment = f"""## SDLC Cycle Completed Successfully!
+        # No more CI events are handled for this PR; a current holder keeps its reference
+        self._ci_locks.pop((iteration.repo_full_name, iteration.pr_number), None)
 
-The automated development cycle has been completed successfully after {iteration.current_iteration} iteration(s).
+        # The DB write and the comment are independent, so neither waits on the other
+        writes = [db_manager.complete_iteration(iteration.id, status, **fields)]
+        if iteration.pr_number and post_comment:
+            writes.append(self._post_final_comment_bounded(iteration, status, message))
 
-**Final Status:** {message}
+        results = await asyncio.gather(*writes, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            if isinstance(error, _EXPECTED_ERRORS):
+                logger.warning(
+                    "Failed to complete iteration %s: %s", iteration.id, error
+                )
+            else:
+                logger.error(
+                    "Failed to complete iteration %s: %s",
+                    iteration.id,
+                    error,
+                    exc_info=error,
+                )
 
-This PR is ready for human review and merge."""
-                    else:
-                        final_comment = f"""## SDLC Cycle Failed
+        if not errors:
+            logger.info(
+                "Completed iteration %s with status %s: %s",
+                iteration.id,
+                status,
+                message,
+            )
 
-The automated development cycle could not be completed successfully.
+    async def _post_final_comment_bounded(
+        self, iteration: IssueIteration, status: IterationStatus, message: str
+    ) -> None:
+        """Post the final comment, leaving it to finish in the background if GitHub is slow."""
+        # Shielded, so a timeout never cancels a POST that may already have landed
+        post = asyncio.ensure_future(
+            self._post_final_comment(iteration, status, message)
+        )
+        try:
+            await asyncio.wait_for(asyncio.shield(post), FINAL_COMMENT_TIMEOUT)
+        except TimeoutError:
+            logger.warning(
+                "Final comment for PR #%s is slow, finishing it in the background",
+                iteration.pr_number,
+            )
+            self._background_posts.add(post)
+            post.add_done_callback(self._finish_background_post)
 
-**Reason:** {message}
-**Iterations:** {iteration.current_iteration}/{iteration.max_iterations}
+    def _finish_background_post(self, post: asyncio.Future) -> None:
+        self._background_posts.discard(post)
+        if post.cancelled() or post.exception() is None:
+            return
+        error = post.exception()
+        if isinstance(error, _EXPECTED_ERRORS):
+            logger.warning("Failed to post final comment: %s", error)
+        else:
+            logger.error("Failed to post final comment: %s", error, exc_info=error)
 
-Manual intervention may be required to resolve the remaining issues."""
-                    
-                    await github.create_issue_comment(
+    async def _post_final_comment(
+        self, iteration: IssueIteration, status: IterationStatus, message: str
+    ) -> None:
+        # One final comment per cycle, even if a failure later in the flow completes it again
+        cycle_key = (iteration.id, iteration.current_iteration)
+        if cycle_key in self._posted_finals:
+            logger.info(
+                "Final comment for iteration %s cycle %s already posted", *cycle_key
+            )
+            return
+        self._posted_finals[cycle_key] = None
+        if len(self._posted_finals) > RECENT_COMMENTS_MAX:
+            self._posted_finals.popitem(last=False)
+
+        try:
+            github = await self.get_client(iteration.installation_id)
+            owner, repo = iteration.owner, iteration.repo_name
+            final_comment = self._format_final_comment(iteration, status, message)
+
+            final_key = (iteration.repo_full_name, iteration.pr_number, "final")
+            if not self._is_repeat_comment(final_key, status, final_comment):
+                await self._gh_call_with_retry(
+                    lambda: github.create_issue_comment(
                         owner, repo, iteration.pr_number, final_comment
                     )
-            
-            logger.info(f"Completed iteration {iteration.id} with status {status}: {message}")
-            
-        except Exception as e:
-            logger.error(f"Failed to complete iteration: {e}", exc_info=True)
+                )
+                self._remember_comment(final_key, status, final_comment)
+        except BaseException:
+            # Not posted, so a later completion may try again
+            self._posted_finals.pop(cycle_key, None)
+            raise
+
+    def _format_final_comment(
+        self, iteration: IssueIteration, status: IterationStatus, message: str
+    ) -> str:
+        return _FINAL_TEMPLATES.get(status, _CYCLE_FAILED_TEMPLATE).format(
+            current_iteration=iteration.current_iteration,
+            max_iterations=iteration.max_iterations,
+            message=message,
+        )
 
 
 orchestrator = SDLCOrchestrator()
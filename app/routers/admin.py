@@ -1,15 +1,14 @@
 """Admin API endpoints for manual control."""
 
 import logging
-from typing import Optional, List
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from ..database import db_manager, IssueIteration, IterationStatus
-from ..orchestrator import orchestrator
+from ..database import IssueIteration, IterationStatus, db_manager
 from ..github_app.auth import github_app_auth
+from ..orchestrator import orchestrator
 
 logger = logging.getLogger(__name__)
 
@@ -18,31 +17,34 @@ router = APIRouter()
 
 class IterationResponse(BaseModel):
     """Response model for iteration data."""
+
     id: int
     repo_full_name: str
     issue_number: int
-    pr_number: Optional[int]
+    pr_number: int | None
     current_iteration: int
     max_iterations: int
     status: str
-    issue_title: Optional[str]
-    branch_name: Optional[str]
-    last_review_score: Optional[int]
-    last_review_recommendation: Optional[str]
-    last_ci_status: Optional[str]
-    last_ci_conclusion: Optional[str]
+    issue_title: str | None
+    branch_name: str | None
+    last_review_score: int | None
+    last_review_recommendation: str | None
+    last_ci_status: str | None
+    last_ci_conclusion: str | None
     created_at: str
     updated_at: str
-    completed_at: Optional[str]
+    completed_at: str | None
 
 
 class StartIssueRequest(BaseModel):
     """Request model for starting issue processing."""
-    max_iterations: Optional[int] = None
+
+    max_iterations: int | None = None
 
 
 class ReviewPRRequest(BaseModel):
     """Request model for manual PR review."""
+
     force: bool = False
 
 
@@ -52,7 +54,7 @@ async def start_issue_manually(
     repo: str,
     issue_number: int,
     request: StartIssueRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
 ):
     """Manually start SDLC cycle for an issue."""
     try:
@@ -61,42 +63,41 @@ async def start_issue_manually(
         installation_id = await github_app_auth.get_installation_id(owner, repo)
         if not installation_id:
             raise HTTPException(
-                status_code=404,
-                detail=f"GitHub App not installed on {repo_full_name}"
+                status_code=404, detail=f"GitHub App not installed on {repo_full_name}"
             )
 
-        existing = db_manager.get_active_iteration(repo_full_name, issue_number)
+        existing = await db_manager.get_active_iteration(repo_full_name, issue_number)
         if existing:
             raise HTTPException(
                 status_code=409,
-                detail=f"Active iteration already exists for issue #{issue_number}"
+                detail=f"Active iteration already exists for issue #{issue_number}",
             )
-        
+
         logger.info(f"Manually starting SDLC cycle for {repo_full_name}#{issue_number}")
-        
+
         background_tasks.add_task(
             _start_issue_background,
             repo_full_name,
             issue_number,
             installation_id,
-            request.max_iterations
+            request.max_iterations,
         )
-        
+
         return JSONResponse(
             content={
                 "status": "started",
                 "message": f"SDLC cycle started for issue #{issue_number}",
                 "repo": repo_full_name,
-                "issue_number": issue_number
+                "issue_number": issue_number,
             },
-            status_code=202
+            status_code=202,
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to start issue manually: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @router.post("/restart/issue/{owner}/{repo}/{issue_number}")
@@ -105,7 +106,7 @@ async def restart_issue_manually(
     repo: str,
     issue_number: int,
     request: StartIssueRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
 ):
     """Restart SDLC cycle for an issue (even if previous iterations failed)."""
     try:
@@ -114,48 +115,49 @@ async def restart_issue_manually(
         installation_id = await github_app_auth.get_installation_id(owner, repo)
         if not installation_id:
             raise HTTPException(
-                status_code=404,
-                detail=f"GitHub App not installed on {repo_full_name}"
+                status_code=404, detail=f"GitHub App not installed on {repo_full_name}"
             )
-        
-        logger.info(f"Manually restarting SDLC cycle for {repo_full_name}#{issue_number}")
+
+        logger.info(
+            f"Manually restarting SDLC cycle for {repo_full_name}#{issue_number}"
+        )
 
         background_tasks.add_task(
             _restart_issue_background,
             repo_full_name,
             issue_number,
             installation_id,
-            request.max_iterations
+            request.max_iterations,
         )
-        
+
         return JSONResponse(
             content={
                 "status": "restarted",
                 "message": f"SDLC cycle restarted for issue #{issue_number}",
                 "repo": repo_full_name,
-                "issue_number": issue_number
+                "issue_number": issue_number,
             },
-            status_code=202
+            status_code=202,
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to restart issue manually: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 async def _restart_issue_background(
     repo_full_name: str,
     issue_number: int,
     installation_id: int,
-    max_iterations: Optional[int]
+    max_iterations: int | None,
 ):
     try:
         await orchestrator.restart_issue_cycle(
             repo_full_name=repo_full_name,
             issue_number=issue_number,
-            installation_id=installation_id
+            installation_id=installation_id,
         )
     except Exception as e:
         logger.error(f"Background issue restart failed: {e}", exc_info=True)
@@ -165,31 +167,29 @@ async def _start_issue_background(
     repo_full_name: str,
     issue_number: int,
     installation_id: int,
-    max_iterations: Optional[int]
+    max_iterations: int | None,
 ):
     try:
         if max_iterations:
-            from ..github_client import get_github_client
-            
             owner, repo = repo_full_name.split("/")
-            async with await get_github_client(installation_id) as github:
-                issue_data = await github.get_issue(owner, repo, issue_number)
-            
-            iteration = db_manager.create_iteration(
+            github = await orchestrator.get_client(installation_id)
+            issue_data = await github.get_issue(owner, repo, issue_number)
+
+            iteration = await db_manager.create_iteration(
                 repo_full_name=repo_full_name,
                 issue_number=issue_number,
                 installation_id=installation_id,
                 issue_title=issue_data.get("title"),
                 issue_body=issue_data.get("body"),
-                max_iterations=max_iterations
+                max_iterations=max_iterations,
             )
-            
+
             await orchestrator._run_code_iteration(iteration)
         else:
             await orchestrator.start_issue_cycle(
                 repo_full_name=repo_full_name,
                 issue_number=issue_number,
-                installation_id=installation_id
+                installation_id=installation_id,
             )
     except Exception as e:
         logger.error(f"Background issue processing failed: {e}", exc_info=True)
@@ -201,69 +201,69 @@ async def review_pr_manually(
     repo: str,
     pr_number: int,
     request: ReviewPRRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
 ):
     """Manually trigger PR review."""
     try:
         repo_full_name = f"{owner}/{repo}"
-        
-        iteration = db_manager.get_iteration_by_pr(repo_full_name, pr_number)
+
+        iteration = await db_manager.get_iteration_by_pr(repo_full_name, pr_number)
         if not iteration and not request.force:
             raise HTTPException(
                 status_code=404,
-                detail=f"No active iteration found for PR #{pr_number}. Use force=true to review anyway."
+                detail=f"No active iteration found for PR #{pr_number}. Use force=true to review anyway.",
             )
-        
+
         if not iteration and request.force:
             installation_id = await github_app_auth.get_installation_id(owner, repo)
             if not installation_id:
                 raise HTTPException(
                     status_code=404,
-                    detail=f"GitHub App not installed on {repo_full_name}"
+                    detail=f"GitHub App not installed on {repo_full_name}",
                 )
-            
-            iteration = db_manager.create_iteration(
+
+            iteration = await db_manager.create_iteration(
                 repo_full_name=repo_full_name,
                 issue_number=0,
                 installation_id=installation_id,
                 issue_title="Manual PR Review",
                 issue_body="Manually triggered PR review",
-                max_iterations=1
+                max_iterations=1,
             )
-            
-            db_manager.update_iteration(iteration.id, pr_number=pr_number)
-        
+
+            await db_manager.update_iteration(iteration.id, pr_number=pr_number)
+
         logger.info(f"Manually triggering review for {repo_full_name} PR#{pr_number}")
-        
+
         background_tasks.add_task(_review_pr_background, iteration)
-        
+
         return JSONResponse(
             content={
                 "status": "started",
                 "message": f"Review started for PR #{pr_number}",
                 "repo": repo_full_name,
                 "pr_number": pr_number,
-                "iteration_id": iteration.id
+                "iteration_id": iteration.id,
             },
-            status_code=202
+            status_code=202,
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to start PR review manually: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 async def _review_pr_background(iteration: IssueIteration):
     try:
-        db_manager.update_iteration(
+        await db_manager.update_iteration(
             iteration.id,
             status=IterationStatus.REVIEWING,
             last_ci_status="unknown",
-            last_ci_conclusion="unknown"
+            last_ci_conclusion="unknown",
         )
-        
+
         await orchestrator._run_review_iteration(iteration)
     except Exception as e:
         logger.error(f"Background PR review failed: {e}", exc_info=True)
@@ -274,14 +274,14 @@ async def get_issue_status(owner: str, repo: str, issue_number: int):
     """Get status of an issue's SDLC cycle."""
     try:
         repo_full_name = f"{owner}/{repo}"
-        
-        iteration = db_manager.get_active_iteration(repo_full_name, issue_number)
+
+        iteration = await db_manager.get_active_iteration(repo_full_name, issue_number)
         if not iteration:
             raise HTTPException(
                 status_code=404,
-                detail=f"No active iteration found for issue #{issue_number}"
+                detail=f"No active iteration found for issue #{issue_number}",
             )
-        
+
         return IterationResponse(
             id=iteration.id,
             repo_full_name=iteration.repo_full_name,
@@ -298,22 +298,24 @@ async def get_issue_status(owner: str, repo: str, issue_number: int):
             last_ci_conclusion=iteration.last_ci_conclusion,
             created_at=iteration.created_at.isoformat(),
             updated_at=iteration.updated_at.isoformat(),
-            completed_at=iteration.completed_at.isoformat() if iteration.completed_at else None
+            completed_at=(
+                iteration.completed_at.isoformat() if iteration.completed_at else None
+            ),
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to get issue status: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @router.get("/iterations")
 async def list_active_iterations():
     """List of all active iterations."""
     try:
-        iterations = db_manager.get_all_active_iterations()
-        
+        iterations = await db_manager.get_all_active_iterations()
+
         return [
             IterationResponse(
                 id=iteration.id,
@@ -331,77 +333,63 @@ async def list_active_iterations():
                 last_ci_conclusion=iteration.last_ci_conclusion,
                 created_at=iteration.created_at.isoformat(),
                 updated_at=iteration.updated_at.isoformat(),
-                completed_at=iteration.completed_at.isoformat() if iteration.completed_at else None
+                completed_at=(
+                    iteration.completed_at.isoformat()
+                    if iteration.completed_at
+                    else None
+                ),
             )
             for iteration in iterations
         ]
-        
+
     except Exception as e:
         logger.error(f"Failed to list iterations: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @router.post("/iterations/{iteration_id}/cancel")
 async def cancel_iteration(iteration_id: int):
     """Cancel an active iteration."""
     try:
-        iteration = db_manager.update_iteration(
-            iteration_id,
-            status=IterationStatus.CANCELLED,
-            is_active=False
+        iteration = await db_manager.update_iteration(
+            iteration_id, status=IterationStatus.CANCELLED, is_active=False
         )
-        
+
         if not iteration:
             raise HTTPException(
-                status_code=404,
-                detail=f"Iteration {iteration_id} not found"
+                status_code=404, detail=f"Iteration {iteration_id} not found"
             )
-        
+
         logger.info(f"Cancelled iteration {iteration_id}")
-        
+
         return JSONResponse(
             content={
                 "status": "cancelled",
                 "message": f"Iteration {iteration_id} has been cancelled",
-                "iteration_id": iteration_id
+                "iteration_id": iteration_id,
             },
-            status_code=200
+            status_code=200,
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to cancel iteration: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @router.get("/stats")
 async def get_system_stats():
     """Get system statistics."""
     try:
-        with db_manager.get_session() as db:
-            from sqlalchemy import func
-            
-            stats = db.query(
-                IssueIteration.status,
-                func.count(IssueIteration.id).label('count')
-            ).group_by(IssueIteration.status).all()
-            
-            status_counts = {status: count for status, count in stats}
-            
-            total_iterations = db.query(func.count(IssueIteration.id)).scalar()
-            
-            active_iterations = db.query(func.count(IssueIteration.id)).filter(
-                IssueIteration.is_active == True
-            ).scalar()
-            
-            return {
-                "total_iterations": total_iterations,
-                "active_iterations": active_iterations,
-                "status_breakdown": status_counts,
-                "timestamp": db.query(func.now()).scalar().isoformat()
-            }
-        
+        stats = await db_manager.get_iteration_stats()
+        return {
+            **stats,
+            "reviews": orchestrator.review_stats(),
+            "llm_cache": orchestrator.cache_stats(),
+            "timestamp": stats["timestamp"].isoformat(),
+        }
+
     except Exception as e:
         logger.error(f"Failed to get system stats: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
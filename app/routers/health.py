@@ -5,7 +5,7 @@ from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from sqlalchemy import text
 
-from ..config import settings
+from ..config import get_settings
 from ..database import db_manager
 
 logger = logging.getLogger(__name__)
@@ -17,17 +17,17 @@ router = APIRouter()
 async def health_check():
     """Health check"""
     try:
-        with db_manager.get_session() as db:
-            db.execute(text("SELECT 1"))
-        
+        async with db_manager.get_session() as db:
+            await db.execute(text("SELECT 1"))
+
         return JSONResponse(
             content={
                 "status": "ok",
                 "timestamp": datetime.utcnow().isoformat(),
                 "version": "1.0.0",
-                "database": "connected"
+                "database": "connected",
             },
-            status_code=200
+            status_code=200,
         )
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -35,9 +35,9 @@ async def health_check():
             content={
                 "status": "error",
                 "timestamp": datetime.utcnow().isoformat(),
-                "error": str(e)
+                "error": str(e),
             },
-            status_code=503
+            status_code=503,
         )
 
 
@@ -45,28 +45,29 @@ async def health_check():
 async def readiness_check():
     """Readiness check"""
     try:
-        with db_manager.get_session() as db:
-            db.execute(text("SELECT 1"))
-        
+        async with db_manager.get_session() as db:
+            await db.execute(text("SELECT 1"))
+
+        settings = get_settings()
         required_config = [
             settings.github_app_id,
             settings.github_app_private_key,
-            settings.github_webhook_secret
+            settings.github_webhook_secret,
         ]
-        
+
         required_config.append(settings.openai_api_key)
-        
+
         if not all(required_config):
             raise ValueError("Missing required configuration")
-        
+
         return JSONResponse(
             content={
                 "status": "ready",
                 "timestamp": datetime.utcnow().isoformat(),
                 "database": "connected",
-                "configuration": "valid"
+                "configuration": "valid",
             },
-            status_code=200
+            status_code=200,
         )
     except Exception as e:
         logger.error(f"Readiness check failed: {e}")
@@ -74,7 +75,7 @@ async def readiness_check():
             content={
                 "status": "not_ready",
                 "timestamp": datetime.utcnow().isoformat(),
-                "error": str(e)
+                "error": str(e),
             },
-            status_code=503
+            status_code=503,
         )
@@ -1,49 +1,88 @@
 """Webhook handlers for GitHub events."""
 
-import asyncio
 import hashlib
 import hmac
-import json
 import logging
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Any
 
-from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
+import orjson
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from fastapi.responses import JSONResponse
 
-from ..config import settings
+from ..config import get_settings
 from ..orchestrator import orchestrator
-from ..github_app.auth import github_app_auth
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Passing the constructor avoids a name lookup on every digest
+_SHA256 = hashlib.sha256
+
+
+@lru_cache(maxsize=1)
+def _webhook_secret_key() -> bytes | None:
+    secret = get_settings().github_webhook_secret
+    if not secret:
+        logger.warning(
+            "GITHUB_WEBHOOK_SECRET is empty, webhook signatures are not verified"
+        )
+        return None
+    return secret.encode("utf-8")
+
+
+def verify_signature(payload: bytes, signature_header: str | None) -> bool:
+    """Check an X-Hub-Signature-256 header against the payload.
+
+    Every delivery passes when no webhook secret is configured.
+    """
+    key = _webhook_secret_key()
+    if key is None:
+        return True
+    if not signature_header:
+        return False
+
+    sha_name, _, signature = signature_header.partition("=")
+    if sha_name != "sha256" or not signature:
+        return False
+
+    mac = hmac.new(key, payload, _SHA256)
+    return hmac.compare_digest(mac.hexdigest(), signature)
+
+
 @router.post("")
 async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
     """Handle GitHub webhook events."""
     try:
-        logger.info(f"Webhook headers: {dict(request.headers)}")
-        
         event_type = request.headers.get("X-GitHub-Event")
         signature = request.headers.get("X-Hub-Signature-256")
         delivery_id = request.headers.get("X-GitHub-Delivery")
-        
+
         if not event_type:
             logger.error("Missing X-GitHub-Event header")
             raise HTTPException(status_code=400, detail="Missing X-GitHub-Event header")
-        
+
         payload = await request.body()
-        logger.info(f"Webhook payload size: {len(payload)} bytes")
+        logger.info("Webhook payload size: %d bytes", len(payload))
+
+        if not verify_signature(payload, signature):
+            logger.error("Invalid webhook signature (delivery: %s)", delivery_id)
+            raise HTTPException(status_code=401, detail="Invalid signature")
 
         try:
-            data = json.loads(payload.decode())
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON payload: {e}")
-            logger.debug(f"Payload content: {payload.decode()[:500]}...")
-            raise HTTPException(status_code=400, detail="Invalid JSON payload")
-        
-        logger.info(f"Received webhook: {event_type} (delivery: {delivery_id})")
-        
+            # Parse the already-read body directly; no decode copy or re-read
+            data = orjson.loads(payload)
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse JSON payload: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Payload content: %s...", payload[:500].decode(errors="replace")
+                )
+            raise HTTPException(status_code=400, detail="Invalid JSON payload") from e
+
+        logger.info("Received webhook: %s (delivery: %s)", event_type, delivery_id)
+
         if event_type == "issues":
             background_tasks.add_task(handle_issues_event, data)
         elif event_type == "pull_request":
@@ -55,147 +94,162 @@ async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
         elif event_type == "ping":
             logger.info("Received ping event")
         else:
-            logger.info(f"Unhandled event type: {event_type}")
-        
+            logger.info("Unhandled event type: %s", event_type)
+
         return JSONResponse(content={"status": "ok"}, status_code=200)
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Webhook handling error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-async def handle_issues_event(data: Dict[str, Any]) -> None:
+async def handle_issues_event(data: dict[str, Any]) -> None:
     try:
         action = data.get("action")
         issue = data.get("issue", {})
         repository = data.get("repository", {})
         installation = data.get("installation", {})
-        
+
         if action not in ["opened", "reopened"]:
             logger.info(f"Ignoring issues action: {action}")
             return
-        
+
         repo_full_name = repository.get("full_name")
         issue_number = issue.get("number")
         installation_id = installation.get("id")
-        
+
         if not all([repo_full_name, issue_number, installation_id]):
             logger.error("Missing required fields in issues event")
             return
-        
+
         logger.info(f"Starting SDLC cycle for issue {repo_full_name}#{issue_number}")
-        
+
         from ..database import db_manager
-        existing_iteration = db_manager.get_active_iteration(repo_full_name, issue_number)
-        
+
+        existing_iteration = await db_manager.get_active_iteration(
+            repo_full_name, issue_number
+        )
+
         if existing_iteration:
-            logger.info(f"Active iteration exists for issue #{issue_number}, using existing")
+            logger.info(
+                f"Active iteration exists for issue #{issue_number}, using existing"
+            )
             iteration = existing_iteration
         else:
-            with db_manager.get_session() as db:
-                from sqlalchemy import and_
+            async with db_manager.get_session() as db:
+                from sqlalchemy import func, select
+
                 from ..database import IssueIteration
-                previous_iterations = db.query(IssueIteration).filter(
-                    and_(
+
+                previous_iterations = await db.scalar(
+                    select(func.count(IssueIteration.id)).where(
                         IssueIteration.repo_full_name == repo_full_name,
                         IssueIteration.issue_number == issue_number,
-                        IssueIteration.is_active == False
+                        IssueIteration.is_active.is_(False),
                     )
-                ).count()
-            
+                )
+
             if previous_iterations > 0:
-                logger.info(f"Found {previous_iterations} previous iterations, restarting cycle")
+                logger.info(
+                    f"Found {previous_iterations} previous iterations, restarting cycle"
+                )
                 iteration = await orchestrator.restart_issue_cycle(
                     repo_full_name=repo_full_name,
                     issue_number=issue_number,
-                    installation_id=installation_id
+                    installation_id=installation_id,
                 )
             else:
-                logger.info(f"No previous iterations found, starting new cycle")
+                logger.info("No previous iterations found, starting new cycle")
                 iteration = await orchestrator.start_issue_cycle(
                     repo_full_name=repo_full_name,
                     issue_number=issue_number,
-                    installation_id=installation_id
+                    installation_id=installation_id,
                 )
-        
+
         if iteration:
-            logger.info(f"Successfully started SDLC cycle (iteration ID: {iteration.id})")
+            logger.info(
+                f"Successfully started SDLC cycle (iteration ID: {iteration.id})"
+            )
         else:
             logger.error("Failed to start SDLC cycle")
-        
+
     except Exception as e:
         logger.error(f"Error handling issues event: {e}", exc_info=True)
 
 
-async def handle_pull_request_event(data: Dict[str, Any]) -> None:
+async def handle_pull_request_event(data: dict[str, Any]) -> None:
     try:
         action = data.get("action")
         pull_request = data.get("pull_request", {})
         repository = data.get("repository", {})
         installation = data.get("installation", {})
-        
+
         if action not in ["opened", "synchronize", "reopened"]:
             logger.info(f"Ignoring pull_request action: {action}")
             return
-        
+
         repo_full_name = repository.get("full_name")
         pr_number = pull_request.get("number")
         installation_id = installation.get("id")
-        
+
         if not all([repo_full_name, pr_number, installation_id]):
             logger.error("Missing required fields in pull_request event")
             return
 
         from ..database import db_manager
-        iteration = db_manager.get_iteration_by_pr(repo_full_name, pr_number)
-        
+
+        iteration = await db_manager.get_iteration_by_pr(repo_full_name, pr_number)
+
         if not iteration:
-            logger.info(f"PR {repo_full_name}#{pr_number} is not managed by AI Coding Agent")
+            logger.info(
+                f"PR {repo_full_name}#{pr_number} is not managed by AI Coding Agent"
+            )
             return
-        
-        logger.info(f"PR {repo_full_name}#{pr_number} updated, checking if review needed")
+
+        logger.info(
+            f"PR {repo_full_name}#{pr_number} updated, checking if review needed"
+        )
 
         if action == "synchronize":
-            db_manager.update_iteration(
-                iteration.id,
-                status="waiting_ci"
-            )
+            await db_manager.update_iteration(iteration.id, status="waiting_ci")
             logger.info(f"Updated iteration {iteration.id} to wait for CI")
-        
+
     except Exception as e:
         logger.error(f"Error handling pull_request event: {e}", exc_info=True)
 
 
-async def handle_workflow_run_event(data: Dict[str, Any]) -> None:
+async def handle_workflow_run_event(data: dict[str, Any]) -> None:
     try:
         action = data.get("action")
         workflow_run = data.get("workflow_run", {})
         repository = data.get("repository", {})
         installation = data.get("installation", {})
-        
+
         if action != "completed":
             logger.info(f"Ignoring workflow_run action: {action}")
             return
-        
+
         repo_full_name = repository.get("full_name")
         head_branch = workflow_run.get("head_branch")
         status = workflow_run.get("status")
         conclusion = workflow_run.get("conclusion")
         installation_id = installation.get("id")
-        
+
         if not all([repo_full_name, head_branch, status, installation_id]):
             logger.error("Missing required fields in workflow_run event")
             return
-        
-        logger.info(f"Workflow completed for {repo_full_name}:{head_branch} - {status}/{conclusion}")
-        
+
+        logger.info(
+            f"Workflow completed for {repo_full_name}:{head_branch} - {status}/{conclusion}"
+        )
+
         pull_requests = workflow_run.get("pull_requests", [])
         if not pull_requests:
             logger.info("No pull requests associated with this workflow run")
             return
-        
+
         for pr_info in pull_requests:
             pr_number = pr_info.get("number")
             if pr_number:
@@ -203,41 +257,43 @@ async def handle_workflow_run_event(data: Dict[str, Any]) -> None:
                     repo_full_name=repo_full_name,
                     pr_number=pr_number,
                     ci_status=status,
-                    ci_conclusion=conclusion
+                    ci_conclusion=conclusion,
                 )
-        
+
     except Exception as e:
         logger.error(f"Error handling workflow_run event: {e}", exc_info=True)
 
 
-async def handle_check_suite_event(data: Dict[str, Any]) -> None:
+async def handle_check_suite_event(data: dict[str, Any]) -> None:
     try:
         action = data.get("action")
         check_suite = data.get("check_suite", {})
         repository = data.get("repository", {})
         installation = data.get("installation", {})
-        
+
         if action != "completed":
             logger.info(f"Ignoring check_suite action: {action}")
             return
-        
+
         repo_full_name = repository.get("full_name")
         head_branch = check_suite.get("head_branch")
         status = check_suite.get("status")
         conclusion = check_suite.get("conclusion")
         installation_id = installation.get("id")
-        
+
         if not all([repo_full_name, head_branch, status, installation_id]):
             logger.error("Missing required fields in check_suite event")
             return
-        
-        logger.info(f"Check suite completed for {repo_full_name}:{head_branch} - {status}/{conclusion}")
-        
+
+        logger.info(
+            f"Check suite completed for {repo_full_name}:{head_branch} - {status}/{conclusion}"
+        )
+
         pull_requests = check_suite.get("pull_requests", [])
         if not pull_requests:
             logger.info("No pull requests associated with this check suite")
             return
-        
+
         for pr_info in pull_requests:
             pr_number = pr_info.get("number")
             if pr_number:
@@ -245,8 +301,8 @@ async def handle_check_suite_event(data: Dict[str, Any]) -> None:
                     repo_full_name=repo_full_name,
                     pr_number=pr_number,
                     ci_status=status,
-                    ci_conclusion=conclusion
+                    ci_conclusion=conclusion,
                 )
-        
+
     except Exception as e:
         logger.error(f"Error handling check_suite event: {e}", exc_info=True)
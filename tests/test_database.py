@@ -0,0 +1,65 @@
+from sqlalchemy import create_engine, insert, inspect, select, text
+
+from app.database import IssueIteration, _create_schema
+
+
+def _legacy_database():
+    """An in-memory database from before uq_one_active_per_issue existed."""
+    engine = create_engine("sqlite://")
+    table = IssueIteration.__table__
+    with engine.begin() as connection:
+        table.create(connection)
+        connection.execute(text("DROP INDEX uq_one_active_per_issue"))
+        connection.execute(
+            insert(table),
+            [
+                {
+                    "repo_full_name": "o/r",
+                    "issue_number": 1,
+                    "installation_id": 1,
+                    "status": "running",
+                    "is_active": True,
+                },
+                {
+                    "repo_full_name": "o/r",
+                    "issue_number": 1,
+                    "installation_id": 1,
+                    "status": "running",
+                    "is_active": True,
+                },
+                {
+                    "repo_full_name": "o/r",
+                    "issue_number": 2,
+                    "installation_id": 1,
+                    "status": "running",
+                    "is_active": True,
+                },
+            ],
+        )
+    return engine
+
+
+class TestCreateSchema:
+    def test_keeps_newest_active_iteration_per_issue(self):
+        engine = _legacy_database()
+        table = IssueIteration.__table__
+
+        with engine.begin() as connection:
+            _create_schema(connection)
+
+        with engine.connect() as connection:
+            active = (
+                connection.execute(
+                    select(table.c.id)
+                    .where(table.c.is_active.is_(True))
+                    .order_by(table.c.id)
+                )
+                .scalars()
+                .all()
+            )
+            indexes = {
+                index["name"] for index in inspect(connection).get_indexes(table.name)
+            }
+
+        assert active == [2, 3]
+        assert "uq_one_active_per_issue" in indexes
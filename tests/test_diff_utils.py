@@ -0,0 +1,60 @@
+from ai_code_agent.diff_utils import apply_unified_diff, number_lines
+
+ORIGINAL = "import os\n\n\ndef greet(name):\n    return 'Hello ' + name\n\n\ndef main():\n    print(greet('world'))\n"
+
+
+class TestApplyUnifiedDiff:
+    def test_applies_single_hunk(self):
+        diff = (
+            "--- a/app.py\n"
+            "+++ b/app.py\n"
+            "@@ -4,2 +4,2 @@\n"
+            " def greet(name):\n"
+            "-    return 'Hello ' + name\n"
+            "+    return f'Hello {name}'\n"
+        )
+        patched = apply_unified_diff(ORIGINAL, diff)
+        assert patched == ORIGINAL.replace("'Hello ' + name", "f'Hello {name}'")
+
+    def test_tolerates_wrong_line_numbers_and_bare_blank_context(self):
+        diff = (
+            "@@ -20,4 +20,5 @@\n"
+            "\n"
+            " def main():\n"
+            '+    """Entry point."""\n'
+            "     print(greet('world'))\n"
+        )
+        patched = apply_unified_diff(ORIGINAL, diff)
+        assert 'def main():\n    """Entry point."""\n    print' in patched
+        assert patched.endswith("\n")
+
+    def test_multiple_hunks(self):
+        diff = (
+            "@@ -1,1 +1,2 @@\n"
+            " import os\n"
+            "+import sys\n"
+            "@@ -9,1 +10,1 @@\n"
+            "-    print(greet('world'))\n"
+            "+    print(greet(sys.argv[1]))\n"
+        )
+        patched = apply_unified_diff(ORIGINAL, diff)
+        assert patched.startswith("import os\nimport sys\n")
+        assert "greet(sys.argv[1])" in patched
+
+    def test_changed_lines_that_look_like_file_headers(self):
+        removed = "--- a/x\n+++ b/x\n@@ -1,3 +1,2 @@\n a\n--- comment\n b\n"
+        assert apply_unified_diff("a\n-- comment\nb\n", removed) == "a\nb\n"
+
+        added = "@@ -1,2 +1,3 @@\n a\n+++ x\n b\n"
+        assert apply_unified_diff("a\nb\n", added) == "a\n++ x\nb\n"
+
+    def test_returns_none_when_context_does_not_match(self):
+        diff = "@@ -1,1 +1,1 @@\n-import json\n+import orjson\n"
+        assert apply_unified_diff(ORIGINAL, diff) is None
+
+    def test_returns_none_without_hunks(self):
+        assert apply_unified_diff(ORIGINAL, "here is the full file instead") is None
+
+
+def test_number_lines():
+    assert number_lines("a\nb\n") == "   1 | a\n   2 | b"
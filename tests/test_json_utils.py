@@ -0,0 +1,48 @@
+import json
+
+from ai_code_agent.json_utils import JsonObjectScanner, extract_json
+
+
+class TestExtractJson:
+    def test_extracts_object_surrounded_by_prose(self):
+        text = 'Here is the analysis:\n{"summary": "x", "files": ["a.py"]}\nHope it helps {really}.'
+        assert json.loads(extract_json(text)) == {"summary": "x", "files": ["a.py"]}
+
+    def test_nested_objects(self):
+        text = '```json\n{"a": {"b": {"c": 1}}, "d": 2}\n```'
+        assert json.loads(extract_json(text)) == {"a": {"b": {"c": 1}}, "d": 2}
+
+    def test_braces_and_escaped_quotes_inside_strings(self):
+        text = '{"code": "def f():\\n    return {\\"k\\": \\"}\\"}"}'
+        assert json.loads(extract_json(text)) == {
+            "code": 'def f():\n    return {"k": "}"}'
+        }
+
+    def test_no_object(self):
+        assert extract_json("no json here") is None
+
+    def test_unbalanced_object(self):
+        assert extract_json('{"summary": "truncated') is None
+
+    def test_whole_response_is_object(self):
+        text = '  {"summary": "x", "files": []}\n'
+        assert extract_json(text) == '{"summary": "x", "files": []}'
+
+    def test_two_objects_returns_first(self):
+        assert extract_json('{"a": 1} and {"b": 2}') == '{"a": 1}'
+
+
+class TestJsonObjectScanner:
+    def test_object_split_across_pieces(self):
+        scanner = JsonObjectScanner()
+        # The escape before the quoted brace lands at the end of a piece
+        pieces = ['Sure: {"code": "x = {\\', '"}\\"', '"}', " trailing {"]
+        results = [scanner.feed(piece) for piece in pieces]
+        assert results[:2] == [None, None]
+        assert json.loads(results[2]) == {"code": 'x = {"}"'}
+        assert results[3] == results[2]
+
+    def test_incomplete_object(self):
+        scanner = JsonObjectScanner()
+        assert scanner.feed('{"a": {"b": 1}') is None
+        assert scanner.result is None
@@ -0,0 +1,33 @@
+from ai_code_agent.llm_cache import LLMCache, make_cache_key
+
+
+class TestLLMCache:
+    def test_cache_key_is_stable(self):
+        messages = [{"role": "user", "content": "hello"}]
+        assert make_cache_key("gpt-4o-mini", messages, 0.0, 100) == make_cache_key(
+            "gpt-4o-mini", list(messages), 0.0, 100
+        )
+        assert make_cache_key("gpt-4o-mini", messages, 0.0, 100) != make_cache_key(
+            "gpt-4o-mini", messages, 0.0, 200
+        )
+
+    def test_hits_and_misses(self):
+        cache = LLMCache()
+        assert cache.get("key") is None
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert cache.stats == {"hits": 1, "misses": 1}
+
+    def test_lru_eviction(self):
+        cache = LLMCache(maxsize=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert len(cache) == 2
+
+    def test_disk_persistence(self, tmp_path):
+        LLMCache(cache_dir=str(tmp_path)).set("key", "value")
+        assert LLMCache(cache_dir=str(tmp_path)).get("key") == "value"
@@ -0,0 +1,130 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from ai_code_agent._http import close_shared_httpx
+from ai_code_agent.json_utils import JsonObjectScanner
+from ai_code_agent.llm_cache import LLMCache
+from ai_code_agent.openai_client import OpenAIClient, _retry_delay
+
+
+def _chunk(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content))]
+    )
+
+
+class _FakeStream:
+    def __init__(self, contents):
+        self._contents = iter(contents)
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return _chunk(next(self._contents))
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+def _rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after else {}
+    request = httpx.Request("POST", "https://example.com/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+class _FakeCompletions:
+    def __init__(self, failures, contents=("Hello", ", ", "world")):
+        self.failures = failures
+        self.contents = contents
+        self.calls = 0
+        self.stream = None
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.calls <= self.failures:
+            raise _rate_limit_error()
+        self.stream = _FakeStream(self.contents)
+        return self.stream
+
+
+def _client(failures=0, contents=("Hello", ", ", "world")):
+    client = OpenAIClient(openai_api_key="test", cache=LLMCache())
+    completions = _FakeCompletions(failures, contents)
+    client.openai_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=completions)
+    )
+    return client, completions
+
+
+class TestOpenAIClient:
+    def test_retries_rate_limit_then_succeeds(self):
+        client, completions = _client(failures=2)
+        messages = [client.create_user_message("hi")]
+
+        with patch("ai_code_agent.openai_client.asyncio.sleep"):
+            result = asyncio.run(client.generate_response(messages))
+
+        assert result == "Hello, world"
+        assert completions.calls == 3
+
+    def test_retry_delay_honors_retry_after(self):
+        assert _retry_delay(_rate_limit_error("3"), attempt=0) == 3.0
+        assert _retry_delay(_rate_limit_error("120"), attempt=0) == 30.0
+        assert 0 <= _retry_delay(_rate_limit_error(), attempt=2) <= 4
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        client, completions = _client()
+        messages = [client.create_user_message("hi")]
+
+        async def run():
+            return await asyncio.gather(
+                client.generate_response(messages, temperature=0),
+                client.generate_response(messages, temperature=0),
+            )
+
+        assert asyncio.run(run()) == ["Hello, world", "Hello, world"]
+        assert completions.calls == 1
+        assert client._inflight == {}
+
+    def test_until_closes_stream_early(self):
+        client, completions = _client(contents=['{"a": ', "1}", " and more", " prose"])
+        scanner = JsonObjectScanner()
+        messages = [client.create_user_message("hi")]
+
+        result = asyncio.run(
+            client.generate_response(
+                messages, until=lambda delta: scanner.feed(delta) is not None
+            )
+        )
+
+        assert result == '{"a": 1}'
+        assert scanner.result == '{"a": 1}'
+        assert completions.stream.closed
+
+    def test_reconnects_after_shared_pool_is_closed(self):
+        client = OpenAIClient(openai_api_key="test", cache=LLMCache())
+        closed_pool = client._http_client
+        asyncio.run(close_shared_httpx())
+
+        completions = _FakeCompletions(0)
+        api = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        with patch("ai_code_agent.openai_client.AsyncOpenAI", return_value=api):
+            result = asyncio.run(
+                client.generate_response([client.create_user_message("hi")])
+            )
+
+        assert result == "Hello, world"
+        assert client._http_client is not closed_pool
+        assert not client._http_client.is_closed
+        asyncio.run(close_shared_httpx())
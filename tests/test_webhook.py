@@ -0,0 +1,63 @@
+import hashlib
+import hmac
+import os
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+SECRET = b"test_secret"
+PAYLOAD = b'{"zen": "Keep it logically awesome."}'
+
+
+@pytest.fixture(scope="module")
+def webhook():
+    with patch.dict(
+        os.environ,
+        {
+            "GITHUB_APP_ID": "1",
+            "GITHUB_APP_PRIVATE_KEY": "test_key",
+            "GITHUB_WEBHOOK_SECRET": SECRET.decode(),
+            "OPENAI_API_KEY": "test_openai_key",
+        },
+    ):
+        from app.routers import webhook
+
+        yield webhook
+
+
+@pytest.fixture
+def client(webhook):
+    app = FastAPI()
+    app.include_router(webhook.router, prefix="/webhook")
+    with patch.object(webhook, "_webhook_secret_key", return_value=SECRET):
+        yield TestClient(app)
+
+
+def _post(client, headers):
+    return client.post(
+        "/webhook", content=PAYLOAD, headers={"X-GitHub-Event": "ping", **headers}
+    )
+
+
+def _signature(payload):
+    return "sha256=" + hmac.new(SECRET, payload, hashlib.sha256).hexdigest()
+
+
+class TestWebhookSignature:
+    def test_valid_signature_is_accepted(self, client):
+        response = _post(client, {"X-Hub-Signature-256": _signature(PAYLOAD)})
+        assert response.status_code == 200
+
+    def test_bad_signature_is_rejected(self, client):
+        response = _post(client, {"X-Hub-Signature-256": _signature(b"other")})
+        assert response.status_code == 401
+
+    def test_missing_signature_is_rejected(self, client):
+        response = _post(client, {})
+        assert response.status_code == 401
+
+    def test_unsigned_delivery_passes_without_a_secret(self, webhook, client):
+        with patch.object(webhook, "_webhook_secret_key", return_value=None):
+            assert _post(client, {}).status_code == 200